@@ -0,0 +1,241 @@
+# --- Microbenchmark des extracteurs de cartes produit (Action / Carrefour / Lidl) ---
+# Mesure, pour chaque extracteur et chaque backend de parsing disponible : cartes/seconde,
+# pic mémoire (tracemalloc) et coût par champ (sélecteur CSS par carte).
+# Les débits sont normalisés par une calibration du même type de travail (parsing d'une page
+# synthétique avec le même backend, puis sélection des champs), mesurée en alternance avec
+# l'extracteur : les variations de charge de la machine touchent les deux mesures et s'annulent.
+# --check échoue si un débit normalisé régresse au-delà du seuil par rapport à la référence ;
+# la référence doit être produite sur la machine qui vérifie (--baseline, --init-baseline).
+#
+# Usage : python benchmarks/bench_extract.py [--check] [--update-baseline] [--baseline ref.json] [--output resultats.json]
+import os
+import sys
+import json
+import time
+import gc
+import argparse
+import tracemalloc
+import urllib.parse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scrape_action
+import scrape_carrefour
+import scrape_lidl
+from scrape_parsers import ParseScope, parse_html, available_backends, class_strainer
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+BASELINE_PATH = os.environ.get('BENCH_BASELINE', os.path.join(BENCH_DIR, 'baseline.json'))
+DEFAULT_THRESHOLD = 0.25  # régression tolérée sur le débit normalisé (25 %)
+DEFAULT_REPEAT = 9
+CALIBRATION_CARDS = 60
+CALIBRATION_SCOPE = ParseScope('li.card', class_strainer('card', 'li'))
+
+def lidl_impression(card):
+    scope, box = scrape_lidl.find_product_box(card)
+    if box is not None and box.has_attr('data-gridbox-impression'):
+        return json.loads(urllib.parse.unquote(str(box['data-gridbox-impression'])))
+    return None
+
+RETAILERS = {
+    'action': {
+        'fixture': 'action_listing.html',
+        'scope': scrape_action.PARSE_SCOPE,
+        'cards': scrape_action.CARD_SELECTOR,
+        'extract': lambda html, backend: scrape_action.extract_products_from_html(html, 'Bench', 'Bench', backend),
+        'fields': {
+            'image': 'img[data-testid="product-card-image"]',
+            'title': 'span[data-testid="product-card-title"]',
+            'description': 'span[data-testid="product-card-description"]',
+            'price': 'span[data-testid="product-card-price-whole"]',
+            'link': 'a[href]',
+        },
+    },
+    'carrefour': {
+        'fixture': 'carrefour_listing.html',
+        'scope': scrape_carrefour.PARSE_SCOPE,
+        'cards': scrape_carrefour.CARD_SELECTOR,
+        'extract': lambda html, backend: scrape_carrefour.extract_products_from_html(html, 'Bench', '', backend),
+        'fields': {
+            'image': '.product-list-card-plp-grid__image-img',
+            'title': '.product-list-card-plp-grid__title',
+            'packaging': '.product-list-card-plp-grid__packaging',
+            'promo_price': '.product-price__amount--main',
+            'old_price': '.product-price__amount--old',
+            'promo_badge': '.promotion-label-refonte__label',
+            'soldes_badge': '.ds-badge--highlight',
+            'link': 'a.product-card-click-wrapper',
+        },
+    },
+    'lidl': {
+        'fixture': 'lidl_grid.html',
+        'scope': scrape_lidl.PARSE_SCOPE,
+        'cards': scrape_lidl.CARD_SELECTOR,
+        'extract': lambda html, backend: scrape_lidl.extract_products_from_grid(html, ['Bench', 'Bench'], backend),
+        'fields': {
+            'box': lambda card: scrape_lidl.find_product_box(card),
+            'impression_json': lidl_impression,
+            'title': '.product-grid-box__title',
+            'price': '.ods-price__value',
+            'image': '.odsc-image-gallery__image',
+            'rating': '.ods-rating__info',
+        },
+    },
+}
+
+def calibration_page(cards=CALIBRATION_CARDS):
+    # Page listing synthétique (en-tête, cartes, pied de page), indépendante des fixtures
+    noise = ''.join(f'<a class="nav" href="/c/{i}">Rayon {i}</a>' for i in range(80))
+    items = ''.join(
+        f'<li class="card c{i % 7}"><a href="/p/{i}"><img src="/i/{i}.jpg" alt="Produit {i}"></a>'
+        f'<div class="body"><span class="title">Produit {i}</span><span class="desc">Lot de {i % 9 + 1}</span>'
+        f'<span class="price">{i % 50},{i % 100:02d} €</span></div></li>'
+        for i in range(cards))
+    return f'<html><head><title>bench</title></head><body><header>{noise}</header><ul>{items}</ul><footer>{noise}</footer></body></html>'
+
+def calibration_work(html, backend):
+    soup = parse_html(html, CALIBRATION_SCOPE, backend)
+    found = 0
+    for card in soup.select('li.card'):
+        card.select_one('span.title').get_text(strip=True)
+        card.select_one('span.price').get_text(strip=True)
+        card.select_one('a[href]')['href']
+        found += 1
+    return found
+
+def timed(func):
+    # GC coupé pendant la mesure : une collecte tombant au hasard dans une répétition fausse le minimum
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = func()
+        return time.perf_counter() - start, result
+    finally:
+        gc.enable()
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        elapsed, result = timed(func)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def paired_best(func, calibration, repeat):
+    # Calibration et extracteur en alternance : chaque paire donne un rapport de temps mesuré sous la
+    # même charge machine ; on garde la médiane des rapports (et le meilleur temps pour l'affichage)
+    best, ratios = None, []
+    for _ in range(repeat):
+        calibration_elapsed, calibrated = timed(calibration)
+        elapsed, result = timed(func)
+        best = elapsed if best is None else min(best, elapsed)
+        # (cartes/s de l'extracteur) / (cartes/s de la calibration) pour cette paire
+        ratios.append((len(result) / elapsed) / (calibrated / calibration_elapsed))
+    ratios.sort()
+    return best, result, ratios[len(ratios) // 2]
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def field_costs(spec, html, backend, repeat):
+    # Coût moyen par carte de chaque champ, mesuré sur l'arbre déjà parsé
+    cards = parse_html(html, spec['scope'], backend).select(spec['cards'])
+    costs = {}
+    for field, lookup in spec['fields'].items():
+        get = lookup if callable(lookup) else (lambda card, selector=lookup: card.select_one(selector))
+        elapsed, _ = best_time(lambda: [get(card) for card in cards], repeat)
+        costs[field] = round(elapsed / max(len(cards), 1) * 1e6, 2)
+    return costs
+
+def run(retailers, repeat):
+    page = calibration_page()
+    results = {'calibration': 'cartes/s de la page synthétique, même backend', 'results': {}}
+    for retailer in retailers:
+        spec = RETAILERS[retailer]
+        with open(os.path.join(FIXTURES_DIR, spec['fixture']), encoding='utf-8') as f:
+            html = f.read()
+        for backend in available_backends():
+            extract = lambda: spec['extract'](html, backend)
+            elapsed, prods, normalized = paired_best(extract, lambda: calibration_work(page, backend), repeat)
+            cards_per_sec = len(prods) / elapsed if elapsed else 0.0
+            results['results'][f"{retailer}/{backend}"] = {
+                'cards': len(prods),
+                'seconds': round(elapsed, 5),
+                'cards_per_sec': round(cards_per_sec, 1),
+                'calibration_cards_per_sec': round(cards_per_sec / normalized, 1) if normalized else 0.0,
+                'normalized': round(normalized, 4),
+                'peak_memory_kb': round(peak_memory(extract) / 1024, 1),
+                'field_cost_us': field_costs(spec, html, backend, repeat),
+            }
+    return results
+
+def print_report(results):
+    print(f"{'extracteur/backend':<28}{'cartes':>8}{'cartes/s':>12}{'calib. c/s':>12}{'normalisé':>12}{'pic Ko':>10}")
+    for key, res in results['results'].items():
+        print(f"{key:<28}{res['cards']:>8}{res['cards_per_sec']:>12}{res['calibration_cards_per_sec']:>12}"
+              f"{res['normalized']:>12}{res['peak_memory_kb']:>10}")
+        fields = ', '.join(f"{field}={cost}µs" for field, cost in res['field_cost_us'].items())
+        print(f"{'':<4}coût par champ : {fields}")
+
+def check_regressions(results, baseline, threshold):
+    regressions = []
+    for key, ref in baseline.get('results', {}).items():
+        current = results['results'].get(key)
+        if current is None:
+            continue
+        floor = ref['normalized'] * (1 - threshold)
+        if current['normalized'] < floor:
+            regressions.append(f"{key} : {current['normalized']} < {round(floor, 4)} (référence {ref['normalized']})")
+        if current['cards'] != ref['cards']:
+            regressions.append(f"{key} : {current['cards']} cartes extraites au lieu de {ref['cards']}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark des extract_product_info")
+    parser.add_argument('--retailer', choices=list(RETAILERS), action='append', help="Limiter à une enseigne (répétable)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Nombre de répétitions (on garde la meilleure)")
+    parser.add_argument('--check', action='store_true', help="Échoue si régression par rapport à baseline.json")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Régression tolérée (0.25 = 25 %%)")
+    parser.add_argument('--update-baseline', action='store_true', help="Réécrit la référence avec ces mesures")
+    parser.add_argument('--init-baseline', action='store_true',
+                        help="Écrit la référence si elle n'existe pas encore (premier passage sur une machine de CI)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Fichier de référence (BENCH_BASELINE)")
+    parser.add_argument('--output', help="Écrit les résultats JSON dans ce fichier")
+    args = parser.parse_args(argv)
+
+    results = run(args.retailer or list(RETAILERS), args.repeat)
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.update_baseline or (args.init_baseline and not os.path.exists(args.baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"Référence mise à jour : {args.baseline}")
+        # Une référence qui vient d'être écrite ne se vérifie pas contre elle-même
+        return 0
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"Pas de référence {args.baseline} : lancer d'abord avec --update-baseline")
+            return 1
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = check_regressions(results, baseline, args.threshold)
+        if regressions:
+            print("RÉGRESSIONS :")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"Aucune régression au-delà de {int(args.threshold * 100)} %")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# --- Montée en charge du parsing : thread unique, threads, pool de processus ---
+# Simule plusieurs navigateurs qui rendent des pages en même temps : un lot de pages (fixtures) est
+# parsé soit en série, soit par N threads (limités par le GIL), soit par N threads qui délèguent au
+# pool de processus de scrape_parsers. Affiche pages/s, cartes/s et l'accélération par rapport à la série.
+#
+# Usage : python benchmarks/bench_parse_pool.py [--retailer lidl] [--pages 24] [--workers 1 2 4]
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import scrape_parsers
+import scrape_action
+import scrape_carrefour
+import scrape_lidl
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+RETAILERS = {
+    'action': ('action_listing.html', scrape_action.extract_products_from_html, ('Bench', 'Bench')),
+    'carrefour': ('carrefour_listing.html', scrape_carrefour.extract_products_from_html, ('Bench', '')),
+    'lidl': ('lidl_grid.html', scrape_lidl.extract_products_from_grid, (['Bench', 'Bench'],)),
+}
+
+def load_pages(retailer, count):
+    fixture, extract, args = RETAILERS[retailer]
+    with open(os.path.join(FIXTURES_DIR, fixture), encoding='utf-8') as f:
+        html = f.read()
+    return [(extract, html, args)] * count
+
+def parse_all(pages, threads):
+    run = lambda page: scrape_parsers.extract_records(page[0], page[1], *page[2])
+    if threads <= 1:
+        return [run(page) for page in pages]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(run, pages))
+
+def measure(pages, threads, processes):
+    scrape_parsers.shutdown_parse_pool()
+    scrape_parsers.set_parse_processes(processes)
+    if processes:
+        # Démarrage du pool (et import des modules dans les processus) hors mesure
+        parse_all(pages[:processes], processes)
+    start = time.perf_counter()
+    results = parse_all(pages, threads)
+    elapsed = time.perf_counter() - start
+    scrape_parsers.shutdown_parse_pool()
+    scrape_parsers.set_parse_processes(0)
+    return elapsed, sum(len(prods) for prods in results)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Montée en charge du parsing avec le pool de processus")
+    parser.add_argument('--retailer', choices=list(RETAILERS), action='append', help="Limiter à une enseigne (répétable)")
+    parser.add_argument('--pages', type=int, default=24, help="Nombre de pages parsées par mesure")
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="Niveaux de parallélisme testés (défaut : 1, 2, 4 ... jusqu'au nombre de cœurs)")
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    levels = args.workers or sorted({1, 2, 4, cpus} | {n for n in (8, 16) if n <= cpus})
+    print(f"{cpus} cœurs, {args.pages} pages par mesure")
+    for retailer in args.retailer or list(RETAILERS):
+        pages = load_pages(retailer, args.pages)
+        serial, cards = measure(pages, 1, 0)
+        print(f"\n{retailer} : {cards} cartes")
+        print(f"{'mode':<18}{'pages/s':>10}{'cartes/s':>12}{'accélération':>14}")
+        print(f"{'série':<18}{len(pages) / serial:>10.1f}{cards / serial:>12.0f}{1.0:>14.2f}")
+        for level in levels:
+            for label, processes in (('threads', 0), ('processus', level)):
+                elapsed, count = measure(pages, level, processes)
+                if count != cards:
+                    print(f"ÉCART : {count} cartes au lieu de {cards} ({label} x{level})")
+                    return 1
+                print(f"{f'{label} x{level}':<18}{len(pages) / elapsed:>10.1f}{cards / elapsed:>12.0f}{serial / elapsed:>14.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# --- Génération du corpus de pages listing utilisé par bench_extract.py ---
+# Pages synthétiques reproduisant la structure (sélecteurs, attributs data-*, bruit autour de la grille)
+# des listings Action / Carrefour / Lidl lus par les extract_product_info. Pour remplacer une fixture
+# par une vraie page : enregistrer driver.page_source (ou la grille Lidl) sous le même nom.
+import os
+import json
+import random
+import urllib.parse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+WORDS = ['Bougie', 'parfumée', 'Vase', 'céramique', 'Coussin', 'velours', 'Lampe', 'LED', 'Poêle', 'inox',
+         'Boîte', 'rangement', 'Tapis', 'bain', 'Plaid', 'polaire', 'Cadre', 'photo', 'Set', 'couverts',
+         'Mug', 'émaillé', 'Panier', 'osier', 'Guirlande', 'lumineuse', 'Carnet', 'A5', 'Stylo', 'gel']
+
+def product_name(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+
+def page_noise(rng, blocks=40):
+    # En-tête, menus, scripts et pied de page : ce que le parsing restreint doit ignorer
+    nav = ''.join(f'<li><a href="/fr-fr/c/menu-{i}/">{product_name(rng)}</a></li>' for i in range(blocks))
+    script = '<script>window.__STATE__ = %s;</script>' % json.dumps({'items': [product_name(rng) for _ in range(blocks * 5)]})
+    footer = ''.join(f'<p class="footer-text">{product_name(rng)} {product_name(rng)}</p>' for _ in range(blocks))
+    return f'<header><nav><ul>{nav}</ul></nav></header>{script}', f'<footer>{footer}</footer>'
+
+def action_page(rng, count=60):
+    head, foot = page_noise(rng)
+    cards = []
+    for i in range(count):
+        whole, frac = rng.randint(0, 29), rng.randint(0, 99)
+        cards.append(f'''<a href="/fr-fr/p/{3000000 + i}/produit-{i}/" class="block">
+<div data-testid="product-card" class="relative flex flex-col">
+<img data-testid="product-card-image" src="https://asset.action.com/image/upload/t_digital_product_card/{3000000 + i}.jpg" alt="">
+<div class="mt-2"><span data-testid="product-card-title" class="line-clamp-2">{product_name(rng)}</span>
+<span data-testid="product-card-description" class="text-sm">{product_name(rng)}</span></div>
+<div class="price"><span data-testid="product-card-price-whole">{whole}</span><span>.</span><span data-testid="product-card-price-fractional">{frac:02d}</span></div>
+</div></a>''')
+    pagination = '''<div data-testid="grid-pagination-items-desktop"><a data-testid="GridPaginationLink" aria-label="Précédent" href="?page=1">&lt;</a>
+<a data-testid="GridPaginationLink" aria-label="Suivant" href="?page=3">&gt;</a></div>'''
+    return f'<!DOCTYPE html><html lang="fr"><head><title>Action</title></head><body>{head}<main><div class="grid">{"".join(cards)}</div>{pagination}</main>{foot}</body></html>'
+
+def carrefour_page(rng, count=60):
+    head, foot = page_noise(rng)
+    cards = []
+    for i in range(count):
+        old = round(rng.uniform(2, 80), 2)
+        promo = round(old * rng.uniform(0.5, 0.95), 2)
+        badge = '<span class="promotion-label-refonte__label">2ème à -50%</span>' if i % 3 == 0 else ''
+        soldes = '<span class="ds-badge ds-badge--highlight">Soldes</span>' if i % 5 == 0 else ''
+        cards.append(f'''<li class="product-grid-item"><article class="product-list-card-plp-grid product-list-card-plp-grid--promo">
+<a class="product-card-click-wrapper" href="/p/produit-{i}-{3560070000000 + i}"></a>
+<div class="product-list-card-plp-grid__image"><img class="product-list-card-plp-grid__image-img" src="https://media.carrefour.fr/medias/{i}.jpg"></div>
+<h3 class="product-list-card-plp-grid__title">{product_name(rng)}</h3>
+<p class="product-list-card-plp-grid__packaging">{rng.randint(1, 12)} x {rng.randint(50, 1000)} g</p>
+{badge}{soldes}
+<div class="product-price"><span class="product-price__amount product-price__amount--main">{str(promo).replace('.', ',')} €</span>
+<span class="product-price__amount product-price__amount--old">{str(old).replace('.', ',')} €</span></div>
+</article></li>''')
+    more = '<button class="pagination__button"><span>Produits suivants</span></button>'
+    return f'<!DOCTYPE html><html lang="fr"><head><title>Carrefour</title></head><body>{head}<main><ul class="product-grid">{"".join(cards)}</ul>{more}</main>{foot}</body></html>'
+
+def lidl_grid(rng, count=300):
+    boxes = []
+    for i in range(count):
+        name = product_name(rng)
+        data = {'name': name, 'brand': {'name': rng.choice(['SILVERCREST', 'ERNESTO', 'LIVARNO'])},
+                'price': round(rng.uniform(1, 150), 2), 'canonicalPath': f'/p/produit-{i}/p{100000 + i}',
+                'image': f'https://www.lidl.fr/assets/{i}.jpg', 'ratingAverage': round(rng.uniform(1, 5), 1),
+                'ratingCount': rng.randint(0, 500)}
+        impression = urllib.parse.quote(json.dumps(data))
+        boxes.append(f'''<li class="s-grid__item"><div class="product-grid-box grid-box">
+<div class="tile-without-padding" data-gridbox-impression="{impression}"><div id="product_{100000 + i}" class="odsc-tile">
+<a class="odsc-tile__link" href="/p/produit-{i}/p{100000 + i}"><img class="odsc-image-gallery__image" src="https://www.lidl.fr/assets/{i}.jpg"></a>
+<div class="product-grid-box__brand">{data['brand']['name']}</div><div class="product-grid-box__title">{name}</div>
+<div class="product-grid-box__meta">{product_name(rng)}</div>
+<div class="ods-price"><div class="ods-price__value">{str(data['price']).replace('.', ',')}</div></div>
+<div class="ods-rating__info">{data['ratingAverage']}/5 ({data['ratingCount']})</div>
+</div></div></div></li>''')
+    return f'<ol class="s-product-grid">{"".join(boxes)}</ol>'
+
+FIXTURES = {
+    'action_listing.html': action_page,
+    'carrefour_listing.html': carrefour_page,
+    'lidl_grid.html': lidl_grid,
+}
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for filename, build in FIXTURES.items():
+        rng = random.Random(filename)
+        path = os.path.join(FIXTURES_DIR, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(build(rng))
+        print(f"{path} : {os.path.getsize(path) // 1024} Ko")
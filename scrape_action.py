@@ -1,18 +1,42 @@
-import time
 import sqlite3
-import sys
-from bs4 import BeautifulSoup
+import argparse
+import queue
+import threading
+import requests
+from bs4 import SoupStrainer
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException
+from scrape_storage import ensure_identity_index, upsert_products, ensure_fingerprint_schema, page_key, fingerprint, page_unchanged, replay_page, record_fingerprint, identity_count, ensure_generation_schema, start_generation, delete_unseen
+from scrape_readiness import navigate, wait_for_cards, wait_for_stale, scroll_to_bottom, first_element
+from scrape_http import make_session, fetch_html
+from scrape_snapshot import publish_snapshot
+from scrape_images import cache_images_if_enabled
+from scrape_catalog import sync_catalog_if_enabled
+from scrape_search import ensure_search_index
+from scrape_metrics import phase, scope, measure_run
+from scrape_scheduler import scheduler
+from scrape_profile import profiling, profile_scope
+from scrape_journal import JOURNAL_ENABLED, RunJournal
+from scrape_pipeline import Pipeline
+from scrape_browser import configure_options, apply_blocking, log_resource_report
+from scrape_parsers import ParseScope, parse_html, set_default_parser, browser_fragments, extract_records, set_parse_processes, PARSER_BACKENDS, DEFAULT_PARSER
+from urllib.parse import urljoin
 
 # --- Config ---
 DB_PATH = "action_products.sqlite"
 MAX_PAGES = 5
-SLEEP_BETWEEN_PAGES = 5
+CARD_SELECTOR = "[data-testid='product-card']"
+MAX_WORKERS = 6  # Plafond de navigateurs Chrome lancés en parallèle (--workers)
+MAX_HTTP_WORKERS = 16  # Plafond en backend 'http' (pas de Chrome, juste des connexions keep-alive)
+BACKENDS = ('auto', 'browser', 'http')  # auto = HTTP d'abord, navigateur si la page est rendue côté client
+PAGINATION_SELECTOR = "div[data-testid='grid-pagination-items-desktop']"
+NEXT_PAGE_SELECTOR = f"{PAGINATION_SELECTOR} a[data-testid='GridPaginationLink'][aria-label='Suivant']"
+
+# Colonnes écrites par le scraper et identité d'un produit (index UNIQUE)
+PRODUCT_COLUMNS = ('name', 'description', 'price', 'price_fcfa', 'image_url', 'product_url', 'category', 'subcategory', 'page_key')
+IDENTITY_KEY = ('name', 'subcategory', 'price')
 
 # Configuration des catégories Action (URLs de première page seulement)
 CATEGORIES = {
@@ -118,9 +142,9 @@ CATEGORIES = {
 }
 
 # --- Setup Selenium ---
-def setup_driver():
+def setup_driver(profile=None):
     from selenium.webdriver.chrome.service import Service
-    options = Options()
+    options = configure_options(Options(), 'action', profile)
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
@@ -129,12 +153,16 @@ def setup_driver():
     # Indique explicitement le chemin du binaire Chrome
     options.binary_location = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
     service = Service(executable_path='/usr/local/bin/chromedriver')
-    return webdriver.Chrome(service=service, options=options)
+    driver = webdriver.Chrome(service=service, options=options)
+    # Blocage images / polices / traqueurs (SCRAPE_BLOCKING=off pour tout charger)
+    return apply_blocking(driver, 'action', profile)
 
 # --- Setup SQLite ---
 def setup_database():
-    conn = sqlite3.connect(DB_PATH)
+    # timeout + WAL : plusieurs workers peuvent écrire dans la même base sans "database is locked"
+    conn = sqlite3.connect(DB_PATH, timeout=30)
     c = conn.cursor()
+    c.execute('PRAGMA journal_mode=WAL')
     # Ajout colonne is_new si besoin
     c.execute('''CREATE TABLE IF NOT EXISTS products (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -155,7 +183,18 @@ def setup_database():
         c.execute('ALTER TABLE products ADD COLUMN is_new INTEGER DEFAULT 0')
     except Exception:
         pass
+    # Génération Nouveautés : new_run = dernier passage où le produit figurait dans la liste
+    try:
+        c.execute('ALTER TABLE products ADD COLUMN new_run INTEGER')
+    except Exception:
+        pass
+    c.execute('CREATE INDEX IF NOT EXISTS ix_products_name_url ON products (name, product_url)')
+    c.execute('CREATE INDEX IF NOT EXISTS ix_products_new_run ON products (new_run) WHERE is_new=1')
     conn.commit()
+    ensure_identity_index(conn, IDENTITY_KEY)
+    ensure_fingerprint_schema(conn)
+    ensure_generation_schema(conn)
+    ensure_search_index(conn)
     return conn, c
 
 # --- Conversion Euro vers FCFA ---
@@ -220,177 +259,530 @@ def extract_product_info(card, category_name, subcategory):
         print(f"Erreur extraction produit: {e}")
         return None
 
-def insert_product(c, prod):
-    # Dédoublonnage strict sur nom + sous-catégorie + prix
-    c.execute('''SELECT id FROM products WHERE name=? AND subcategory=? AND price=?''', (prod['name'], prod['subcategory'], prod['price']))
-    if c.fetchone():
-        return False
-    price_fcfa = euro_to_fcfa(prod['price']) if prod['price'] else 0
-    c.execute('''INSERT INTO products (name, description, price, price_fcfa, image_url, product_url, category, subcategory, scraped_at, first_scraped_at)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))''',
-              (prod['name'], prod['description'], prod['price'], price_fcfa, prod['image_url'], prod['product_url'], prod['category'], prod['subcategory']))
-    return True
-
-def scrape_subcategory(driver, url, category_name, subcategory, conn, c):
-    print(f"\n--- Scraping {subcategory} ---")
-    driver.get(url)
-    time.sleep(3)
-    
-    total_inserted = 0
-    scraped_keys = set()
-    
+def is_listing_element(name, attrs):
+    # Parsing restreint : cartes produit, pagination desktop et liens <a> (une carte peut être
+    # enveloppée dans son lien, cf. find_parent('a') dans extract_product_info)
+    return name == 'a' or attrs.get('data-testid') in ('product-card', 'grid-pagination-items-desktop')
+
+PARSE_SCOPE = ParseScope(f"{CARD_SELECTOR}, {PAGINATION_SELECTOR}", SoupStrainer(is_listing_element), root_ancestor='a')
+
+def parse_listing(html, backend=None):
+    return parse_html(html, PARSE_SCOPE, backend)
+
+def extract_products(soup, category_name, subcategory):
+    prods = []
+    cards = soup.select(CARD_SELECTOR)
+    with phase('extract', count=len(cards)):
+        for card in cards:
+            prod = extract_product_info(card, category_name, subcategory)
+            if prod:
+                prods.append(prod)
+    return prods
+
+def extract_products_from_html(html, category_name, subcategory, backend=None):
+    return extract_products(parse_listing(html, backend), category_name, subcategory)
+
+def insert_products(conn, prods, extra_columns=(), generation=None):
+    # Dédoublonnage strict sur nom + sous-catégorie + prix, porté par l'index UNIQUE
+    for prod in prods:
+        prod['price_fcfa'] = euro_to_fcfa(prod['price']) if prod['price'] else 0
+    return upsert_products(conn, PRODUCT_COLUMNS + tuple(extra_columns), IDENTITY_KEY, prods, generation=generation)
+
+def store_page(prods, conn, generation):
+    print(f"Produits trouvés: {len(prods)}")
+    inserted = insert_products(conn, prods, generation=generation)
+    print(f"Produits insérés: {inserted}")
+    return inserted
+
+def store_or_replay_page(conn, key, fragments, get_prods, generation):
+    # Empreinte identique au dernier passage : ni extraction ni écriture, juste le rafraîchissement de scraped_at
+    page_fingerprint = fingerprint(fragments)
+    if page_unchanged(conn, key, page_fingerprint):
+        replayed = replay_page(conn, key, generation)
+        print(f"Page inchangée depuis le dernier passage ({replayed} produits), parsing ignoré")
+        return 0
+    prods = get_prods()
+    for prod in prods:
+        prod['page_key'] = key
+    inserted = store_page(prods, conn, generation)
+    record_fingerprint(conn, key, page_fingerprint, identity_count(prods, IDENTITY_KEY))
+    return inserted
+
+def remove_missing_products(conn, category_name, subcategory, generation):
+    # Suppression des produits disparus : un seul DELETE sur les lignes non tamponnées par ce passage
+    print(f"Nettoyage : suppression des produits absents de la sous-catégorie '{subcategory}'...")
+    removed = delete_unseen(conn, generation, category_name, subcategory)
+    if removed:
+        print(f"Produits supprimés : {removed}")
+    else:
+        print("Aucun produit à supprimer.")
+
+def begin_subcategory(conn, category_name, subcategory, journal=None):
+    if journal is not None:
+        return journal.begin(conn, category_name, subcategory)
+    return start_generation(conn, f"action:{category_name} > {subcategory}")
+
+def end_subcategory(conn, category_name, subcategory, generation, inserted, journal=None):
+    # Run journalisé : le nettoyage attend que tout le périmètre du run soit terminé (RunJournal.finish)
+    if journal is not None:
+        journal.done(conn, category_name, subcategory, inserted)
+    else:
+        remove_missing_products(conn, category_name, subcategory, generation)
+
+def browse_pages(driver, url):
+    # Parcourt les pages d'une sous-catégorie : rend la main (numéro de page) dès que les cartes sont affichées
+    navigate(driver, url)
     for page in range(1, MAX_PAGES + 1):
         print(f"Page {page}/{MAX_PAGES}")
         # Attendre chargement produits
         try:
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='product-card']")))
+            wait_for_cards(driver, CARD_SELECTOR, timeout=10)
         except Exception:
             print("Aucun produit trouvé sur cette page")
-            break
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        cards = soup.select("[data-testid='product-card']")
-        print(f"Produits trouvés: {len(cards)}")
-        inserted = 0
-        for card in cards:
-            prod = extract_product_info(card, category_name, subcategory)
-            if prod:
-                key = (prod['name'], prod['subcategory'], prod['price'])
-                scraped_keys.add(key)
-                if insert_product(c, prod):
-                    inserted += 1
-        conn.commit()
-        total_inserted += inserted
-        print(f"Produits insérés: {inserted}")
+            return
+        yield page
+        log_resource_report(driver, f"page {page}")
         # Pagination : cliquer sur "Suivant" si pas dernière page
         if page < MAX_PAGES:
             try:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
+                scroll_to_bottom(driver)
                 # Chercher la div desktop pagination
                 desktop_pagination = driver.find_element(By.CSS_SELECTOR, "div[data-testid='grid-pagination-items-desktop']")
                 next_buttons = desktop_pagination.find_elements(By.XPATH, ".//a[@data-testid='GridPaginationLink' and @aria-label='Suivant']")
-                found = False
-                for btn in next_buttons:
-                    print(f"Bouton desktop trouvé, texte='{btn.text.strip()}'")
-                    print("HTML complet du bouton :", btn.get_attribute('outerHTML'))
-                    # On clique sur le premier bouton trouvé (il n'y a qu'un seul 'Suivant' dans la div desktop)
-                    print("Bouton Suivant (desktop) cliqué.")
-                    print(f"Attente {SLEEP_BETWEEN_PAGES}s avant page suivante...")
-                    time.sleep(SLEEP_BETWEEN_PAGES)
-                    driver.execute_script("arguments[0].click();", btn)
-                    time.sleep(3)
-                    found = True
-                    break
-                if not found:
+                if not next_buttons:
                     print("Fin de pagination (plus de bouton Suivant visible dans la pagination desktop).")
-                    break
+                    return
+                # On clique sur le premier bouton trouvé (il n'y a qu'un seul 'Suivant' dans la div desktop)
+                old_card = first_element(driver, CARD_SELECTOR)
+                scheduler.acquire(url)
+                driver.execute_script("arguments[0].click();", next_buttons[0])
+                print("Bouton Suivant (desktop) cliqué.")
+                # La page suivante est prête quand les anciennes cartes ont été remplacées
+                if old_card is not None:
+                    wait_for_stale(driver, old_card)
             except TimeoutException:
                 print("Fin de pagination (plus de bouton Suivant).")
-                break
+                return
             except Exception as e:
                 print(f"Erreur pagination : {e}")
-                break
-    # Suppression des produits disparus (en Python)
-    print(f"Nettoyage : suppression des produits absents de la sous-catégorie '{subcategory}'...")
-    c.execute("SELECT id, name, subcategory, price FROM products WHERE subcategory=? AND category=?", (subcategory, category_name))
-    all_db = c.fetchall()
-    to_delete = [row[0] for row in all_db if (row[1], row[2], row[3]) not in scraped_keys]
-    if to_delete:
-        c.executemany("DELETE FROM products WHERE id=?", [(i,) for i in to_delete])
-        conn.commit()
-        print(f"Produits supprimés : {len(to_delete)}")
-    else:
-        print("Aucun produit à supprimer.")
+                return
+
+def scrape_subcategory(driver, url, category_name, subcategory, conn, c, journal=None):
+    print(f"\n--- Scraping {subcategory} ---")
+    total_inserted = 0
+    generation = begin_subcategory(conn, category_name, subcategory, journal)
+    for page in browse_pages(driver, url):
+        total_inserted += store_or_replay_page(
+            conn, page_key(url, page), browser_fragments(driver, CARD_SELECTOR),
+            lambda: extract_records(extract_products_from_html, driver.page_source, category_name, subcategory), generation)
+    end_subcategory(conn, category_name, subcategory, generation, total_inserted, journal)
+    print(f"Scraping {subcategory} terminé. Total produits insérés: {total_inserted}")
+    return total_inserted
+
+def scrape_subcategory_http(session, url, category_name, subcategory, conn, c, journal=None):
+    # Les listings Action sont rendus côté serveur : on suit les liens GridPaginationLink sans navigateur.
+    # Renvoie None si la première page ne contient aucune carte (contenu client uniquement -> repli navigateur).
+    print(f"\n--- Scraping {subcategory} (HTTP) ---")
+    total_inserted = 0
+    generation = begin_subcategory(conn, category_name, subcategory, journal)
+    page_url = url
+    for page in range(1, MAX_PAGES + 1):
+        print(f"Page {page}/{MAX_PAGES}")
+        soup = parse_listing(fetch_html(session, page_url))
+        cards = soup.select(CARD_SELECTOR)
+        if not cards:
+            if page == 1:
+                print("Aucune carte dans le HTML serveur, repli sur le navigateur")
+                return None
+            print("Aucun produit trouvé sur cette page")
+            break
+        total_inserted += store_or_replay_page(
+            conn, page_key(url, page), [str(card) for card in cards],
+            lambda: extract_products(soup, category_name, subcategory), generation)
+        next_link = soup.select_one(NEXT_PAGE_SELECTOR)
+        if not next_link or not next_link.has_attr('href'):
+            print("Fin de pagination (plus de lien Suivant).")
+            break
+        page_url = urljoin(page_url, next_link['href'])
+    end_subcategory(conn, category_name, subcategory, generation, total_inserted, journal)
     print(f"Scraping {subcategory} terminé. Total produits insérés: {total_inserted}")
     return total_inserted
 
+class LazyDriver:
+    # Chrome n'est lancé qu'au premier besoin : en backend HTTP il ne sert qu'au repli
+    def __init__(self, factory=None):
+        self.factory = factory or setup_driver
+        self.driver = None
+
+    def get(self):
+        if self.driver is None:
+            self.driver = self.factory()
+        return self.driver
+
+    def alive(self):
+        # Un Chrome planté ou fermé lève dès la première commande WebDriver
+        if self.driver is None:
+            return False
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+def scrape_subcategory_with_backend(backend, session, lazy_driver, url, category_name, subcategory, conn, c, journal=None):
+    if journal is not None and journal.is_done(conn, category_name, subcategory):
+        print(f"{subcategory} déjà terminée dans ce run, ignorée")
+        return 0
+    try:
+        with scope(category=category_name, subcategory=subcategory), profile_scope(f"{category_name} > {subcategory}"):
+            return scrape_subcategory_backends(backend, session, lazy_driver, url, category_name, subcategory, conn, c, journal)
+    except Exception:
+        # Sous-catégorie à refaire au prochain lancement du run
+        if journal is not None:
+            journal.fail(conn, category_name, subcategory)
+        raise
+
+def scrape_subcategory_backends(backend, session, lazy_driver, url, category_name, subcategory, conn, c, journal=None):
+    if backend != 'browser':
+        try:
+            inserted = scrape_subcategory_http(session, url, category_name, subcategory, conn, c, journal)
+        except requests.RequestException as e:
+            # 403 / 429 (blocage anti-bot), connexion refusée... : en auto, le navigateur prend le relais
+            if backend == 'http':
+                raise
+            print(f"LOG: échec HTTP sur {subcategory} ({e}), repli sur le navigateur")
+            inserted = None
+        if inserted is not None or backend == 'http':
+            return inserted or 0
+    return scrape_subcategory(lazy_driver.get(), url, category_name, subcategory, conn, c, journal)
+
 def scrape_nouveautes(driver, conn, c):
     print("\n=== Scraping Nouveautés ===", flush=True)
     url = 'https://www.action.com/fr-fr/nouveautes/'
-    driver.get(url)
-    time.sleep(3)
-    nouveaute_keys = set()
+    navigate(driver, url)
+    generation = start_generation(conn, 'action:nouveautes')
     for page in range(1, 6):
         print(f"Page {page}/5", flush=True)
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        cards = soup.select("[data-testid='product-card']")
-        print(f"Produits trouvés: {len(cards)}", flush=True)
-        for card in cards:
-            prod = extract_product_info(card, 'Nouveautés', 'Nouveautés')
-            if prod:
-                key = (prod['name'], prod['product_url'])
-                nouveaute_keys.add(key)
-                # Vérifie si le produit existe déjà
-                c.execute('SELECT id FROM products WHERE name=? AND product_url=?', (prod['name'], prod['product_url']))
-                row = c.fetchone()
-                if row:
-                    c.execute('UPDATE products SET is_new=1 WHERE id=?', (row[0],))
-                else:
-                    price_fcfa = euro_to_fcfa(prod['price']) if prod['price'] else 0
-                    c.execute('''INSERT INTO products (name, description, price, price_fcfa, image_url, product_url, category, subcategory, scraped_at, first_scraped_at, is_new)
-                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'), 1)''',
-                              (prod['name'], prod['description'], prod['price'], price_fcfa, prod['image_url'], prod['product_url'], prod['category'], prod['subcategory']))
+        try:
+            wait_for_cards(driver, CARD_SELECTOR, timeout=10)
+        except Exception:
+            print("Aucun produit trouvé sur cette page", flush=True)
+            break
+        prods = extract_records(extract_products_from_html, driver.page_source, 'Nouveautés', 'Nouveautés')
+        print(f"Produits trouvés: {len(prods)}", flush=True)
+        # Les produits déjà connus (même nom + url) sont tamponnés avec la génération du passage
+        c.executemany('UPDATE products SET is_new=1, new_run=? WHERE name=? AND product_url=?',
+                      [(generation, prod['name'], prod['product_url']) for prod in prods])
         conn.commit()
+        stamped = set(c.execute('SELECT name, product_url FROM products WHERE is_new=1 AND new_run=?', (generation,)).fetchall())
+        new_prods = []
+        for prod in prods:
+            if (prod['name'], prod['product_url']) not in stamped:
+                prod['is_new'] = 1
+                prod['new_run'] = generation
+                new_prods.append(prod)
+        insert_products(conn, new_prods, extra_columns=('is_new', 'new_run'))
         # Pagination : cliquer sur "Suivant" si pas dernière page
         if page < 5:
             try:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
+                scroll_to_bottom(driver)
                 next_btn = driver.find_element(By.XPATH, "//a[@data-testid='GridPaginationLink' and @aria-label='Suivant']")
                 if next_btn:
-                    print("Bouton Suivant (nouveautés) cliqué.", flush=True)
+                    old_card = first_element(driver, CARD_SELECTOR)
+                    scheduler.acquire(url)
                     driver.execute_script("arguments[0].click();", next_btn)
-                    print("Attente 5s avant page suivante...", flush=True)
-                    time.sleep(5)
+                    print("Bouton Suivant (nouveautés) cliqué.", flush=True)
+                    if old_card is not None:
+                        wait_for_stale(driver, old_card)
                 else:
                     print("Fin de pagination Nouveautés.", flush=True)
                     break
             except Exception as e:
                 print(f"Fin de pagination Nouveautés ou erreur: {e}", flush=True)
                 break
-    # Met à jour tous les autres produits (plus dans nouveautés)
-    c.execute('UPDATE products SET is_new=0 WHERE (name, product_url) NOT IN (%s)' % ','.join(['(?,?)']*len(nouveaute_keys)), [item for key in nouveaute_keys for item in key]) if nouveaute_keys else c.execute('UPDATE products SET is_new=0')
+    # Seuls les produits encore marqués nouveaux mais absents de ce passage perdent le drapeau
+    c.execute('UPDATE products SET is_new=0 WHERE is_new=1 AND (new_run IS NULL OR new_run < ?)', (generation,))
     conn.commit()
-    print(f"Nouveautés trouvées : {len(nouveaute_keys)}", flush=True)
+    found = c.execute('SELECT COUNT(*) FROM products WHERE is_new=1 AND new_run=?', (generation,)).fetchone()[0]
+    print(f"Nouveautés trouvées : {found}", flush=True)
 
-def scrape_category(category_key, category_config):
+def scrape_category(category_key, category_config, backend='browser', lazy_driver=None, session=None, journal=None):
+    # lazy_driver / session fournis par l'appelant (run complet, démon) : réutilisés et laissés ouverts
     print(f"\n=== Scraping {category_config['name']} ===")
-    driver = setup_driver()
+    own_driver = lazy_driver is None
+    own_session = session is None
+    lazy_driver = lazy_driver or LazyDriver()
+    session = session or make_session()
     conn, c = setup_database()
     
     total_inserted = 0
     
     for subcategory, url in category_config['subcategories'].items():
         try:
-            inserted = scrape_subcategory(driver, url, category_config['name'], subcategory, conn, c)
+            inserted = scrape_subcategory_with_backend(backend, session, lazy_driver, url, category_config['name'], subcategory,
+                                                       conn, c, journal)
             total_inserted += inserted
-            time.sleep(5)  # Pause entre les sous-catégories
         except Exception as e:
             print(f"Erreur lors du scraping de {subcategory}: {e}")
             continue
     
-    driver.quit()
+    if own_driver:
+        lazy_driver.quit()
+    if own_session:
+        session.close()
     conn.close() 
     print(f"\nScraping {category_config['name']} terminé. Total produits insérés: {total_inserted}")
     return total_inserted
 
-def scrape_action(category=None):
-    driver = setup_driver()
+def subcategory_jobs(category=None):
+    # Liste à plat (catégorie, sous-catégorie, url) de toutes les sous-catégories à scraper
+    categories = {category: CATEGORIES[category]} if category else CATEGORIES
+    return [(cat_config['name'], subcategory, url)
+            for cat_config in categories.values()
+            for subcategory, url in cat_config['subcategories'].items()]
+
+def scrape_worker(worker_id, jobs, totals, lock, backend='browser', journal=None):
+    # Un worker = un Chrome (lancé à la demande) + une session HTTP + une connexion SQLite,
+    # qui dépile les sous-catégories jusqu'à épuisement
+    lazy_driver = LazyDriver()
+    session = make_session()
     conn, c = setup_database()
-    if not category:
-        # Scraper les nouveautés d'abord
-        scrape_nouveautes(driver, conn, c)
-    if category:
-        # Scraper une seule catégorie
-        scrape_category(category, CATEGORIES[category])
-    else:
-        # Scraper toutes les catégories
-        for cat_key, cat_config in CATEGORIES.items():
-            scrape_category(cat_key, cat_config)
-            time.sleep(10)  # Pause entre les catégories
-    driver.quit()
-    conn.close()
+    try:
+        while True:
+            try:
+                category_name, subcategory, url = jobs.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                inserted = scrape_subcategory_with_backend(backend, session, lazy_driver, url, category_name, subcategory,
+                                                           conn, c, journal)
+                with lock:
+                    totals[category_name] = totals.get(category_name, 0) + inserted
+            except Exception as e:
+                print(f"[worker {worker_id}] Erreur lors du scraping de {subcategory}: {e}")
+    finally:
+        lazy_driver.quit()
+        session.close()
+        conn.close()
+
+def scrape_parallel(category=None, workers=1, backend='browser', journal=None):
+    jobs = queue.Queue()
+    all_jobs = subcategory_jobs(category)
+    for job in all_jobs:
+        jobs.put(job)
+    cap = MAX_HTTP_WORKERS if backend == 'http' else MAX_WORKERS
+    workers = max(1, min(workers, cap, len(all_jobs)))
+    print(f"\n=== Scraping parallèle : {len(all_jobs)} sous-catégories sur {workers} workers ({backend}) ===")
+    totals = {}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=scrape_worker, args=(i, jobs, totals, lock, backend, journal), daemon=True)
+               for i in range(1, workers + 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for category_name, inserted in totals.items():
+        print(f"Scraping {category_name} terminé. Total produits insérés: {inserted}")
+    return sum(totals.values())
+
+# --- Mode pipeline : navigation, parsing et écriture SQLite découplés (scrape_pipeline) ---
+# Les navigateurs ne font que charger les pages et copier leur HTML ; les parseurs calculent l'empreinte
+# et extraient les produits ; un seul écrivain tient la connexion SQLite en écriture.
+
+class PipelineFetcher:
+    def __init__(self, journal=None):
+        self.lazy_driver = LazyDriver()
+        self.conn, _ = setup_database()
+        self.journal = journal
+
+    def fetch(self, job, emit):
+        category_name, subcategory, url = job
+        if self.journal is not None and self.journal.is_done(self.conn, category_name, subcategory):
+            print(f"{subcategory} déjà terminée dans ce run, ignorée")
+            return
+        print(f"\n--- Scraping {subcategory} (pipeline) ---")
+        generation = begin_subcategory(self.conn, category_name, subcategory, self.journal)
+        item = {'category': category_name, 'subcategory': subcategory, 'generation': generation}
+        driver = self.lazy_driver.get()
+        pages = 0
+        try:
+            with scope(retailer='action', category=category_name, subcategory=subcategory), \
+                    profile_scope(f"{category_name} > {subcategory}"):
+                for page in browse_pages(driver, url):
+                    emit(dict(item, kind='page', page=page, key=page_key(url, page), html=driver.page_source,
+                              fragments=browser_fragments(driver, CARD_SELECTOR)))
+                    pages += 1
+        except Exception:
+            # Sous-catégorie à refaire au prochain lancement du run
+            if self.journal is not None:
+                self.journal.fail(self.conn, category_name, subcategory)
+            raise
+        # Marqueur de fin : l'écrivain ne nettoie la sous-catégorie qu'une fois ses pages toutes écrites
+        emit(dict(item, kind='done', pages=pages))
+
+    def close(self):
+        self.lazy_driver.quit()
+        self.conn.close()
+
+class PipelineParser:
+    def __init__(self):
+        # Connexion en lecture seule pour consulter les empreintes (WAL : pas de blocage de l'écrivain)
+        self.conn, _ = setup_database()
+
+    def parse(self, item):
+        if item['kind'] != 'page':
+            return item
+        with scope(retailer='action', category=item['category'], subcategory=item['subcategory']):
+            return self.parse_page(item)
+
+    def parse_page(self, item):
+        page_fingerprint = fingerprint(item.pop('fragments'))
+        html = item.pop('html')
+        if page_unchanged(self.conn, item['key'], page_fingerprint):
+            return dict(item, kind='replay')
+        prods = extract_records(extract_products_from_html, html, item['category'], item['subcategory'])
+        for prod in prods:
+            prod['page_key'] = item['key']
+        return dict(item, kind='products', products=prods, fingerprint=page_fingerprint)
+
+    def close(self):
+        self.conn.close()
+
+class PipelineWriter:
+    def __init__(self, journal=None):
+        self.conn, _ = setup_database()
+        self.journal = journal
+        self.written = {}
+        self.finished = {}
+        self.inserted = {}
+        self.totals = {}
+
+    def write(self, item):
+        with scope(retailer='action', category=item['category'], subcategory=item['subcategory']):
+            self.write_item(item)
+
+    def write_item(self, item):
+        generation = item['generation']
+        if item['kind'] == 'done':
+            self.finished[generation] = item
+        elif item['kind'] == 'replay':
+            replayed = replay_page(self.conn, item['key'], generation)
+            print(f"{item['subcategory']} : page inchangée ({replayed} produits), parsing ignoré")
+            self.written[generation] = self.written.get(generation, 0) + 1
+        else:
+            inserted = insert_products(self.conn, item['products'], generation=generation)
+            record_fingerprint(self.conn, item['key'], item['fingerprint'], identity_count(item['products'], IDENTITY_KEY))
+            print(f"{item['subcategory']} : {len(item['products'])} produits trouvés, {inserted} insérés")
+            self.totals[item['category']] = self.totals.get(item['category'], 0) + inserted
+            self.inserted[generation] = self.inserted.get(generation, 0) + inserted
+            self.written[generation] = self.written.get(generation, 0) + 1
+        # Une page perdue en route (erreur de parsing) bloque le nettoyage : mieux vaut garder des
+        # produits périmés que supprimer ceux d'une page non relue
+        done = self.finished.get(generation)
+        if done is not None and self.written.get(generation, 0) >= done['pages']:
+            end_subcategory(self.conn, done['category'], done['subcategory'], generation,
+                            self.inserted.get(generation, 0), self.journal)
+            del self.finished[generation]
+
+    def close(self):
+        for category_name, inserted in self.totals.items():
+            print(f"Scraping {category_name} terminé. Total produits insérés: {inserted}")
+        self.conn.close()
+
+def scrape_pipelined(category=None, workers=1, parse_workers=2, journal=None):
+    all_jobs = subcategory_jobs(category)
+    pipeline = Pipeline(lambda: PipelineFetcher(journal), PipelineParser, lambda: PipelineWriter(journal),
+                        fetch_workers=min(workers, MAX_WORKERS), parse_workers=parse_workers)
+    print(f"\n=== Pipeline : {len(all_jobs)} sous-catégories, {pipeline.fetch_workers} navigateurs, "
+          f"{pipeline.parse_workers} parseurs ===")
+    pipeline.run(all_jobs)
+    pipeline.print_stats()
+    return sum(pipeline.writer.totals.values())
+
+def scrape_action(category=None, workers=1, backend='auto', pipeline=False, parse_workers=2, restart=False):
+    if category and category not in CATEGORIES:
+        print(f"Catégorie '{category}' non trouvée. Catégories disponibles: {list(CATEGORIES.keys())}")
+        return
+    # Journal du run : un run interrompu (crash, kill) reprend là où il s'était arrêté
+    conn, c = setup_database()
+    journal = RunJournal(conn, f"action:{category or 'all'}", 'action', restart) if JOURNAL_ENABLED else None
+    # Un seul Chrome pour tout le run séquentiel : Nouveautés puis catégories
+    lazy_driver = LazyDriver()
+    session = make_session()
+    try:
+        if not category and not (journal is not None and journal.is_done(conn, 'Nouveautés', 'Nouveautés')):
+            # Scraper les nouveautés d'abord
+            with scope(category='Nouveautés'), profile_scope('Nouveautés'):
+                scrape_nouveautes(lazy_driver.get(), conn, c)
+            if journal is not None:
+                journal.mark_done(conn, 'Nouveautés', 'Nouveautés')
+        if pipeline:
+            # Navigation, parsing et écriture en étages parallèles (navigateur uniquement)
+            lazy_driver.quit()
+            scrape_pipelined(category, workers, parse_workers, journal)
+        elif workers > 1:
+            # Mode pool : les sous-catégories sont réparties entre plusieurs workers
+            lazy_driver.quit()
+            scrape_parallel(category, workers, backend, journal)
+        elif category:
+            # Scraper une seule catégorie
+            scrape_category(category, CATEGORIES[category], backend, lazy_driver, session, journal)
+        else:
+            # Scraper toutes les catégories
+            for cat_key, cat_config in CATEGORIES.items():
+                scrape_category(cat_key, cat_config, backend, lazy_driver, session, journal)
+        if journal is not None:
+            journal.finish(conn, [(cat_name, subcategory) for cat_name, subcategory, _ in subcategory_jobs(category)])
+    finally:
+        lazy_driver.quit()
+        session.close()
+        conn.close()
+    # Images des produits nouveaux / modifiés (SCRAPE_IMAGE_CACHE=1), avant le snapshot qui expose image_path
+    cache_images_if_enabled('action', DB_PATH)
+    sync_catalog_if_enabled('action', DB_PATH)
+    # Snapshot JSON trié + compressé servi par server.js à la place du SELECT complet
+    publish_snapshot('action', DB_PATH)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scraping des produits Action")
+    parser.add_argument('category', nargs='?', help="Clé de catégorie (toutes si absente)")
+    parser.add_argument('--category', dest='category_opt', help="Alias de l'argument positionnel")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"Nombre de workers en parallèle (plafonné à {MAX_WORKERS}, {MAX_HTTP_WORKERS} en backend http)")
+    parser.add_argument('--backend', choices=BACKENDS, default=None,
+                        help="auto (défaut) : HTTP puis navigateur en repli ; browser : Selenium uniquement ; http : sans navigateur")
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                        help="Parseur HTML des pages listing (SCRAPE_PARSER pour la valeur par défaut)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Navigation, parsing et écriture en étages parallèles (--workers navigateurs, backend navigateur)")
+    parser.add_argument('--parse-workers', type=int, default=2,
+                        help="Nombre de threads de parsing en mode --pipeline")
+    parser.add_argument('--parse-processes', type=int, default=None,
+                        help="Parsing dans un pool de N processus (SCRAPE_PARSE_PROCESSES ; 0 = dans le thread de scraping)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profil cProfile par sous-catégorie (.pstats + piles repliées dans SCRAPE_PROFILE_DIR)")
+    parser.add_argument('--restart', action='store_true',
+                        help="Abandonne le run interrompu au lieu de le reprendre (SCRAPE_JOURNAL=0 : sans journal)")
+    args = parser.parse_args(argv)
+    args.category = args.category or args.category_opt
+    # Le pipeline ne sait naviguer qu'avec Chrome : refuser plutôt qu'ignorer un autre backend
+    if args.pipeline and args.backend not in (None, 'browser'):
+        parser.error(f"--pipeline utilise uniquement le navigateur (--backend {args.backend} incompatible)")
+    args.backend = args.backend or 'auto'
+    return args
 
 if __name__ == "__main__":
-    category = sys.argv[1] if len(sys.argv) > 1 else None
-    scrape_action(category) 
\ No newline at end of file
+    args = parse_args()
+    set_default_parser(args.parser)
+    if args.parse_processes is not None:
+        set_parse_processes(args.parse_processes)
+    with profiling('action', args.profile), measure_run('action'):
+        scrape_action(args.category, args.workers, args.backend, args.pipeline, args.parse_workers, args.restart)
@@ -0,0 +1,180 @@
+# --- Orchestrateur : rafraîchit les trois enseignes en parallèle ---
+# Les enseignes visent des hôtes différents : les lancer en même temps ne charge pas davantage un site
+# (le rythme par hôte reste fixé par scrape_scheduler), et le rafraîchissement complet dure à peu près
+# le temps de l'enseigne la plus lente au lieu de la somme des trois.
+#
+# Un plan = une liste d'entrées (enseigne, catégorie, sous-catégorie), mêmes champs que les jobs de
+# scrape_daemon : `python scrape_all.py action:food lidl carrefour` ou `--plan plan.json`
+# ([{"retailer": "action", "category": "food"}, ...]). Sans plan : tout le catalogue des trois enseignes.
+# Budget global : au plus --max-browsers enseignes actives à la fois (une file = un Chrome au plus,
+# fermé dès que l'enseigne est terminée) et un seul pool de parsing partagé (--parse-processes).
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import traceback
+
+from scrape_daemon import RETAILERS, RUNNERS, DB_PATHS, Job
+from scrape_snapshot import publish_snapshot
+from scrape_images import cache_images_if_enabled
+from scrape_catalog import sync_catalog_if_enabled
+from scrape_metrics import measure_run
+from scrape_parsers import set_parse_processes, shutdown_parse_pool
+
+MAX_BROWSERS = int(os.environ.get('SCRAPE_MAX_BROWSERS', len(RETAILERS)))
+
+def parse_entry(spec):
+    # "action", "action:food", "action:food:Snacks"
+    retailer, category, subcategory = (spec.split(':', 2) + [None, None])[:3]
+    return {'retailer': retailer, 'category': category or None, 'subcategory': subcategory or None}
+
+def load_plan(specs=None, plan_path=None):
+    entries = []
+    if plan_path:
+        with open(plan_path, encoding='utf-8') as f:
+            entries.extend(json.load(f))
+    entries.extend(parse_entry(spec) for spec in specs or [])
+    if not entries:
+        entries = [{'retailer': retailer} for retailer in RETAILERS]
+    plan = {}
+    for index, entry in enumerate(entries, start=1):
+        retailer = entry.get('retailer')
+        if retailer not in RETAILERS:
+            raise ValueError(f"Enseigne inconnue '{retailer}' (enseignes : {', '.join(RETAILERS)})")
+        # Plusieurs entrées pour une même enseigne : une seule file, donc un seul navigateur
+        plan.setdefault(retailer, []).append(Job(f"plan-{index}", retailer, entry.get('category') or None,
+                                                 entry.get('subcategory') or None, entry.get('backend'), None))
+    return plan
+
+class Lane:
+    """Étapes d'une enseigne, exécutées en série sur son runner (navigateur gardé entre les étapes)."""
+    def __init__(self, retailer, jobs):
+        self.retailer = retailer
+        self.jobs = jobs
+        self.runner = None
+        self.steps = []
+        self.done = 0
+        self.failed = []
+        self.elapsed = 0.0
+        self.error = None
+
+    def prepare(self):
+        # Construit les étapes (validation du plan) sans lancer de navigateur : LazyDriver
+        self.runner = RUNNERS[self.retailer]()
+        for job in self.jobs:
+            self.steps.extend(self.runner.steps(job))
+
+    def close(self):
+        if self.runner is not None:
+            self.runner.close()
+            self.runner = None
+
+class Orchestrator:
+    def __init__(self, plan, max_browsers=MAX_BROWSERS):
+        self.lanes = [Lane(retailer, jobs) for retailer, jobs in plan.items()]
+        self.max_browsers = max(1, max_browsers)
+        self.lock = threading.Lock()
+        self.pending = list(self.lanes)
+        self.total = 0
+        self.completed = 0
+
+    def next_lane(self):
+        with self.lock:
+            return self.pending.pop(0) if self.pending else None
+
+    def step_finished(self, lane, label, seconds, error=None):
+        with self.lock:
+            lane.done += 1
+            self.completed += 1
+            progress = round(100 * self.completed / max(1, self.total))
+            status = f"échec : {error}" if error else f"{seconds:.1f}s"
+            print(f"[{lane.retailer} {lane.done}/{len(lane.steps)}] {label} : {status}")
+            print(f"PROGRESS: {progress}")
+
+    def run_lane(self, lane):
+        start = time.perf_counter()
+        try:
+            with measure_run(lane.retailer):
+                for label, step in lane.steps:
+                    step_start = time.perf_counter()
+                    try:
+                        step()
+                    except Exception as e:
+                        lane.failed.append(label)
+                        self.step_finished(lane, label, time.perf_counter() - step_start, e)
+                        continue
+                    self.step_finished(lane, label, time.perf_counter() - step_start)
+            # Navigateur libéré avant les images / snapshot : la place revient à l'enseigne suivante
+            lane.close()
+            cache_images_if_enabled(lane.retailer, DB_PATHS[lane.retailer])
+            sync_catalog_if_enabled(lane.retailer, DB_PATHS[lane.retailer])
+            publish_snapshot(lane.retailer, DB_PATHS[lane.retailer])
+        finally:
+            lane.close()
+            lane.elapsed = time.perf_counter() - start
+
+    def worker(self):
+        while True:
+            lane = self.next_lane()
+            if lane is None:
+                return
+            try:
+                self.run_lane(lane)
+            except Exception as e:
+                lane.error = str(e)
+                print(f"LOG: {lane.retailer} interrompu : {e}\n{traceback.format_exc()}")
+
+    def run(self):
+        for lane in self.lanes:
+            lane.prepare()
+        self.total = sum(len(lane.steps) for lane in self.lanes)
+        slots = min(self.max_browsers, len(self.lanes))
+        print(f"Plan : {', '.join(f'{lane.retailer} ({len(lane.steps)} étapes)' for lane in self.lanes)} ; "
+              f"{slots} enseigne(s) en parallèle")
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self.worker, name=f"lane-{index}") for index in range(slots)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.print_summary(time.perf_counter() - start)
+        return all(lane.error is None and not lane.failed for lane in self.lanes)
+
+    def print_summary(self, wall):
+        print(f"\n=== Rafraîchissement complet ({wall:.1f}s) ===")
+        print(f"{'enseigne':<12}{'étapes':>8}{'échecs':>8}{'durée s':>10}")
+        for lane in self.lanes:
+            print(f"{lane.retailer:<12}{len(lane.steps):>8}{len(lane.failed):>8}{lane.elapsed:>10.1f}"
+                  f"{'  (' + lane.error + ')' if lane.error else ''}")
+        serial = sum(lane.elapsed for lane in self.lanes)
+        if wall > 0:
+            print(f"Somme des enseignes : {serial:.1f}s, durée réelle : {wall:.1f}s (x{serial / wall:.2f})")
+        for lane in self.lanes:
+            if lane.failed:
+                print(f"Étapes en échec ({lane.retailer}) : {', '.join(lane.failed)}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scraping de toutes les enseignes en parallèle")
+    parser.add_argument('entries', nargs='*', help="enseigne[:catégorie[:sous-catégorie]] (tout le catalogue si absent)")
+    parser.add_argument('--plan', help="Fichier JSON : liste de {retailer, category, subcategory, backend}")
+    parser.add_argument('--max-browsers', type=int, default=MAX_BROWSERS,
+                        help="Enseignes actives en même temps, donc navigateurs ouverts au plus (SCRAPE_MAX_BROWSERS)")
+    parser.add_argument('--parse-processes', type=int, default=None,
+                        help="Pool de parsing partagé par toutes les enseignes (SCRAPE_PARSE_PROCESSES)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.parse_processes is not None:
+        set_parse_processes(args.parse_processes)
+    try:
+        orchestrator = Orchestrator(load_plan(args.entries, args.plan), args.max_browsers)
+        ok = orchestrator.run()
+    except ValueError as e:
+        print(f"Plan invalide : {e}", file=sys.stderr)
+        sys.exit(2)
+    finally:
+        shutdown_parse_pool()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,141 @@
+# --- Profil de blocage des ressources pour Chrome headless ---
+# Les extracteurs ne lisent que le texte du DOM et les attributs src des images : on coupe le chargement
+# des images (préférence Chrome), des polices, des médias et des domaines de mesure d'audience / pub
+# (blocage réseau DevTools). Une liste blanche par enseigne protège ce dont les pages ont besoin
+# (bannière cookies, API produits...). SCRAPE_BLOCKING=off désactive le profil.
+import os
+import sys
+import json
+import weakref
+
+BLOCKING_PROFILE = os.environ.get('SCRAPE_BLOCKING', 'standard')
+
+FONT_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+MEDIA_PATTERNS = ['*.mp4', '*.webm', '*.m3u8', '*.mp3', '*.ogg']
+TRACKER_PATTERNS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*googleadservices.com*', '*facebook.net*', '*connect.facebook.com*', '*hotjar.com*', '*criteo.com*',
+    '*criteo.net*', '*tiktok.com*', '*pinterest.com*', '*bing.com*', '*clarity.ms*', '*contentsquare.net*',
+    '*abtasty.com*', '*kameleoon.eu*', '*trustcommander.net*', '*tagcommander.com*', '*commander1.com*',
+    '*cookielaw.org*', '*onetrust.com*', '*adnxs.com*', '*taboola.com*', '*outbrain.com*', '*sentry.io*',
+]
+
+PROFILES = {
+    'off': {'images': False, 'patterns': []},
+    'standard': {'images': True, 'patterns': FONT_PATTERNS + MEDIA_PATTERNS + TRACKER_PATTERNS},
+}
+
+# Motifs jamais bloqués pour une enseigne (sous-chaînes comparées aux motifs de blocage)
+RETAILER_ALLOWLISTS = {
+    'action': [],
+    'carrefour': [],
+    # La bannière OneTrust doit se charger pour que accept_cookies() trouve son bouton
+    'lidl': ['cookielaw.org', 'onetrust.com'],
+}
+
+def resolve_profile(profile=None):
+    profile = profile or BLOCKING_PROFILE
+    if profile not in PROFILES:
+        print(f"LOG: profil de blocage '{profile}' inconnu, blocage désactivé")
+        return 'off'
+    return profile
+
+def blocked_patterns(retailer, profile=None):
+    allowlist = RETAILER_ALLOWLISTS.get(retailer, [])
+    return [pattern for pattern in PROFILES[resolve_profile(profile)]['patterns']
+            if not any(allowed in pattern for allowed in allowlist)]
+
+def configure_options(options, retailer, profile=None):
+    """Ajoute aux Options Chrome les préférences du profil et le journal réseau ; renvoie options."""
+    if PROFILES[resolve_profile(profile)]['images']:
+        # 2 = bloquer : les <img> gardent leur src dans le DOM mais ne sont pas téléchargées
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        options.add_argument('--blink-settings=imagesEnabled=false')
+    # Journal "performance" : événements Network lus par resource_report()
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+def apply_blocking(driver, retailer, profile=None):
+    """Active le blocage réseau DevTools sur un driver déjà lancé ; renvoie le driver."""
+    patterns = blocked_patterns(retailer, profile)
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    driver.blocking_profile = resolve_profile(profile)
+    return driver
+
+# Le journal performance se vide à chaque lecture : les événements suivis sont gardés par driver
+# jusqu'à ce qu'un consommateur (rapport ressources, capture JSON) les réclame
+TRACKED_METHODS = ('Network.loadingFailed', 'Network.responseReceived', 'Network.loadingFinished')
+MAX_BACKLOG = 5000
+_backlogs = weakref.WeakKeyDictionary()
+
+def performance_events(driver, methods):
+    """Renvoie (et retire du tampon) les événements DevTools des méthodes demandées, dans l'ordre."""
+    backlog = _backlogs.get(driver, [])
+    try:
+        entries = driver.get_log('performance')
+    except Exception:
+        entries = []
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        if message.get('method') in TRACKED_METHODS:
+            backlog.append(message)
+    taken = [message for message in backlog if message['method'] in methods]
+    _backlogs[driver] = [message for message in backlog if message['method'] not in methods][-MAX_BACKLOG:]
+    return taken
+
+def resource_report(driver):
+    """Requêtes et octets transférés pour la page courante, requêtes bloquées et images non chargées."""
+    loaded = driver.execute_script("""
+        var entries = performance.getEntriesByType('resource');
+        var bytes = 0;
+        entries.forEach(function (e) { bytes += e.transferSize || 0; });
+        var images = Array.from(document.images).filter(function (i) { return i.currentSrc && i.naturalWidth === 0; });
+        return {requests: entries.length, bytes: bytes, skipped_images: images.length};
+    """)
+    blocked = [event for event in performance_events(driver, ('Network.loadingFailed',))
+               if event.get('params', {}).get('blockedReason')]
+    loaded['blocked_requests'] = len(blocked)
+    return loaded
+
+def log_resource_report(driver, label=''):
+    try:
+        report = resource_report(driver)
+    except Exception as e:
+        print(f"LOG: rapport ressources indisponible ({e})")
+        return None
+    print(f"LOG: ressources{' ' + label if label else ''} : {report['requests']} requêtes, "
+          f"{report['bytes'] // 1024} Ko transférés, {report['blocked_requests']} requêtes bloquées, "
+          f"{report['skipped_images']} images non chargées (profil {getattr(driver, 'blocking_profile', 'off')})")
+    return report
+
+def compare_profiles(setup_driver, url, retailer):
+    # Charge la même page sans puis avec blocage : requêtes et octets économisés
+    from scrape_readiness import navigate, wait_for_network_idle
+    reports = {}
+    for profile in ('off', BLOCKING_PROFILE if BLOCKING_PROFILE != 'off' else 'standard'):
+        driver = setup_driver(profile=profile)
+        try:
+            navigate(driver, url)
+            wait_for_network_idle(driver)
+            reports[profile] = resource_report(driver)
+        finally:
+            driver.quit()
+    (_, before), (_, after) = reports.items()
+    print(f"Sans blocage : {before['requests']} requêtes, {before['bytes'] // 1024} Ko")
+    print(f"Avec blocage : {after['requests']} requêtes, {after['bytes'] // 1024} Ko "
+          f"({after['blocked_requests']} bloquées, {after['skipped_images']} images non chargées)")
+    print(f"Économisé : {before['requests'] - after['requests']} requêtes, {(before['bytes'] - after['bytes']) // 1024} Ko")
+    return reports
+
+if __name__ == "__main__":
+    # Usage : python scrape_browser.py <action|carrefour|lidl> <url>
+    if len(sys.argv) != 3 or sys.argv[1] not in RETAILER_ALLOWLISTS:
+        print("Usage : python scrape_browser.py <action|carrefour|lidl> <url>")
+        sys.exit(2)
+    import importlib
+    module = importlib.import_module(f"scrape_{sys.argv[1]}")
+    compare_profiles(module.setup_driver, sys.argv[2], sys.argv[1])
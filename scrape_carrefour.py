@@ -1,17 +1,34 @@
-import time
 import sqlite3
-import sys
-from bs4 import BeautifulSoup
+import argparse
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from scrape_storage import ensure_identity_index, upsert_products, ensure_fingerprint_schema, page_key, fingerprint, page_unchanged, replay_page, record_fingerprint, identity_count, ensure_generation_schema, start_generation, delete_unseen
+from scrape_snapshot import publish_snapshot
+from scrape_images import cache_images_if_enabled
+from scrape_catalog import sync_catalog_if_enabled
+from scrape_search import ensure_search_index
+from scrape_metrics import phase, scope, measure_run
+from scrape_scheduler import scheduler
+from scrape_profile import profiling, profile_scope
+from scrape_browser import configure_options, apply_blocking, log_resource_report
+from scrape_network import JSON_CAPTURE_ENABLED, JsonCapture, find_records, to_float
+from scrape_parsers import ParseScope, parse_html, class_strainer, browser_fragments, extract_records, set_default_parser, set_parse_processes, PARSER_BACKENDS, DEFAULT_PARSER
+from scrape_readiness import navigate, wait_for_cards, wait_for_count_change, scroll_to_bottom, count_elements
 
 # --- Config ---
 DB_PATH = "carrefour_products.sqlite"
 MAX_PAGES = 5
-SLEEP_BETWEEN_PAGES = 5
+CARD_SELECTOR = '.product-list-card-plp-grid'
+# Réponses XHR de "Produits suivants" : même URL de listing /r/... que la page, en JSON:API
+# (produits dans data[].attributes) ; les autres réponses JSON du site (analytics, config) sont ignorées
+JSON_API_PATTERNS = ('www.carrefour.fr/r/',)
+
+# Colonnes écrites par le scraper et identité d'un produit (index UNIQUE)
+PRODUCT_COLUMNS = ('name', 'description', 'promo_price', 'old_price', 'image_url', 'product_url', 'reduction_percent', 'promo_badge', 'soldes_badge', 'category', 'subcategory', 'page_key')
+IDENTITY_KEY = ('name', 'promo_price', 'product_url')
 
 # Configuration des catégories
 CATEGORIES = {
@@ -78,9 +95,9 @@ CATEGORIES = {
 }
 
 # --- Setup Selenium ---
-def setup_driver():
+def setup_driver(profile=None):
     from selenium.webdriver.chrome.service import Service
-    options = Options()
+    options = configure_options(Options(), 'carrefour', profile)
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
@@ -89,7 +106,9 @@ def setup_driver():
     # Indique explicitement le chemin du binaire Chrome
     options.binary_location = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
     service = Service(executable_path='/usr/local/bin/chromedriver')
-    return webdriver.Chrome(service=service, options=options)
+    driver = webdriver.Chrome(service=service, options=options)
+    # Blocage images / polices / traqueurs (SCRAPE_BLOCKING=off pour tout charger)
+    return apply_blocking(driver, 'carrefour', profile)
 
 # --- Setup SQLite ---
 def setup_database():
@@ -114,6 +133,10 @@ def setup_database():
     )
     ''')
     conn.commit()
+    ensure_identity_index(conn, IDENTITY_KEY)
+    ensure_fingerprint_schema(conn)
+    ensure_generation_schema(conn)
+    ensure_search_index(conn)
     return conn, c
 
 # --- Extraction helpers ---
@@ -176,102 +199,213 @@ def extract_product_info(card, category_name, subcategory):
         print(f"Erreur extraction produit: {e}")
         return None
 
-def insert_product(c, prod):
-    # Dédoublonnage sur nom + prix promo + url
-    c.execute('''SELECT id, first_scraped_at FROM products WHERE name=? AND promo_price=? AND product_url=?''', (prod['name'], prod['promo_price'], prod['product_url']))
-    row = c.fetchone()
-    if row:
-        # Produit déjà existant, on met juste à jour scraped_at
-        c.execute('''UPDATE products SET scraped_at=datetime('now') WHERE id=?''', (row[0],))
-        return False
-    # Nouveau produit : on insère avec first_scraped_at = now
-    c.execute('''INSERT INTO products (name, description, promo_price, old_price, image_url, product_url, reduction_percent, promo_badge, soldes_badge, category, subcategory, scraped_at, first_scraped_at)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))''',
-              (prod['name'], prod['description'], prod['promo_price'], prod['old_price'], prod['image_url'], prod['product_url'], prod['reduction_percent'], prod['promo_badge'], prod['soldes_badge'], prod['category'], prod['subcategory']))
-    return True
+# Parsing restreint aux cartes produit (SCRAPE_PARSER pour choisir le backend)
+PARSE_SCOPE = ParseScope(CARD_SELECTOR, class_strainer('product-list-card-plp-grid'))
 
-def scrape_category(category_key, category_config):
-    print(f"\n=== Scraping {category_config['name']} ===")
-    driver = setup_driver()
-    driver.get(category_config['url'])
-    time.sleep(3)
+def extract_products_from_html(html, category_name, subcategory, backend=None):
+    soup = parse_html(html, PARSE_SCOPE, backend)
+    prods = []
+    cards = soup.select(CARD_SELECTOR)
+    with phase('extract', count=len(cards)):
+        for card in cards:
+            prod = extract_product_info(card, category_name, subcategory)
+            if prod:
+                prods.append(prod)
+    return prods
+
+def is_api_product(node):
+    attributes = node.get('attributes')
+    return isinstance(attributes, dict) and 'title' in attributes and ('ean' in attributes or 'offers' in attributes)
+
+# Chemins explicites dans l'offre affichée sur la carte : price.perUnit (prix au kg / litre) et les prix
+# fidélité voisins ne doivent pas être pris pour le prix payé
+API_PRICE_PATH = ('price', 'price')
+API_OLD_PRICE_PATHS = (('price', 'strikethroughPrice'), ('promotion', 'initialPrice'))
+API_BADGE_PATH = ('promotion', 'label')
+API_IMAGE_PATH = ('images', 'largest')
+
+def dig(node, path):
+    for key in path:
+        node = node.get(key) if isinstance(node, dict) else None
+    return node
+
+def api_offer(attributes):
+    # offers : {ean: {id de l'offre: {attributes: {...}}}} ; la première offre est celle de la carte
+    for by_offer in (attributes.get('offers') or {}).values():
+        for offer in (by_offer or {}).values():
+            if isinstance(offer, dict):
+                return offer.get('attributes') or {}
+    return {}
+
+def product_from_api(node, category_name, subcategory):
+    # Même dictionnaire que extract_product_info, à partir d'un produit de l'API JSON (prix exacts)
+    attributes = node['attributes']
+    offer = api_offer(attributes)
+    promo_price = to_float(dig(offer, API_PRICE_PATH))
+    old_price = next((price for price in (to_float(dig(offer, path)) for path in API_OLD_PRICE_PATHS) if price), None)
+    href = dig(node, ('links', 'self')) or (f"/p/{attributes['slug']}-{attributes['ean']}"
+                                             if attributes.get('slug') and attributes.get('ean') else None)
+    reduction_percent = None
+    if promo_price and old_price and old_price > promo_price:
+        reduction_percent = round(((old_price - promo_price) / old_price) * 100)
+    if not attributes.get('title') or promo_price is None:
+        return None
+    return {
+        "name": attributes['title'],
+        "description": attributes.get('packaging') or attributes.get('format') or "",
+        "promo_price": promo_price,
+        "old_price": old_price,
+        "image_url": dig(attributes, API_IMAGE_PATH),
+        "product_url": f"https://www.carrefour.fr{href}" if href and str(href).startswith('/') else href,
+        "reduction_percent": reduction_percent,
+        "promo_badge": dig(offer, API_BADGE_PATH),
+        "soldes_badge": None,
+        "category": category_name,
+        "subcategory": subcategory
+    }
+
+def products_from_payloads(payloads, category_name, subcategory, expected):
+    # Renvoie None (repli DOM) si la capture ne couvre pas exactement les cartes ajoutées
+    prods = []
+    for _, payload in payloads:
+        for node in find_records(payload, is_api_product):
+            prod = product_from_api(node, category_name, subcategory)
+            if prod:
+                prods.append(prod)
+    if len(prods) != expected:
+        if payloads:
+            print(f"API JSON : {len(prods)} produits pour {expected} cartes, repli sur le DOM")
+        return None
+    print(f"Produits lus depuis l'API JSON: {len(prods)}")
+    return prods
+
+def insert_products(conn, prods, generation=None):
+    # Dédoublonnage sur nom + prix promo + url : un produit déjà connu voit juste son scraped_at mis à jour
+    return upsert_products(conn, PRODUCT_COLUMNS, IDENTITY_KEY, prods, generation=generation)
+
+def scrape_category(category_key, category_config, driver=None):
+    # driver fourni par l'appelant (run complet, démon) : réutilisé et laissé ouvert
+    with scope(category=category_config['name']), profile_scope(category_config['name']):
+        print(f"\n=== Scraping {category_config['name']} ===")
+        own_driver = driver is None
+        driver = driver or setup_driver()
+        navigate(driver, category_config['url'])
     
-    conn, c = setup_database()
-    total_inserted = 0
-    scraped_keys = set()
+        conn, c = setup_database()
+        total_inserted = 0
+        generation = start_generation(conn, f"carrefour:{category_config['name']}")
+        seen_cards = 0
+        # La page 1 est rendue côté serveur ; les suivantes arrivent par XHR JSON, capturées ici
+        capture = JsonCapture(driver, JSON_API_PATTERNS) if JSON_CAPTURE_ENABLED else None
     
-    for page in range(1, MAX_PAGES + 1):
-        print(f"\n--- Page {page}/{MAX_PAGES} ---")
-        # Attendre chargement produits
-        try:
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, ".product-list-card-plp-grid")))
-        except:
-            print("Aucun produit trouvé sur cette page")
-            break
+        for page in range(1, MAX_PAGES + 1):
+            print(f"\n--- Page {page}/{MAX_PAGES} ---")
+            # Attendre chargement produits
+            try:
+                wait_for_cards(driver, CARD_SELECTOR, timeout=10)
+            except:
+                print("Aucun produit trouvé sur cette page")
+                break
                 
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        cards = soup.select('.product-list-card-plp-grid')
-        print(f"Produits trouvés: {len(cards)}")
+            # "Produits suivants" cumule les cartes : seule la tranche ajoutée depuis la page précédente est traitée
+            fragments = browser_fragments(driver, CARD_SELECTOR)
+            new_fragments = fragments[seen_cards:]
+            seen_cards = len(fragments)
+            key = page_key(category_config['url'], page)
+            page_fingerprint = fingerprint(new_fragments)
+            if page_unchanged(conn, key, page_fingerprint):
+                replayed = replay_page(conn, key, generation)
+                print(f"Page inchangée depuis le dernier passage ({replayed} produits), parsing ignoré")
+                inserted = 0
+            else:
+                prods = None
+                if capture is not None and page > 1:
+                    prods = products_from_payloads(capture.collect(), category_config['name'], category_config['subcategory'], len(new_fragments))
+                if prods is None:
+                    prods = extract_records(extract_products_from_html, ''.join(new_fragments), category_config['name'],
+                                            category_config['subcategory'])
+                print(f"Produits trouvés: {len(prods)}")
+            
+                for prod in prods:
+                    prod['page_key'] = key
+                inserted = insert_products(conn, prods, generation)
+                record_fingerprint(conn, key, page_fingerprint, identity_count(prods, IDENTITY_KEY))
         
-        inserted = 0
-        for card in cards:
-            prod = extract_product_info(card, category_config['name'], category_config['subcategory'])
-            if prod:
-                key = (prod['name'], prod['promo_price'], prod['product_url'])
-                scraped_keys.add(key)
-                if insert_product(c, prod):
-                    inserted += 1
-                    conn.commit()
+            total_inserted += inserted
+            print(f"Produits insérés: {inserted}")
+            log_resource_report(driver, f"page {page}")
         
-        total_inserted += inserted
-        print(f"Produits insérés: {inserted}")
-        
-        # Pagination : cliquer sur "Produits suivants" si pas dernière page
-        if page < MAX_PAGES:
-            try:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                btn = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[span[contains(text(), 'Produits suivants')]]"))
-                )
-                print(f"Attente {SLEEP_BETWEEN_PAGES}s avant page suivante...")
-                time.sleep(SLEEP_BETWEEN_PAGES)
-                driver.execute_script("arguments[0].click();", btn)
-                time.sleep(3)
-            except Exception as e:
-                print(f"Impossible de charger plus de produits: {e}")
-                break
-    # Suppression des produits disparus (en Python)
-    print(f"Nettoyage : suppression des produits absents de la catégorie '{category_config['name']}'...")
-    c.execute("SELECT id, name, promo_price, product_url FROM products WHERE category=?", (category_config['name'],))
-    all_db = c.fetchall()
-    to_delete = [row[0] for row in all_db if (row[1], row[2], row[3]) not in scraped_keys]
-    if to_delete:
-        c.executemany("DELETE FROM products WHERE id=?", [(i,) for i in to_delete])
-        conn.commit()
-        print(f"Produits supprimés : {len(to_delete)}")
-    else:
-        print("Aucun produit à supprimer.")
-    driver.quit()
-    conn.close()
-    print(f"\nScraping {category_config['name']} terminé. Total produits insérés: {total_inserted}")
-    return total_inserted
+            # Pagination : cliquer sur "Produits suivants" si pas dernière page
+            if page < MAX_PAGES:
+                try:
+                    scroll_to_bottom(driver)
+                    btn = WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.XPATH, "//button[span[contains(text(), 'Produits suivants')]]"))
+                    )
+                    cards_before = count_elements(driver, CARD_SELECTOR)
+                    if capture is not None:
+                        capture.discard()
+                    scheduler.acquire(category_config['url'])
+                    driver.execute_script("arguments[0].click();", btn)
+                    # "Produits suivants" ajoute des cartes à la grille : on attend que leur nombre change
+                    wait_for_count_change(driver, CARD_SELECTOR, cards_before)
+                except Exception as e:
+                    print(f"Impossible de charger plus de produits: {e}")
+                    break
+        # Suppression des produits disparus : un seul DELETE sur les lignes non tamponnées par ce passage
+        print(f"Nettoyage : suppression des produits absents de la catégorie '{category_config['name']}'...")
+        removed = delete_unseen(conn, generation, category_config['name'])
+        if removed:
+            print(f"Produits supprimés : {removed}")
+        else:
+            print("Aucun produit à supprimer.")
+        if own_driver:
+            driver.quit()
+        conn.close()
+        print(f"\nScraping {category_config['name']} terminé. Total produits insérés: {total_inserted}")
+        return total_inserted
 
 def scrape_carrefour(category=None):
     if category and category not in CATEGORIES:
         print(f"Catégorie '{category}' non trouvée. Catégories disponibles: {list(CATEGORIES.keys())}")
         return
     
-    if category:
-        # Scraper une seule catégorie
-        scrape_category(category, CATEGORIES[category])
-    else:
-        # Scraper toutes les catégories sauf 'toys' (Jeux et Jouets)
-        for cat_key, cat_config in CATEGORIES.items():
-            if cat_key != 'toys':  # Éviter de rescraper Jeux et Jouets
-                scrape_category(cat_key, cat_config)
-                time.sleep(10)  # Pause entre les catégories
+    # Un seul Chrome pour tout le run
+    driver = setup_driver()
+    try:
+        if category:
+            # Scraper une seule catégorie
+            scrape_category(category, CATEGORIES[category], driver)
+        else:
+            # Scraper toutes les catégories sauf 'toys' (Jeux et Jouets)
+            for cat_key, cat_config in CATEGORIES.items():
+                if cat_key != 'toys':  # Éviter de rescraper Jeux et Jouets
+                    scrape_category(cat_key, cat_config, driver)
+    finally:
+        driver.quit()
+    cache_images_if_enabled('carrefour', DB_PATH)
+    sync_catalog_if_enabled('carrefour', DB_PATH)
+    # Snapshot JSON trié + compressé servi par server.js à la place du SELECT complet
+    publish_snapshot('carrefour', DB_PATH)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scraping des produits Carrefour")
+    parser.add_argument('category', nargs='?', help="Clé de catégorie (toutes sauf 'toys' si absente)")
+    parser.add_argument('--category', dest='category_opt', help="Alias de l'argument positionnel")
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                        help="Parseur HTML des pages listing (SCRAPE_PARSER pour la valeur par défaut)")
+    parser.add_argument('--parse-processes', type=int, default=None,
+                        help="Parsing dans un pool de N processus (SCRAPE_PARSE_PROCESSES ; 0 = dans le thread de scraping)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profil cProfile par sous-catégorie (.pstats + piles repliées dans SCRAPE_PROFILE_DIR)")
+    args = parser.parse_args(argv)
+    args.category = args.category or args.category_opt
+    return args
 
 if __name__ == "__main__":
-    category = sys.argv[1] if len(sys.argv) > 1 else None
-    scrape_carrefour(category) 
\ No newline at end of file
+    args = parse_args()
+    set_default_parser(args.parser)
+    if args.parse_processes is not None:
+        set_parse_processes(args.parse_processes)
+    with profiling('carrefour', args.profile), measure_run('carrefour'):
+        scrape_carrefour(args.category)
@@ -0,0 +1,278 @@
+# --- Catalogue unifié des trois enseignes (catalog.sqlite) ---
+# Un schéma produit commun (prix courant / ancien prix / prix FCFA entier / réduction), des tables de
+# dimension retailers et categories référencées par clé entière (le couple catégorie / sous-catégorie
+# n'est plus répété sur chaque ligne) et des index couvrants pour les listes courantes (par enseigne,
+# par catégorie, plus récents, plus fortes réductions).
+# Périmètre : le catalogue est une projection en lecture, pas le stockage des scrapers. Les bases par
+# enseigne restent le chemin d'écriture (générations, empreintes de pages, journal, index plein texte,
+# cache d'images et snapshots en dépendent) ; en fin de run, l'adaptateur de l'enseigne y projette sa
+# base (upsert ensembliste via ATTACH, suppression des produits disparus). Une ligne du catalogue est
+# rattachée à la ligne source par (retailer_id, source_id) : l'upsert des scrapers conserve l'id d'un
+# produit existant, un produit supprimé puis revu revient comme une nouvelle ligne.
+# Les vues action_products, carrefour_products et lidl_products reproduisent les anciennes tables pour
+# les lecteurs qui passeraient au catalogue. SCRAPE_CATALOG=1 active la synchronisation en fin de
+# scraping (désactivée par défaut : aucun lecteur ne l'utilise encore) ; python scrape_catalog.py
+# la lance à la main.
+import os
+import sys
+import time
+import sqlite3
+
+from scrape_snapshot import RETAILERS
+from scrape_metrics import phase
+
+CATALOG_ENABLED = os.environ.get('SCRAPE_CATALOG', '0') == '1'
+CATALOG_PATH = os.environ.get('SCRAPE_CATALOG_DB', 'catalog.sqlite')
+EURO_TO_FCFA = 655.957
+
+# Colonnes des cartes de liste : incluses dans les index pour que les listes soient lues sans la table
+LISTING_COLUMNS = ('name', 'price', 'price_fcfa', 'reduction_percent', 'image_url', 'product_url')
+PRODUCT_COLUMNS = ('name', 'brand', 'description', 'price', 'old_price', 'price_fcfa', 'reduction_percent',
+                   'image_url', 'image_path', 'product_url', 'is_new', 'extra', 'first_scraped_at', 'scraped_at')
+# Index couvrants des listes : filtre d'égalité, puis clé de tri complète (départage par id compris,
+# pour que ORDER BY ... LIMIT lise l'index dans l'ordre sans tri), puis les colonnes lues par
+# list_products et ses jointures (retailer_id, category_id)
+CATALOG_INDEXES = {
+    'ix_catalog_newest': f"products (first_scraped_at DESC, id DESC, retailer_id, category_id, {', '.join(LISTING_COLUMNS)})",
+    'ix_catalog_retailer_newest': f"products (retailer_id, first_scraped_at DESC, id DESC, category_id, {', '.join(LISTING_COLUMNS)})",
+    'ix_catalog_category_newest': f"products (retailer_id, category_id, first_scraped_at DESC, id DESC, {', '.join(LISTING_COLUMNS)})",
+    'ix_catalog_retailer_reduction': (f"products (retailer_id, reduction_percent DESC, id DESC, category_id, first_scraped_at, "
+                                      f"{', '.join(LISTING_COLUMNS)}) WHERE reduction_percent > 0"),
+}
+ORDERS = {
+    'newest': 'p.first_scraped_at DESC, p.id DESC',
+    'reduction': 'p.reduction_percent DESC, p.id DESC',
+}
+
+# --- Adaptateurs : expression SQL de chaque colonne commune à partir de la table products de l'enseigne ---
+# `available` = colonnes présentes dans la base source (image_path n'existe qu'après scrape_images)
+
+def source_column(available, column):
+    return f"p.{column}" if column in available else 'NULL'
+
+def adapt_action(available):
+    return {
+        'brand': 'NULL',
+        'price': 'p.price',
+        'old_price': 'NULL',
+        'price_fcfa': 'p.price_fcfa',
+        'reduction_percent': 'NULL',
+        'is_new': f"IFNULL({source_column(available, 'is_new')}, 0)",
+        'extra': 'NULL',
+    }
+
+def adapt_carrefour(available):
+    return {
+        'brand': 'NULL',
+        'price': 'p.promo_price',
+        'old_price': 'p.old_price',
+        'price_fcfa': f"CAST(p.promo_price * {EURO_TO_FCFA} AS INTEGER)",
+        'reduction_percent': 'p.reduction_percent',
+        'is_new': '0',
+        'extra': "json_object('promo_badge', p.promo_badge, 'soldes_badge', p.soldes_badge)",
+    }
+
+def adapt_lidl(available):
+    return {
+        'brand': 'p.brand',
+        'price': 'p.price',
+        'old_price': 'NULL',
+        'price_fcfa': 'CAST(p.price_fcfa AS INTEGER)',
+        'reduction_percent': 'NULL',
+        'is_new': '0',
+        'extra': ("json_object('rating', p.rating, 'rating_count', p.rating_count, 'rendered_date', p.rendered_date, "
+                  "'product_id', p.product_id, 'category_from_data', p.category_from_data)"),
+    }
+
+ADAPTERS = {'action': adapt_action, 'carrefour': adapt_carrefour, 'lidl': adapt_lidl}
+
+def adapter_expressions(retailer, available):
+    expressions = {column: source_column(available, column)
+                   for column in ('name', 'description', 'image_url', 'image_path', 'product_url',
+                                  'first_scraped_at', 'scraped_at')}
+    expressions.update(ADAPTERS[retailer](available))
+    return [expressions[column] for column in PRODUCT_COLUMNS]
+
+# --- Vues de compatibilité : mêmes noms de colonnes que les anciennes tables products ---
+LEGACY_VIEWS = {
+    'action': '''SELECT p.source_id AS id, p.name, p.description, p.price, p.price_fcfa, p.image_url, p.product_url,
+                        k.name AS category, k.subcategory, p.scraped_at, p.first_scraped_at, p.is_new, p.image_path''',
+    'carrefour': '''SELECT p.source_id AS id, p.name, p.description, p.price AS promo_price, p.old_price, p.image_url,
+                           p.product_url, p.reduction_percent, json_extract(p.extra, '$.promo_badge') AS promo_badge,
+                           json_extract(p.extra, '$.soldes_badge') AS soldes_badge, k.name AS category, k.subcategory,
+                           p.scraped_at, p.first_scraped_at, p.image_path''',
+    'lidl': '''SELECT p.source_id AS id, p.name, p.brand, p.description, p.price, p.price_fcfa, p.image_url, p.product_url,
+                      json_extract(p.extra, '$.rating') AS rating, json_extract(p.extra, '$.rating_count') AS rating_count,
+                      json_extract(p.extra, '$.rendered_date') AS rendered_date, json_extract(p.extra, '$.product_id') AS product_id,
+                      k.name AS category, k.subcategory, json_extract(p.extra, '$.category_from_data') AS category_from_data,
+                      p.scraped_at, p.first_scraped_at, p.image_path''',
+}
+
+def ensure_catalog_schema(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS retailers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT UNIQUE NOT NULL,
+        synced_at TEXT
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        retailer_id INTEGER NOT NULL REFERENCES retailers (id),
+        name TEXT NOT NULL,
+        subcategory TEXT NOT NULL,
+        UNIQUE (retailer_id, name, subcategory)
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        retailer_id INTEGER NOT NULL REFERENCES retailers (id),
+        category_id INTEGER NOT NULL REFERENCES categories (id),
+        source_id INTEGER NOT NULL,
+        name TEXT,
+        brand TEXT,
+        description TEXT,
+        price REAL,
+        old_price REAL,
+        price_fcfa INTEGER,
+        reduction_percent INTEGER,
+        image_url TEXT,
+        image_path TEXT,
+        product_url TEXT,
+        is_new INTEGER DEFAULT 0,
+        extra TEXT,
+        first_scraped_at TEXT,
+        scraped_at TEXT,
+        UNIQUE (retailer_id, source_id)
+    )''')
+    for name, definition in CATALOG_INDEXES.items():
+        ensure_index(conn, name, definition)
+    for retailer, select in LEGACY_VIEWS.items():
+        conn.execute(f'DROP VIEW IF EXISTS {retailer}_products')
+        conn.execute(f'''CREATE VIEW {retailer}_products AS {select}
+                         FROM products p JOIN categories k ON k.id = p.category_id
+                         JOIN retailers r ON r.id = p.retailer_id WHERE r.code = '{retailer}' ''')
+    conn.commit()
+
+def ensure_index(conn, name, definition):
+    # Définition modifiée depuis la création de la base : l'index est reconstruit
+    sql = f'CREATE INDEX {name} ON {definition}'
+    current = conn.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name=?", (name,)).fetchone()
+    if current is not None and current[0] == sql:
+        return
+    if current is not None:
+        conn.execute(f'DROP INDEX {name}')
+    conn.execute(sql)
+
+def open_catalog(path=None):
+    conn = sqlite3.connect(path or CATALOG_PATH, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    ensure_catalog_schema(conn)
+    return conn
+
+def retailer_id(conn, retailer):
+    conn.execute('INSERT OR IGNORE INTO retailers (code) VALUES (?)', (retailer,))
+    return conn.execute('SELECT id FROM retailers WHERE code=?', (retailer,)).fetchone()[0]
+
+def sync_retailer(conn, retailer, db_path=None):
+    """Projette la base de l'enseigne dans le catalogue ; renvoie (lignes écrites, lignes supprimées)."""
+    conn.execute('ATTACH DATABASE ? AS src', (db_path or RETAILERS[retailer]['db'],))
+    try:
+        available = {row[1] for row in conn.execute('PRAGMA src.table_info(products)')}
+        if not available:
+            print(f"LOG: pas de table products dans la base {retailer}, catalogue inchangé")
+            return 0, 0
+        expressions = adapter_expressions(retailer, available)
+        with phase('db_write'):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rid = retailer_id(conn, retailer)
+                conn.execute('''INSERT OR IGNORE INTO categories (retailer_id, name, subcategory)
+                                SELECT DISTINCT ?, IFNULL(category, ''), IFNULL(subcategory, '') FROM src.products''', (rid,))
+                before = conn.total_changes
+                # Les lignes inchangées ne sont pas réécrites (WHERE de l'upsert) : pas de pages WAL inutiles
+                changed = ' OR '.join(f"products.{column} IS NOT excluded.{column}" for column in ('category_id',) + PRODUCT_COLUMNS)
+                conn.execute(f'''INSERT INTO products (retailer_id, category_id, source_id, {', '.join(PRODUCT_COLUMNS)})
+                                 SELECT ?, k.id, p.id, {', '.join(expressions)}
+                                 FROM src.products p JOIN categories k ON k.retailer_id = ?
+                                     AND k.name = IFNULL(p.category, '') AND k.subcategory = IFNULL(p.subcategory, '')
+                                 WHERE true
+                                 ON CONFLICT (retailer_id, source_id) DO UPDATE SET category_id=excluded.category_id,
+                                     {', '.join(f"{column}=excluded.{column}" for column in PRODUCT_COLUMNS)}
+                                 WHERE {changed}''', (rid, rid))
+                written = conn.total_changes - before
+                removed = conn.execute('''DELETE FROM products WHERE retailer_id = ?
+                                          AND source_id NOT IN (SELECT id FROM src.products)''', (rid,)).rowcount
+                conn.execute('''DELETE FROM categories WHERE retailer_id = ?
+                                AND id NOT IN (SELECT category_id FROM products WHERE retailer_id = ?)''', (rid, rid))
+                conn.execute("UPDATE retailers SET synced_at=datetime('now') WHERE id=?", (rid,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return written, removed
+    finally:
+        conn.execute('DETACH DATABASE src')
+
+def sync_catalog(retailer, db_path=None, catalog_path=None):
+    start = time.perf_counter()
+    conn = open_catalog(catalog_path)
+    try:
+        written, removed = sync_retailer(conn, retailer, db_path)
+        conn.execute('PRAGMA optimize')
+    finally:
+        conn.close()
+    print(f"Catalogue {retailer} synchronisé : {written} produits écrits, {removed} supprimés "
+          f"({time.perf_counter() - start:.2f}s)")
+    return written, removed
+
+def sync_catalog_if_enabled(retailer, db_path=None):
+    if not CATALOG_ENABLED:
+        return None
+    try:
+        return sync_catalog(retailer, db_path)
+    except sqlite3.Error as e:
+        # Le catalogue est une projection : un échec ne remet pas en cause le run de l'enseigne
+        print(f"LOG: synchronisation du catalogue {retailer} impossible : {e}")
+        return None
+
+def list_products(conn, retailer=None, category=None, subcategory=None, order='newest', limit=50, offset=0):
+    """Liste de cartes produit (colonnes LISTING_COLUMNS) lue dans l'ordre d'un index couvrant.
+
+    Sans tri : toutes enseignes / plus récents, une enseigne (éventuellement une catégorie ou une
+    sous-catégorie) / plus récents ou plus fortes réductions. Les autres combinaisons trient.
+    """
+    where, params = [], []
+    retailer_key = '(SELECT id FROM retailers WHERE code = ?)'
+    if retailer is not None:
+        where.append(f'p.retailer_id = {retailer_key}')
+        params.append(retailer)
+    if category is not None:
+        scope = 'name = ?' + (' AND subcategory = ?' if subcategory is not None else '')
+        scope_params = [category] + ([subcategory] if subcategory is not None else [])
+        if retailer is not None:
+            scope += f' AND retailer_id = {retailer_key}'
+            scope_params.append(retailer)
+        # Une sous-catégorie d'une enseigne = une seule clé : égalité, donc ix_catalog_category_newest
+        single = retailer is not None and subcategory is not None
+        where.append(f"p.category_id {'=' if single else 'IN'} (SELECT id FROM categories WHERE {scope})")
+        params += scope_params
+    if order == 'reduction':
+        where.append('p.reduction_percent > 0')
+    sql = f'''SELECT p.id, r.code AS retailer, k.name AS category, k.subcategory, p.first_scraped_at,
+                     {', '.join('p.' + column for column in LISTING_COLUMNS)}
+              FROM products p JOIN retailers r ON r.id = p.retailer_id JOIN categories k ON k.id = p.category_id
+              {'WHERE ' + ' AND '.join(where) if where else ''}
+              ORDER BY {ORDERS[order]} LIMIT ? OFFSET ?'''
+    cursor = conn.execute(sql, params + [limit, offset])
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+if __name__ == "__main__":
+    # Usage : python scrape_catalog.py [action|carrefour|lidl ...] — (re)synchronise le catalogue
+    retailers = sys.argv[1:] or list(RETAILERS)
+    for name in retailers:
+        if name not in RETAILERS:
+            print(f"Enseigne inconnue '{name}', choix possibles : {list(RETAILERS)}")
+            sys.exit(2)
+        if not os.path.exists(RETAILERS[name]['db']):
+            print(f"Base {RETAILERS[name]['db']} absente, catalogue {name} ignoré")
+            continue
+        sync_catalog(name)
@@ -0,0 +1,281 @@
+# --- Service de scraping résident : Chrome gardé chaud + file de jobs JSON sur stdin ---
+# Lancé une fois (par server.js avec SCRAPER_DAEMON=1, ou à la main), il évite à chaque demande
+# le démarrage de Python, l'import de Selenium/bs4 et le lancement de Chrome à froid.
+#
+# Protocole : une ligne JSON par message.
+#   entrée : {"id": "42", "retailer": "action", "category": "food", "subcategory": null}
+#            {"op": "shutdown"}
+#   sortie : {"event": "queued" | "started" | "log" | "progress" | "done" | "error",
+#             "job": "<id du job>", "ids": ["<ids des demandes abonnées>"], ...}
+# Une demande identique (enseigne, catégorie, sous-catégorie) à un job en file ou en cours n'est pas
+# relancée : elle s'abonne au job existant. Une file et un Chrome par enseigne : les enseignes
+# tournent en parallèle, les jobs d'une même enseigne passent en série sur le même navigateur.
+import io
+import sys
+import json
+import queue
+import threading
+import traceback
+
+import scrape_action
+import scrape_carrefour
+import scrape_lidl
+from scrape_http import make_session
+from scrape_snapshot import publish_snapshot
+from scrape_images import cache_images_if_enabled
+from scrape_catalog import sync_catalog_if_enabled
+from scrape_metrics import scope, measure_run
+
+RETAILERS = ('action', 'carrefour', 'lidl')
+
+class EventWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps(dict(event=event, **fields), ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+class Job:
+    def __init__(self, request_id, retailer, category, subcategory, backend, writer):
+        self.id = request_id
+        self.ids = [request_id]
+        self.retailer = retailer
+        self.category = category
+        self.subcategory = subcategory
+        self.backend = backend
+        self.writer = writer
+
+    @property
+    def key(self):
+        return (self.retailer, self.category, self.subcategory)
+
+    def emit(self, event, **fields):
+        self.writer.emit(event, job=self.id, ids=list(self.ids), **fields)
+
+class JobOutput(io.TextIOBase):
+    # Remplace sys.stdout : les print des scrapers deviennent des événements log du job
+    # exécuté par le thread courant ("PROGRESS: n" devient un événement progress)
+    def __init__(self, writer):
+        self.writer = writer
+        self.jobs = {}
+        self.buffers = {}
+
+    def bind(self, job):
+        self.jobs[threading.get_ident()] = job
+
+    def unbind(self):
+        ident = threading.get_ident()
+        self.jobs.pop(ident, None)
+        self.buffers.pop(ident, None)
+
+    def write(self, text):
+        ident = threading.get_ident()
+        *lines, rest = (self.buffers.get(ident, '') + text).split('\n')
+        self.buffers[ident] = rest
+        job = self.jobs.get(ident)
+        for line in lines:
+            if not line.strip():
+                continue
+            event, fields = 'log', {'line': line}
+            if line.startswith('PROGRESS:'):
+                event, fields = 'progress', {'value': line[len('PROGRESS:'):].strip()}
+            if job is not None:
+                job.emit(event, **fields)
+            else:
+                self.writer.emit(event, job=None, ids=[], **fields)
+        return len(text)
+
+    def flush(self):
+        pass
+
+# --- Exécution des jobs : chaque enseigne découpe son job en étapes (une sous-catégorie / catégorie) ---
+
+class ActionRunner:
+    def __init__(self):
+        self.lazy_driver = scrape_action.LazyDriver()
+        self.session = make_session()
+
+    def steps(self, job):
+        categories = scrape_action.CATEGORIES
+        if job.category and job.category not in categories:
+            raise ValueError(f"Catégorie '{job.category}' non trouvée. Catégories disponibles: {list(categories)}")
+        steps = []
+        if not job.category:
+            steps.append(('Nouveautés', self.nouveautes))
+        for cat_name, subcategory, url in scrape_action.subcategory_jobs(job.category):
+            if job.subcategory and subcategory != job.subcategory:
+                continue
+            steps.append((subcategory, lambda cat_name=cat_name, subcategory=subcategory, url=url:
+                          self.subcategory(job.backend, url, cat_name, subcategory)))
+        if job.subcategory and len(steps) == 0:
+            raise ValueError(f"Sous-catégorie '{job.subcategory}' non trouvée")
+        return steps
+
+    def nouveautes(self):
+        conn, c = scrape_action.setup_database()
+        try:
+            with scope(category='Nouveautés'):
+                scrape_action.scrape_nouveautes(self.lazy_driver.get(), conn, c)
+        finally:
+            conn.close()
+
+    def subcategory(self, backend, url, cat_name, subcategory):
+        conn, c = scrape_action.setup_database()
+        try:
+            return scrape_action.scrape_subcategory_with_backend(backend or 'auto', self.session, self.lazy_driver,
+                                                                 url, cat_name, subcategory, conn, c)
+        finally:
+            conn.close()
+
+    def close(self):
+        self.lazy_driver.quit()
+        self.session.close()
+
+class CarrefourRunner:
+    def __init__(self):
+        self.lazy_driver = scrape_action.LazyDriver(scrape_carrefour.setup_driver)
+
+    def steps(self, job):
+        categories = scrape_carrefour.CATEGORIES
+        if job.category and job.category not in categories:
+            raise ValueError(f"Catégorie '{job.category}' non trouvée. Catégories disponibles: {list(categories)}")
+        # Comme scrape_carrefour() : toutes les catégories sauf 'toys' si aucune n'est précisée
+        keys = [job.category] if job.category else [key for key in categories if key != 'toys']
+        return [(categories[key]['name'], lambda key=key: scrape_carrefour.scrape_category(
+                    key, categories[key], self.lazy_driver.get())) for key in keys]
+
+    def close(self):
+        self.lazy_driver.quit()
+
+class LidlRunner:
+    def __init__(self):
+        self.lazy_driver = scrape_action.LazyDriver(lambda: scrape_lidl.accept_cookies(scrape_lidl.setup_driver()))
+
+    def steps(self, job):
+        # category (ou subcategory) : nom d'une sous-catégorie de SUBCATEGORY_LINKS ; 'all' ou absent = toutes
+        wanted = job.subcategory or (job.category if job.category not in (None, 'all') else None)
+        links = [(name, url) for name, url in scrape_lidl.SUBCATEGORY_LINKS if wanted in (None, name)]
+        if not links:
+            raise ValueError(f"Sous-catégorie Lidl '{wanted}' non trouvée")
+        return [(name, lambda name=name, url=url: scrape_lidl.scrape_lidl_subcategory(
+                    self.lazy_driver.get(), url, [scrape_lidl.MAIN_CATEGORY, name])) for name, url in links]
+
+    def close(self):
+        self.lazy_driver.quit()
+
+RUNNERS = {'action': ActionRunner, 'carrefour': CarrefourRunner, 'lidl': LidlRunner}
+DB_PATHS = {'action': scrape_action.DB_PATH, 'carrefour': scrape_carrefour.DB_PATH, 'lidl': scrape_lidl.DB_PATH}
+
+class ScraperDaemon:
+    def __init__(self, writer, output):
+        self.writer = writer
+        self.output = output
+        self.queues = {retailer: queue.Queue() for retailer in RETAILERS}
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.threads = [threading.Thread(target=self.worker, args=(retailer,), daemon=True) for retailer in RETAILERS]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, request):
+        request_id = str(request.get('id') or f"auto-{self.next_id}")
+        self.next_id += 1
+        retailer = request.get('retailer')
+        if retailer not in RETAILERS:
+            self.writer.emit('error', job=None, ids=[request_id], message=f"Enseigne inconnue '{retailer}'")
+            self.writer.emit('done', job=None, ids=[request_id], ok=False)
+            return
+        job = Job(request_id, retailer, request.get('category') or None, request.get('subcategory') or None,
+                  request.get('backend'), self.writer)
+        with self.lock:
+            existing = self.pending.get(job.key)
+            if existing is not None:
+                existing.ids.append(request_id)
+                existing.emit('queued', deduplicated=True)
+                return
+            self.pending[job.key] = job
+            self.queues[retailer].put(job)
+            job.emit('queued', position=self.queues[retailer].qsize())
+
+    def worker(self, retailer):
+        runner = RUNNERS[retailer]()
+        try:
+            while True:
+                job = self.queues[retailer].get()
+                if job is None:
+                    break
+                self.run(runner, job)
+        finally:
+            runner.close()
+
+    def run(self, runner, job):
+        self.output.bind(job)
+        ok = True
+        try:
+            # Chrome gardé chaud mais vérifié : un navigateur mort est relancé au prochain get()
+            if runner.lazy_driver.driver is not None and not runner.lazy_driver.alive():
+                print("LOG: navigateur indisponible, relance au prochain besoin")
+                runner.lazy_driver.quit()
+            steps = runner.steps(job)
+            job.emit('started', steps=len(steps))
+            with measure_run(job.retailer):
+                for index, (label, step) in enumerate(steps, start=1):
+                    try:
+                        step()
+                    except Exception as e:
+                        ok = False
+                        job.emit('error', step=label, message=str(e))
+                    print(f"PROGRESS: {round(100 * index / len(steps))}")
+            cache_images_if_enabled(job.retailer, DB_PATHS[job.retailer])
+            sync_catalog_if_enabled(job.retailer, DB_PATHS[job.retailer])
+            publish_snapshot(job.retailer, DB_PATHS[job.retailer])
+        except Exception as e:
+            ok = False
+            job.emit('error', message=str(e), trace=traceback.format_exc())
+        finally:
+            sys.stdout.flush()
+            self.output.unbind()
+            with self.lock:
+                self.pending.pop(job.key, None)
+            job.emit('done', ok=ok)
+
+    def shutdown(self):
+        # Les jobs déjà en file sont terminés avant l'arrêt des navigateurs
+        for retailer in RETAILERS:
+            self.queues[retailer].put(None)
+        for thread in self.threads:
+            thread.join()
+
+def main(stdin=None, stdout=None):
+    writer = EventWriter(stdout or sys.stdout)
+    output = JobOutput(writer)
+    sys.stdout = output
+    daemon = ScraperDaemon(writer, output)
+    daemon.start()
+    writer.emit('ready', job=None, ids=[], retailers=list(RETAILERS))
+    try:
+        for line in (stdin or sys.stdin):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                writer.emit('error', job=None, ids=[], message=f"JSON invalide : {e}")
+                continue
+            if request.get('op') == 'shutdown':
+                break
+            daemon.submit(request)
+    finally:
+        daemon.shutdown()
+        sys.stdout = sys.__stdout__
+
+if __name__ == "__main__":
+    main()
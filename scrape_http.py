@@ -0,0 +1,31 @@
+# --- Backend HTTP sans navigateur (pages listing rendues côté serveur) ---
+import requests
+from scrape_scheduler import scheduler, retry_after_seconds
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+HTTP_TIMEOUT = 15
+
+def make_session(pool_size=10):
+    # Session keep-alive avec pool de connexions ; requests décompresse gzip/deflate automatiquement
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=(500, 502, 503, 504), allowed_methods=('GET',))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'fr-FR,fr;q=0.9',
+        'Accept-Encoding': 'gzip, deflate',
+    })
+    return session
+
+def fetch_html(session, url, timeout=HTTP_TIMEOUT):
+    scheduler.acquire(url)
+    response = session.get(url, timeout=timeout)
+    # 429 / 403 : l'hôte est ralenti pour tous les workers (Retry-After respecté)
+    scheduler.report(url, response.status_code, retry_after=retry_after_seconds(response.headers.get('Retry-After')))
+    response.raise_for_status()
+    return response.text
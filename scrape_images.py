@@ -0,0 +1,155 @@
+# --- Cache local des images produit, adressé par contenu ---
+# En fin de run, les images des produits nouveaux ou dont image_url a changé sont téléchargées
+# (session HTTP à pool de connexions, concurrence bornée), nommées par le sha256 de leur contenu
+# (une même image servie sous plusieurs URL n'est stockée qu'une fois) et, si Pillow est installé,
+# réduites aux tailles de vignette. image_path (relatif à IMAGE_DIR) est enregistré à côté de image_url ;
+# server.js sert IMAGE_DIR sous /images. Les fichiers plus référencés par aucun produit sont supprimés.
+# SCRAPE_IMAGE_CACHE=1 active l'étape en fin de scraping ; python scrape_images.py la lance à la main.
+import io
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+from scrape_http import make_session, HTTP_TIMEOUT
+from scrape_scheduler import scheduler, retry_after_seconds
+from scrape_snapshot import RETAILERS, atomic_write
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_CACHE_ENABLED = os.environ.get('SCRAPE_IMAGE_CACHE', '0') == '1'
+IMAGE_DIR = os.environ.get('SCRAPE_IMAGE_DIR', 'images')
+IMAGE_WORKERS = int(os.environ.get('SCRAPE_IMAGE_WORKERS', '8'))
+THUMB_SIZES = (160, 320)  # côté max en pixels ; image_path désigne la plus grande
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+def ensure_image_schema(conn, table='products'):
+    # image_source : image_url au moment du téléchargement, pour repérer les URL qui changent
+    for column in ('image_path', 'image_source'):
+        try:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} TEXT')
+        except sqlite3.OperationalError:
+            pass
+    conn.commit()
+
+def pending_urls(conn, limit=None, table='products'):
+    # Produits nouveaux (jamais mis en cache) ou dont l'URL d'image a changé depuis le dernier téléchargement
+    sql = (f"SELECT DISTINCT image_url FROM {table} WHERE image_url LIKE 'http%' "
+           f"AND (image_source IS NULL OR image_source != image_url OR image_path IS NULL)")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [row[0] for row in conn.execute(sql)]
+
+def download(session, url):
+    # Même rythme par hôte que les pages : les workers d'images partagent le seau de leur CDN
+    scheduler.acquire(url)
+    response = session.get(url, timeout=HTTP_TIMEOUT, stream=True)
+    scheduler.report(url, response.status_code, retry_after=retry_after_seconds(response.headers.get('Retry-After')))
+    response.raise_for_status()
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+    if content_type and not content_type.startswith('image/'):
+        raise ValueError(f"contenu {content_type} inattendu")
+    chunks, size = [], 0
+    for chunk in response.iter_content(64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > MAX_IMAGE_BYTES:
+            raise ValueError("image trop volumineuse")
+    return b''.join(chunks), content_type
+
+def store_image(retailer, data, content_type, image_dir):
+    """Écrit l'image (ou ses vignettes) sous son hash ; renvoie le chemin relatif à image_dir."""
+    digest = hashlib.sha256(data).hexdigest()
+    relative_dir = os.path.join(retailer, digest[:2])
+    directory = os.path.join(image_dir, relative_dir)
+    os.makedirs(directory, exist_ok=True)
+    if Image is None:
+        extension = mimetypes.guess_extension(content_type or '') or '.img'
+        name = f"{digest}{extension}"
+        if not os.path.exists(os.path.join(directory, name)):
+            atomic_write(os.path.join(directory, name), data)
+        return os.path.join(relative_dir, name)
+    names = {size: f"{digest}-{size}.webp" for size in THUMB_SIZES}
+    if not all(os.path.exists(os.path.join(directory, name)) for name in names.values()):
+        with Image.open(io.BytesIO(data)) as source:
+            source = source.convert('RGB')
+            for size, name in names.items():
+                thumb = source.copy()
+                thumb.thumbnail((size, size))
+                buffer = io.BytesIO()
+                thumb.save(buffer, 'WEBP', quality=80)
+                atomic_write(os.path.join(directory, name), buffer.getvalue())
+    return os.path.join(relative_dir, names[max(THUMB_SIZES)])
+
+def evict_unreferenced(conn, retailer, image_dir, table='products'):
+    # Mark & sweep : un fichier dont le hash n'est plus dans aucun image_path (produit supprimé,
+    # image remplacée) est supprimé
+    referenced = {os.path.basename(path).split('-')[0].split('.')[0]
+                  for (path,) in conn.execute(f'SELECT DISTINCT image_path FROM {table} WHERE image_path IS NOT NULL')}
+    removed = 0
+    for root, _, files in os.walk(os.path.join(image_dir, retailer)):
+        for name in files:
+            if name.split('-')[0].split('.')[0] not in referenced:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+def cache_images(retailer, db_path=None, image_dir=None, limit=None, workers=None):
+    """Télécharge les images manquantes d'une enseigne et purge les orphelines ; renvoie un résumé."""
+    db_path = db_path or RETAILERS[retailer]['db']
+    image_dir = image_dir or IMAGE_DIR
+    workers = max(1, workers or IMAGE_WORKERS)
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path, timeout=30)
+    session = make_session(pool_size=workers)
+    session.headers['Accept'] = 'image/avif,image/webp,image/*,*/*;q=0.8'
+    try:
+        ensure_image_schema(conn)
+        # Produit sans image : plus de fichier associé
+        conn.execute("UPDATE products SET image_path=NULL, image_source=NULL "
+                     "WHERE IFNULL(image_url, '') NOT LIKE 'http%' AND image_path IS NOT NULL")
+        urls = pending_urls(conn, limit)
+
+        def fetch(url):
+            try:
+                data, content_type = download(session, url)
+                return url, store_image(retailer, data, content_type, image_dir)
+            except Exception as e:
+                print(f"LOG: image non mise en cache ({url}) : {e}")
+                return url, None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            stored = [(path, url) for url, path in pool.map(fetch, urls) if path is not None]
+        conn.executemany("UPDATE products SET image_path=?, image_source=image_url WHERE image_url=?", stored)
+        conn.commit()
+        removed = evict_unreferenced(conn, retailer, image_dir)
+    finally:
+        session.close()
+        conn.close()
+    summary = {'pending': len(urls), 'stored': len(stored), 'evicted': removed}
+    print(f"Images {retailer} : {len(stored)}/{len(urls)} mises en cache, {removed} fichiers orphelins supprimés "
+          f"({time.perf_counter() - start:.2f}s{', sans Pillow : originaux' if Image is None else ''})")
+    return summary
+
+def cache_images_if_enabled(retailer, db_path=None):
+    if IMAGE_CACHE_ENABLED:
+        return cache_images(retailer, db_path)
+    return None
+
+if __name__ == "__main__":
+    # Usage : python scrape_images.py [action|carrefour|lidl ...]
+    retailers = sys.argv[1:] or list(RETAILERS)
+    for name in retailers:
+        if name not in RETAILERS:
+            print(f"Enseigne inconnue '{name}', choix possibles : {list(RETAILERS)}")
+            sys.exit(2)
+        if not os.path.exists(RETAILERS[name]['db']):
+            print(f"Base {RETAILERS[name]['db']} absente, images {name} ignorées")
+            continue
+        cache_images(name)
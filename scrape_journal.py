@@ -0,0 +1,142 @@
+# --- Journal de run : reprise d'un run complet interrompu ---
+# Un run (enseigne + périmètre) note dans la base chaque sous-catégorie commencée (avec sa génération,
+# cf. scrape_storage.start_generation), terminée ou en échec.
+# Relancé après un crash, le même run reprend : les sous-catégories terminées sont sautées, une
+# sous-catégorie entamée ou en échec est refaite en entier avec sa génération (les produits déjà
+# tamponnés restent "vus") et le nettoyage destructif n'a lieu qu'une fois tout le périmètre terminé.
+# Un run ne reste pas ouvert indéfiniment : au-delà de SCRAPE_JOURNAL_MAX_AGE heures ou de
+# SCRAPE_JOURNAL_MAX_ATTEMPTS lancements, il expire. Les sous-catégories terminées sont alors nettoyées,
+# celles en échec gardent leurs produits (rien n'a été relu) et un nouveau run repart de zéro.
+# SCRAPE_JOURNAL=0 revient au nettoyage immédiat par sous-catégorie, sans reprise.
+import os
+from scrape_storage import start_generation, delete_unseen
+
+JOURNAL_ENABLED = os.environ.get('SCRAPE_JOURNAL', '1') != '0'
+JOURNAL_MAX_AGE_HOURS = float(os.environ.get('SCRAPE_JOURNAL_MAX_AGE', 24))
+JOURNAL_MAX_ATTEMPTS = int(os.environ.get('SCRAPE_JOURNAL_MAX_ATTEMPTS', 3))
+
+def ensure_journal_schema(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS journal_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scope TEXT,
+        started_at TEXT,
+        finished_at TEXT,
+        attempts INTEGER DEFAULT 1,
+        status TEXT
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS journal_units (
+        run_id INTEGER,
+        category TEXT,
+        subcategory TEXT,
+        generation INTEGER,
+        inserted INTEGER DEFAULT 0,
+        status TEXT,
+        updated_at TEXT,
+        PRIMARY KEY (run_id, category, subcategory)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS ix_journal_runs_open ON journal_runs (scope) WHERE finished_at IS NULL')
+    conn.commit()
+
+class RunJournal:
+    """Journal d'un run ; les méthodes prennent la connexion de l'appelant (une par worker)."""
+    def __init__(self, conn, scope, generation_prefix, restart=False,
+                 max_age_hours=JOURNAL_MAX_AGE_HOURS, max_attempts=JOURNAL_MAX_ATTEMPTS):
+        ensure_journal_schema(conn)
+        self.scope = scope
+        self.generation_prefix = generation_prefix
+        row = conn.execute('''SELECT id, attempts, (julianday('now') - julianday(started_at)) * 24
+                              FROM journal_runs WHERE scope=? AND finished_at IS NULL ORDER BY id DESC LIMIT 1''',
+                           (scope,)).fetchone()
+        if row is not None and restart:
+            # Run abandonné : fermé sans nettoyage, le nouveau run repart de zéro
+            conn.execute("UPDATE journal_runs SET finished_at=datetime('now'), status='abandoned' WHERE id=?", (row[0],))
+            row = None
+        elif row is not None and (row[1] >= max_attempts or row[2] >= max_age_hours):
+            self.expire(conn, row[0], f"{row[1]} lancements, {row[2]:.0f} h")
+            row = None
+        self.resumed = row is not None
+        if self.resumed:
+            self.run_id = row[0]
+            conn.execute('UPDATE journal_runs SET attempts=attempts + 1 WHERE id=?', (self.run_id,))
+            done, failed, started = conn.execute(
+                "SELECT SUM(status='done'), SUM(status='failed'), COUNT(*) FROM journal_units WHERE run_id=?",
+                (self.run_id,)).fetchone()
+            print(f"Reprise du run {self.run_id} ({scope}, lancement {row[1] + 1}/{max_attempts}) : "
+                  f"{done or 0} étapes terminées, {failed or 0} en échec, "
+                  f"{started - (done or 0) - (failed or 0)} entamées")
+        else:
+            c = conn.execute("INSERT INTO journal_runs (scope, started_at) VALUES (?, datetime('now'))", (scope,))
+            self.run_id = c.lastrowid
+        conn.commit()
+
+    def expire(self, conn, run_id, reason):
+        # Run qui ne se termine pas (sous-catégorie toujours en échec, disparue du site...) : les
+        # sous-catégories terminées sont nettoyées quand même, les autres gardent leurs produits
+        removed = 0
+        for category, subcategory, generation in conn.execute(
+                '''SELECT category, subcategory, generation FROM journal_units
+                   WHERE run_id=? AND status='done' AND generation IS NOT NULL''', (run_id,)).fetchall():
+            removed += delete_unseen(conn, generation, category, subcategory)
+        conn.execute("UPDATE journal_runs SET finished_at=datetime('now'), status='expired' WHERE id=?", (run_id,))
+        conn.commit()
+        print(f"Run {run_id} expiré ({reason}) : {removed} produits absents supprimés, nouveau run")
+
+    def unit(self, conn, category, subcategory):
+        return conn.execute('SELECT generation, status FROM journal_units WHERE run_id=? AND category=? AND subcategory=?',
+                            (self.run_id, category, subcategory)).fetchone()
+
+    def is_done(self, conn, category, subcategory):
+        unit = self.unit(conn, category, subcategory)
+        return unit is not None and unit[1] == 'done'
+
+    def begin(self, conn, category, subcategory):
+        """Génération de la sous-catégorie : celle du passage interrompu ou en échec si elle avait été entamée."""
+        unit = self.unit(conn, category, subcategory)
+        if unit is not None and unit[0] is not None:
+            print(f"Reprise de {subcategory} (génération {unit[0]}, {'en échec' if unit[1] == 'failed' else 'entamée'})")
+            conn.execute('''UPDATE journal_units SET status='started', updated_at=datetime('now')
+                            WHERE run_id=? AND category=? AND subcategory=?''', (self.run_id, category, subcategory))
+            conn.commit()
+            return unit[0]
+        generation = start_generation(conn, f"{self.generation_prefix}:{category} > {subcategory}")
+        conn.execute('''INSERT INTO journal_units (run_id, category, subcategory, generation, status, updated_at)
+                        VALUES (?, ?, ?, ?, 'started', datetime('now'))''', (self.run_id, category, subcategory, generation))
+        conn.commit()
+        return generation
+
+    def mark_done(self, conn, category, subcategory):
+        # Étape sans génération propre (Nouveautés) : seulement à sauter lors d'une reprise
+        conn.execute('''INSERT INTO journal_units (run_id, category, subcategory, status, updated_at)
+                        VALUES (?, ?, ?, 'done', datetime('now'))
+                        ON CONFLICT (run_id, category, subcategory) DO UPDATE SET status='done', updated_at=datetime('now')''',
+                     (self.run_id, category, subcategory))
+        conn.commit()
+
+    def fail(self, conn, category, subcategory):
+        # Refaite en entier au prochain lancement du run (tant qu'il n'a pas expiré)
+        conn.execute('''UPDATE journal_units SET status='failed', updated_at=datetime('now')
+                        WHERE run_id=? AND category=? AND subcategory=?''', (self.run_id, category, subcategory))
+        conn.commit()
+
+    def done(self, conn, category, subcategory, inserted):
+        conn.execute('''UPDATE journal_units SET status='done', inserted=inserted + ?, updated_at=datetime('now')
+                        WHERE run_id=? AND category=? AND subcategory=?''', (inserted, self.run_id, category, subcategory))
+        conn.commit()
+
+    def finish(self, conn, expected_units):
+        """Nettoyage différé si toutes les sous-catégories attendues sont terminées ; renvoie True si le run est clos."""
+        done = {(category, subcategory): generation for category, subcategory, generation in conn.execute(
+            "SELECT category, subcategory, generation FROM journal_units WHERE run_id=? AND status='done'", (self.run_id,))}
+        missing = [unit for unit in expected_units if unit not in done]
+        if missing:
+            print(f"Run {self.run_id} incomplet : {len(missing)} sous-catégories à reprendre "
+                  f"({', '.join(subcategory for _, subcategory in missing[:5])}{'...' if len(missing) > 5 else ''}) ; "
+                  f"nettoyage différé au prochain lancement")
+            return False
+        removed = 0
+        for category, subcategory in expected_units:
+            removed += delete_unseen(conn, done[(category, subcategory)], category, subcategory)
+        conn.execute("UPDATE journal_runs SET finished_at=datetime('now'), status='finished' WHERE id=?", (self.run_id,))
+        conn.commit()
+        print(f"Run {self.run_id} terminé : nettoyage différé, {removed} produits absents supprimés")
+        return True
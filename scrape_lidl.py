@@ -1,15 +1,26 @@
-import time
 import sqlite3
+import argparse
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 import json
 import ast
 import urllib.parse
+from scrape_storage import ensure_identity_index, upsert_products, ensure_fingerprint_schema, page_key, fingerprint, page_unchanged, replay_page, record_fingerprint, identity_count, ensure_generation_schema, start_generation, delete_unseen
+from scrape_readiness import navigate
+from scrape_scheduler import scheduler
+from scrape_snapshot import publish_snapshot
+from scrape_images import cache_images_if_enabled
+from scrape_catalog import sync_catalog_if_enabled
+from scrape_search import ensure_search_index
+from scrape_metrics import phase, pause, scope, measure_run
+from scrape_profile import profiling, profile_scope
+from scrape_browser import configure_options, apply_blocking, log_resource_report
+from scrape_network import JSON_CAPTURE_ENABLED, JsonCapture, find_records
+from scrape_parsers import ParseScope, parse_html, class_strainer, extract_records, set_default_parser, set_parse_processes, PARSER_BACKENDS, DEFAULT_PARSER
 
 def clean_price(price_str):
     import re
@@ -21,11 +32,86 @@ DB_PATH = "lidl_products.sqlite"
 MAX_PAGES = 5
 SLEEP_BETWEEN_PAGES = 5
 
+# Colonnes écrites par le scraper et identité d'un produit (index UNIQUE)
+PRODUCT_COLUMNS = ('name', 'brand', 'description', 'price', 'price_fcfa', 'image_url', 'product_url', 'rating', 'rating_count', 'rendered_date', 'product_id', 'category', 'subcategory', 'category_from_data', 'page_key')
+IDENTITY_KEY = ('name', 'subcategory', 'price')
+
 START_URL = "https://www.lidl.fr/c/accueil/s10008381"  # À adapter si besoin
+GRID_SELECTOR = 'ol.s-product-grid'
+CARD_SELECTOR = "div[id^='product_']"
+# Réponses XHR de "Charger d'autres produits" (API de recherche)
+JSON_API_PATTERNS = ('/q/api/',)
+# Parsing restreint à la grille produits (SCRAPE_PARSER pour choisir le backend)
+PARSE_SCOPE = ParseScope(GRID_SELECTOR, class_strainer('s-product-grid', 'ol'))
+
+# Chargement complet de la grille : un seul execute_async_script piloté par un MutationObserver
+LOAD_MORE_LABEL = "Charger d’autres produits"
+SKELETON_SELECTOR = '.s-grid-box-skeleton'
+TITLE_SELECTOR = '.product-grid-box__title'
+LOAD_MORE_TIMEOUT = 60   # secondes, pour toute la grille
+LOAD_MORE_STALL = 10     # secondes sans nouvelle carte après un clic
+LOAD_MORE_SETTLE = 2     # secondes de calme sans bouton avant de conclure
+LOAD_ALL_SCRIPT = """
+var cardSelector = arguments[0], skeletonSelector = arguments[1], titleSelector = arguments[2],
+    label = arguments[3], timeoutMs = arguments[4], stallMs = arguments[5], settleMs = arguments[6],
+    intervalMs = arguments[7], done = arguments[arguments.length - 1];
+var deadline = Date.now() + timeoutMs, clicks = 0, waitingFrom = null, clickedAt = 0, finished = false;
+var lastMutation = Date.now(), scheduled = false;
+function count() { return document.querySelectorAll(cardSelector).length; }
+function settled() {
+  return document.querySelectorAll(skeletonSelector).length === 0 && document.querySelectorAll(titleSelector).length > 0;
+}
+function findButton() {
+  return Array.from(document.querySelectorAll('button')).find(function (b) {
+    return !b.disabled && b.offsetParent !== null && Array.from(b.querySelectorAll('span')).some(function (s) {
+      return s.textContent.indexOf(label) !== -1;
+    });
+  });
+}
+function finish(reason) {
+  if (finished) return;
+  finished = true;
+  observer.disconnect();
+  clearInterval(guard);
+  done({cards: count(), clicks: clicks, reason: reason});
+}
+function evaluate() {
+  scheduled = false;
+  if (finished) return;
+  if (Date.now() > deadline) return finish('timeout');
+  if (waitingFrom !== null) {
+    // Après un clic : on attend de nouvelles cartes et la disparition des skeletons
+    if (count() > waitingFrom && settled()) { waitingFrom = null; } else {
+      if (Date.now() - clickedAt > stallMs) finish('stalled');
+      return;
+    }
+  }
+  var button = findButton();
+  if (button) {
+    // Rythme de l'hôte (scrape_scheduler) : le guard réévalue tant que l'intervalle n'est pas écoulé
+    if (Date.now() - clickedAt < intervalMs) return;
+    waitingFrom = count();
+    clickedAt = Date.now();
+    clicks++;
+    button.click();
+    return;
+  }
+  // Plus de bouton : on conclut après settleMs sans mutation (le bouton peut réapparaître)
+  if (settled() && Date.now() - lastMutation >= settleMs) finish('exhausted');
+}
+function schedule() {
+  if (!scheduled) { scheduled = true; setTimeout(evaluate, 50); }
+}
+var observer = new MutationObserver(function () { lastMutation = Date.now(); schedule(); });
+observer.observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'disabled']});
+// Réévaluation périodique pour les délais (stall, settle, timeout) quand le DOM ne bouge plus
+var guard = setInterval(schedule, 250);
+schedule();
+"""
 
 # --- Setup Selenium ---
-def setup_driver():
-    options = Options()
+def setup_driver(profile=None):
+    options = configure_options(Options(), 'lidl', profile)
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
@@ -33,7 +119,9 @@ def setup_driver():
     options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
     options.binary_location = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
     service = Service(executable_path='/usr/local/bin/chromedriver')
-    return webdriver.Chrome(service=service, options=options)
+    driver = webdriver.Chrome(service=service, options=options)
+    # Blocage images / polices / traqueurs (SCRAPE_BLOCKING=off pour tout charger)
+    return apply_blocking(driver, 'lidl', profile)
 
 # --- Setup SQLite ---
 def setup_database():
@@ -61,18 +149,15 @@ def setup_database():
     )
     ''')
     conn.commit()
+    ensure_identity_index(conn, IDENTITY_KEY)
+    ensure_fingerprint_schema(conn)
+    ensure_generation_schema(conn)
+    ensure_search_index(conn)
     return conn, c
 
-def insert_product(c, prod):
-    c.execute('''SELECT id, first_scraped_at FROM products WHERE name=? AND subcategory=? AND price=?''', (prod['name'], prod['subcategory'], prod['price']))
-    row = c.fetchone()
-    if row:
-        c.execute('''UPDATE products SET scraped_at=datetime('now') WHERE id=?''', (row[0],))
-        return False
-    c.execute('''INSERT INTO products (name, brand, description, price, price_fcfa, image_url, product_url, rating, rating_count, rendered_date, product_id, category, subcategory, category_from_data, scraped_at, first_scraped_at)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))''',
-              (prod['name'], prod['brand'], prod['description'], prod['price'], prod['price_fcfa'], prod['image_url'], prod['product_url'], prod['rating'], prod['rating_count'], prod['rendered_date'], prod['product_id'], prod['category'], prod['subcategory'], prod['category_from_data']))
-    return True
+def insert_products(conn, prods, generation=None):
+    # Dédoublonnage sur nom + sous-catégorie + prix : un produit déjà connu voit juste son scraped_at mis à jour
+    return upsert_products(conn, PRODUCT_COLUMNS, IDENTITY_KEY, prods, generation=generation)
 
 def extract_price_from_json(data):
     if not isinstance(data, dict):
@@ -97,24 +182,26 @@ def extract_price_from_json(data):
                 return None
     return None
 
+def select_self_or_descendant(tag, selector):
+    return tag if tag.css.match(selector) else tag.select_one(selector)
+
+def find_product_box(card):
+    # Équivalent hors WebDriver de l'ancien XPath ancestor::div[contains(@class, "product-grid-box")]
+    scope = card.find_parent(lambda t: t.name == 'div' and 'product-grid-box' in ' '.join(t.get('class', []))) or card
+    box = select_self_or_descendant(scope, 'div.product-grid-box')
+    if not box:
+        box = select_self_or_descendant(scope, 'li.tile-without-padding')
+    # PATCH : si box est un <div>, cherche le <li> enfant
+    if box and box.name == 'div':
+        li = box.select_one('li.tile-without-padding')
+        if li:
+            box = li
+    return scope, box
+
 def extract_product_info(card, chemin):
+    # card : nœud BeautifulSoup d'une carte produit, pris dans l'instantané HTML de la grille
     try:
-        # Récupère le parent <div class="product-grid-box"> si possible
-        parent_html = None
-        try:
-            parent = card.find_element(By.XPATH, './ancestor::div[contains(@class, "product-grid-box")]')
-            parent_html = parent.get_attribute('outerHTML')
-        except:
-            parent_html = card.get_attribute('outerHTML')
-        soup = BeautifulSoup(parent_html, 'html.parser')
-        box = soup.select_one('div.product-grid-box')
-        if not box:
-            box = soup.select_one('li.tile-without-padding')
-        # PATCH : si box est un <div>, cherche le <li> enfant
-        if box and box.name == 'div':
-            li = box.select_one('li.tile-without-padding')
-            if li:
-                box = li
+        scope, box = find_product_box(card)
         if not box:
             print("LOG: Pas de box produit trouvée")
             return None
@@ -172,7 +259,8 @@ def extract_product_info(card, chemin):
         # 2. Fallback HTML (BeautifulSoup) — version ultra-robuste
         if price is None:
             # Recherche large sur toutes les divs
-            price_tags = [div for div in soup.find_all('div') if div.get('class') and any('ods-price__value' in c for c in div.get('class'))]
+            divs = ([scope] if scope.name == 'div' else []) + scope.find_all('div')
+            price_tags = [div for div in divs if div.get('class') and any('ods-price__value' in c for c in div.get('class'))]
             for price_tag in price_tags:
                 txt = price_tag.get_text(strip=True)
                 if txt is None:
@@ -193,7 +281,7 @@ def extract_product_info(card, chemin):
         if price is None:
             print(f"[WARN] Prix non trouvé pour '{name}' dans '{chemin[1] if len(chemin) > 1 else ''}'")
             try:
-                print(f"[DEBUG] HTML carte sans prix: {parent_html[:500]}...")
+                print(f"[DEBUG] HTML carte sans prix: {str(scope)[:500]}...")
             except:
                 pass
         # 3. Image fallback
@@ -266,41 +354,93 @@ def parse_possible_json(s):
         pass
     return None
 
-def scrape_products_on_page(driver, chemin, cards=None):
+def get_grid_html(driver):
+    # Un seul aller-retour WebDriver pour toute la grille, au lieu de 2 par carte
+    return driver.execute_script(
+        "var ol = document.querySelector(arguments[0]); return ol ? ol.outerHTML : null;", GRID_SELECTOR)
+
+def is_api_product(node):
+    return 'productId' in node and any(node.get(k) for k in ('fullTitle', 'name', 'title')) and extract_price_from_json(node) is not None
+
+def product_from_api(data, chemin):
+    # Même dictionnaire que extract_product_info, à partir d'un produit de l'API de recherche (prix exact)
+    canonical = data.get('canonicalPath') or data.get('canonicalUrl') or data.get('url')
+    ratings = data.get('ratings') if isinstance(data.get('ratings'), dict) else {}
+    price = extract_price_from_json(data)
+    return {
+        "name": data.get('fullTitle') or data.get('name') or data.get('title'),
+        "brand": data.get('brand', {}).get('name', "") if isinstance(data.get('brand'), dict) else data.get('brand') or "",
+        "description": data.get('description') or data.get('shortDescription') or "",
+        "price": price,
+        "price_fcfa": price * 655.957 if price else None,
+        "image_url": data.get('image') or data.get('imageUrl'),
+        "product_url": f"https://www.lidl.fr{canonical}" if canonical and str(canonical).startswith('/') else canonical,
+        "rating": data.get('ratingAverage', ratings.get('average')),
+        "rating_count": data.get('ratingCount', ratings.get('count')),
+        "rendered_date": None,
+        "product_id": str(data['productId']),
+        "category": chemin[0] if chemin else "",
+        "subcategory": chemin[1] if len(chemin) > 1 else "",
+        "category_from_data": None
+    }
+
+def api_products_by_id(payloads, chemin):
+    # {productId: produit} pour les cartes chargées par "Charger d'autres produits"
+    products = {}
+    for _, payload in payloads:
+        for node in find_records(payload, is_api_product):
+            products[str(node['productId'])] = product_from_api(node, chemin)
+    return products
+
+def extract_products_from_grid(grid_html, chemin, backend=None, api_products=None):
+    # Toutes les cartes sont lues depuis un unique arbre BeautifulSoup ; une carte déjà connue
+    # par l'API JSON (div id="product_<productId>") n'est pas ré-extraite du DOM
+    soup = parse_html(grid_html or '', PARSE_SCOPE, backend)
+    api_products = api_products or {}
+    prods = []
+    cards = soup.select(CARD_SELECTOR)
+    with phase('extract', count=len(cards)):
+        for card in cards:
+            prod = api_products.get(str(card.get('id', ''))[len('product_'):])
+            if prod is None:
+                prod = extract_product_info(card, chemin)
+            if prod and prod['name'] != "Nom inconnu":
+                prods.append(prod)
+    return prods
+
+def scrape_products_on_page(driver, chemin, grid_html=None, api_products=None):
     if not chemin or len(chemin) == 0:
         print("Aucune catégorie détectée, on saute le nettoyage.")
         return
-    scraped_keys = set()
+    if grid_html is None:
+        grid_html = get_grid_html(driver)
+    # Toute la sous-catégorie tient dans une grille : une seule page par chemin
+    key = page_key(' > '.join(chemin), 1)
+    page_fingerprint = fingerprint([grid_html or ''])
     conn, c = setup_database()
-    if cards is None:
-        try:
-            ol = driver.find_element(By.CSS_SELECTOR, 'ol.s-product-grid')
-            cards = ol.find_elements(By.CSS_SELECTOR, "div[id^='product_']")
-        except:
-            cards = []
-    print(f"LOG: Produits trouvés: {len(cards)}")
-    if len(cards) == 0:
-        print("LOG: Aucun produit trouvé")
-        return
-    inserted = 0
-    for card in cards:
-        prod = extract_product_info(card, chemin)
-        if prod and prod['name'] != "Nom inconnu":
-            key = (prod['name'], prod['subcategory'], prod['price'])
-            scraped_keys.add(key)
-            if insert_product(c, prod):
-                inserted += 1
-                conn.commit()
-    print(f"LOG: Produits insérés: {inserted}")
+    generation = start_generation(conn, f"lidl:{' > '.join(chemin)}")
+    if grid_html and page_unchanged(conn, key, page_fingerprint):
+        replayed = replay_page(conn, key, generation)
+        print(f"LOG: Grille inchangée depuis le dernier passage ({replayed} produits), parsing ignoré")
+        prods = []
+    else:
+        prods = extract_records(extract_products_from_grid, grid_html, chemin, api_products=api_products)
+        print(f"LOG: Produits trouvés: {len(prods)}")
+        if len(prods) == 0:
+            print("LOG: Aucun produit trouvé")
+            conn.close()
+            return
+        for prod in prods:
+            prod['page_key'] = key
+    if prods:
+        inserted = insert_products(conn, prods, generation)
+        record_fingerprint(conn, key, page_fingerprint, identity_count(prods, IDENTITY_KEY))
+        print(f"LOG: Produits insérés: {inserted}")
     # Nettoyage : on supprime les produits à la fin de chaque sous-catégorie
     print(f"LOG: Nettoyage produits...")
-    c.execute("SELECT id, name, subcategory, price FROM products WHERE subcategory=? AND category=?", (chemin[1] if len(chemin) > 1 else "", chemin[0]))
-    all_db = c.fetchall()
-    to_delete = [row[0] for row in all_db if (row[1], row[2], row[3]) not in scraped_keys]
-    if to_delete:
-        c.executemany("DELETE FROM products WHERE id=?", [(i,) for i in to_delete])
-        conn.commit()
-        print(f"LOG: Produits supprimés: {len(to_delete)}")
+    removed = delete_unseen(conn, generation, chemin[0], chemin[1] if len(chemin) > 1 else "")
+    if removed:
+        print(f"LOG: Produits supprimés: {removed}")
     else:
         print("LOG: Aucun produit à supprimer")
     conn.close()
@@ -308,20 +448,19 @@ def scrape_products_on_page(driver, chemin, cards=None):
 def open_main_menu(driver):
     menu_btn = driver.find_element(By.CSS_SELECTOR, 'a.n-navigation__menu-nav--link[role="button"]')
     menu_btn.click()
-    time.sleep(1)
+    pause(1)
 
 def click_main_category(driver, category_name):
     cats = driver.find_elements(By.CSS_SELECTOR, 'a.n-header__main-navigation-link')
     for cat in cats:
         if cat.text.strip().lower() == category_name.lower():
             cat.click()
-            time.sleep(1)
+            pause(1)
             return True
     return False
 
 def scrape_category(driver, category_name, chemin):
-    driver.get('https://www.lidl.fr/')
-    time.sleep(2)
+    navigate(driver, 'https://www.lidl.fr/')
     open_main_menu(driver)
     if not click_main_category(driver, category_name):
         print(f"Catégorie {category_name} non trouvée dans le menu principal.")
@@ -349,52 +488,31 @@ def scrape_category(driver, category_name, chemin):
         print(f"Erreur lors de la récupération des sous-catégories visibles: {e}")
 
 def charger_tous_les_produits(driver):
-    while True:
-        try:
-            bouton = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[span[contains(text(), 'Charger d’autres produits')]]"))
-            )
-            produits_avant = len(driver.find_elements(By.CSS_SELECTOR, "div[id^='product_']"))
-            bouton.click()
-            for _ in range(10):
-                time.sleep(1)
-                produits_apres = len(driver.find_elements(By.CSS_SELECTOR, "div[id^='product_']"))
-                if produits_apres > produits_avant:
-                    break
-        except Exception:
-            break
-    # Attendre que les skeletons disparaissent et que le contenu réel soit chargé
+    # Clics sur "Charger d'autres produits" jusqu'à épuisement puis attente des skeletons, entièrement
+    # dans la page : le script rend la main (un seul aller-retour) avec le nombre final de cartes.
+    # Les clics suivants ne passent pas par Python : le script les espace lui-même au rythme de l'hôte
     print("LOG: Attente chargement...")
-    max_wait = 30  # 30 secondes max
-    wait_time = 0
-    while wait_time < max_wait:
-        try:
-            skeletons = driver.find_elements(By.CSS_SELECTOR, ".s-grid-box-skeleton")
-            if len(skeletons) == 0:
-                real_content = driver.find_elements(By.CSS_SELECTOR, ".product-grid-box__title")
-                if len(real_content) > 0:
-                    print("LOG: Produits chargés")
-                    break
-            time.sleep(1)
-            wait_time += 1
-        except Exception:
-            time.sleep(1)
-            wait_time += 1
-    if wait_time >= max_wait:
-        print("LOG: Timeout chargement")
+    driver.set_script_timeout(LOAD_MORE_TIMEOUT + 5)
+    scheduler.acquire(START_URL)
     try:
-        ol = driver.find_element(By.CSS_SELECTOR, 'ol.s-product-grid')
-        cards = ol.find_elements(By.CSS_SELECTOR, "div[id^='product_']")
-        print(f"LOG: Total produits dans <ol>: {len(cards)}")
-        return cards
+        result = driver.execute_async_script(
+            LOAD_ALL_SCRIPT, CARD_SELECTOR, SKELETON_SELECTOR, TITLE_SELECTOR, LOAD_MORE_LABEL,
+            LOAD_MORE_TIMEOUT * 1000, LOAD_MORE_STALL * 1000, LOAD_MORE_SETTLE * 1000,
+            scheduler.interval(START_URL) * 1000)
+        if result['reason'] == 'timeout':
+            print("LOG: Timeout chargement")
+        else:
+            print(f"LOG: Produits chargés ({result['cards']} cartes, {result['clicks']} clics)")
     except Exception as e:
-        print(f"LOG: Pas de <ol> trouvé: {e}")
-        return []
+        print(f"LOG: Timeout chargement ({e})")
+    grid_html = get_grid_html(driver)
+    if grid_html is None:
+        print("LOG: Pas de <ol> trouvé")
+    return grid_html
 
 def scrape_subsubcategories(driver, url, chemin):
     """Scrape les sous-sous-catégories d'une sous-catégorie"""
-    driver.get(url)
-    time.sleep(3)
+    navigate(driver, url)
     
     try:
         # Cherche les sous-sous-catégories
@@ -416,48 +534,78 @@ def scrape_subsubcategories(driver, url, chemin):
         print(f"Erreur recherche sous-sous-catégories: {e}")
 
 def scrape_products_from_subcategory(driver, url, chemin):
-    driver.get(url)
-    time.sleep(3)
+    navigate(driver, url)
     print(f"Scraping produits pour {' > '.join(chemin)}")
-    cards = charger_tous_les_produits(driver)
-    scrape_products_on_page(driver, chemin, cards)
+    grid_html = charger_tous_les_produits(driver)
+    scrape_products_on_page(driver, chemin, grid_html)
 
 def scrape_lidl_subcategory(driver, url, chemin):
-    driver.get(url)
-    time.sleep(2)
-    print(f"LOG: URL: {url}")
-    cards = charger_tous_les_produits(driver)
-    scrape_products_on_page(driver, chemin, cards)
+    with scope(category=chemin[0], subcategory=chemin[-1]), profile_scope(' > '.join(chemin)):
+        navigate(driver, url)
+        print(f"LOG: URL: {url}")
+        # Les cartes ajoutées par "Charger d'autres produits" arrivent en JSON : capturées au passage
+        capture = JsonCapture(driver, JSON_API_PATTERNS) if JSON_CAPTURE_ENABLED else None
+        if capture is not None:
+            capture.discard()
+        grid_html = charger_tous_les_produits(driver)
+        api_products = api_products_by_id(capture.collect(), chemin) if capture is not None else {}
+        if api_products:
+            print(f"LOG: Produits lus depuis l'API JSON: {len(api_products)}")
+        log_resource_report(driver, ' > '.join(chemin))
+        scrape_products_on_page(driver, chemin, grid_html, api_products)
 
-def main():
-    driver = setup_driver()
+# Liste des liens de sous-catégories à scraper pour Cuisine & Ménage
+MAIN_CATEGORY = "Cuisine & Ménage"
+SUBCATEGORY_LINKS = [
+    ("Monsieur Cuisine", "https://www.lidl.fr/h/monsieur-cuisine/h10067521"),
+    ("Appareils de cuisine", "https://www.lidl.fr/h/appareils-de-cuisine/h10067522"),
+    ("Cuisine & pâtisserie", "https://www.lidl.fr/h/cuisine-patisserie/h10067523"),
+    ("L'art de la table & la vaisselle", "https://www.lidl.fr/h/l-art-de-la-table-la-vaisselle/h10067524"),
+    ("Barbecue & accessoires", "https://www.lidl.fr/h/barbecue-accessoires/h10067525"),
+    ("Rangement et organisation", "https://www.lidl.fr/h/rangement-et-organisation/h10067526"),
+    ("Appareils de nettoyage", "https://www.lidl.fr/h/nettoyage-de-la-maison/h10067527"),
+    ("Lavage & repassage", "https://www.lidl.fr/h/lavage-sechage/h10067528"),
+    ("Réfrigérer & congeler", "https://www.lidl.fr/h/refrigerer-congeler/h10067529"),
+    ("Machine à coudre & accessoires", "https://www.lidl.fr/h/machine-a-coudre-accessoires/h10067530"),
+]
+
+def accept_cookies(driver):
     try:
         consent_btn = driver.find_element(By.CSS_SELECTOR, 'button#onetrust-accept-btn-handler')
         consent_btn.click()
         print("LOG: Cookies acceptés")
-        time.sleep(1)
+        pause(1)
     except Exception:
         print("LOG: Pas de bannière cookies")
+    return driver
 
-    # Liste des liens de sous-catégories à scraper pour Cuisine & Ménage
-    subcategory_links = [
-        ("Monsieur Cuisine", "https://www.lidl.fr/h/monsieur-cuisine/h10067521"),
-        ("Appareils de cuisine", "https://www.lidl.fr/h/appareils-de-cuisine/h10067522"),
-        ("Cuisine & pâtisserie", "https://www.lidl.fr/h/cuisine-patisserie/h10067523"),
-        ("L'art de la table & la vaisselle", "https://www.lidl.fr/h/l-art-de-la-table-la-vaisselle/h10067524"),
-        ("Barbecue & accessoires", "https://www.lidl.fr/h/barbecue-accessoires/h10067525"),
-        ("Rangement et organisation", "https://www.lidl.fr/h/rangement-et-organisation/h10067526"),
-        ("Appareils de nettoyage", "https://www.lidl.fr/h/nettoyage-de-la-maison/h10067527"),
-        ("Lavage & repassage", "https://www.lidl.fr/h/lavage-sechage/h10067528"),
-        ("Réfrigérer & congeler", "https://www.lidl.fr/h/refrigerer-congeler/h10067529"),
-        ("Machine à coudre & accessoires", "https://www.lidl.fr/h/machine-a-coudre-accessoires/h10067530"),
-    ]
-
-    for nom, lien in subcategory_links:
+def main():
+    driver = accept_cookies(setup_driver())
+
+    for nom, lien in SUBCATEGORY_LINKS:
         print(f"LOG: Scraping {nom}")
-        scrape_lidl_subcategory(driver, lien, ["Cuisine & Ménage", nom])
+        scrape_lidl_subcategory(driver, lien, [MAIN_CATEGORY, nom])
 
     driver.quit()
+    cache_images_if_enabled('lidl', DB_PATH)
+    sync_catalog_if_enabled('lidl', DB_PATH)
+    # Snapshot JSON trié + compressé servi par server.js à la place du SELECT complet
+    publish_snapshot('lidl', DB_PATH)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scraping des produits Lidl")
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                        help="Parseur HTML des pages listing (SCRAPE_PARSER pour la valeur par défaut)")
+    parser.add_argument('--parse-processes', type=int, default=None,
+                        help="Parsing dans un pool de N processus (SCRAPE_PARSE_PROCESSES ; 0 = dans le thread de scraping)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profil cProfile par sous-catégorie (.pstats + piles repliées dans SCRAPE_PROFILE_DIR)")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    set_default_parser(args.parser)
+    if args.parse_processes is not None:
+        set_parse_processes(args.parse_processes)
+    with profiling('lidl', args.profile), measure_run('lidl'):
+        main()
@@ -0,0 +1,154 @@
+# --- Chronométrage par phase des runs de scraping ---
+# Chaque phase (navigation, attentes, parsing, extraction, écriture SQLite, nettoyage, pauses) est
+# chronométrée avec l'enseigne / catégorie / sous-catégorie en cours. Les mesures sont écrites au fil
+# de l'eau en JSON lines si SCRAPE_METRICS_DIR=<dossier> (désactivé par défaut : un fichier par run,
+# jamais purgé) et toujours résumées en fin de run (p50 / p95 par phase et par catégorie).
+# SCRAPE_PROM_DIR=<dossier> écrit en plus un fichier scrape_<enseigne>.prom pour le textfile
+# collector de node_exporter.
+import os
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+METRICS_DIR = os.environ.get('SCRAPE_METRICS_DIR', '')
+PROM_DIR = os.environ.get('SCRAPE_PROM_DIR', '')
+PHASES = ('navigate', 'wait', 'parse', 'extract', 'db_write', 'cleanup', 'sleep')
+
+_local = threading.local()
+_runs = {}
+_runs_lock = threading.Lock()
+
+def percentile(sorted_values, fraction):
+    # Rang le plus proche (ceil(p·n)) : p95 de 20 mesures = 19e valeur, p50 de [1, 2] = 1
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+class RunMetrics:
+    def __init__(self, retailer):
+        self.retailer = retailer
+        self.run_id = time.strftime('%Y%m%d-%H%M%S')
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.events = None
+        if METRICS_DIR:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            self.events_path = os.path.join(METRICS_DIR, f"{retailer}-{self.run_id}.jsonl")
+            self.events = open(self.events_path, 'a', encoding='utf-8', buffering=1)
+
+    def record(self, phase, seconds, labels, count=None):
+        key = (phase, labels.get('category') or '')
+        event = {'ts': round(time.time(), 3), 'run': self.run_id, 'phase': phase, 'seconds': round(seconds, 6)}
+        event.update(labels)
+        if count is not None:
+            event['count'] = count
+        with self.lock:
+            self.samples.setdefault(key, []).append(seconds)
+            if self.events is not None:
+                self.events.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    def summary(self):
+        rows = []
+        with self.lock:
+            items = sorted(self.samples.items(), key=lambda item: (PHASES.index(item[0][0]) if item[0][0] in PHASES else len(PHASES), item[0]))
+            for (phase, category), values in items:
+                values = sorted(values)
+                rows.append({'phase': phase, 'category': category, 'count': len(values), 'total': sum(values),
+                             'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95)})
+        return rows
+
+    def print_summary(self):
+        rows = self.summary()
+        elapsed = time.perf_counter() - self.started
+        print(f"\n=== Temps par phase ({self.retailer}, {elapsed:.1f}s) ===")
+        print(f"{'phase':<10}{'catégorie':<32}{'n':>6}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for row in rows:
+            print(f"{row['phase']:<10}{row['category'][:31]:<32}{row['count']:>6}{row['total']:>10.2f}"
+                  f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}")
+        return rows
+
+    def write_prometheus(self, directory):
+        from scrape_snapshot import atomic_write
+        lines = ['# HELP scrape_phase_seconds Durée des phases du dernier run de scraping',
+                 '# TYPE scrape_phase_seconds summary']
+        for row in self.summary():
+            labels = f'retailer="{self.retailer}",phase="{row["phase"]}",category="{prom_escape(row["category"])}"'
+            lines.append(f'scrape_phase_seconds{{{labels},quantile="0.5"}} {row["p50"]:.6f}')
+            lines.append(f'scrape_phase_seconds{{{labels},quantile="0.95"}} {row["p95"]:.6f}')
+            lines.append(f'scrape_phase_seconds_sum{{{labels}}} {row["total"]:.6f}')
+            lines.append(f'scrape_phase_seconds_count{{{labels}}} {row["count"]}')
+        lines.append('# TYPE scrape_last_run_timestamp_seconds gauge')
+        lines.append(f'scrape_last_run_timestamp_seconds{{retailer="{self.retailer}"}} {int(time.time())}')
+        os.makedirs(directory, exist_ok=True)
+        atomic_write(os.path.join(directory, f"scrape_{self.retailer}.prom"), ('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def close(self):
+        if self.events is not None:
+            self.events.close()
+
+def prom_escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def current_labels():
+    return getattr(_local, 'labels', {})
+
+@contextmanager
+def scope(**labels):
+    """Étiquettes (retailer, category, subcategory) des mesures prises dans ce bloc, pour ce thread."""
+    previous = current_labels()
+    _local.labels = dict(previous, **{key: value for key, value in labels.items() if value is not None})
+    try:
+        yield
+    finally:
+        _local.labels = previous
+
+def active_run(retailer=None):
+    with _runs_lock:
+        if retailer is not None:
+            return _runs.get(retailer)
+        # Mesure hors scope (thread sans enseigne) : rattachée au run s'il n'y en a qu'un
+        return next(iter(_runs.values())) if len(_runs) == 1 else None
+
+def record(phase_name, seconds, count=None):
+    labels = current_labels()
+    run_metrics = active_run(labels.get('retailer'))
+    if run_metrics is not None:
+        run_metrics.record(phase_name, seconds, labels, count)
+
+@contextmanager
+def phase(name, count=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, count)
+
+def pause(seconds):
+    # Pause volontaire, comptée à part pour ne pas la confondre avec une attente de page
+    with phase('sleep'):
+        time.sleep(seconds)
+
+@contextmanager
+def measure_run(retailer):
+    """Un run de scraping : mesures agrégées, résumé imprimé et export Prometheus en sortie."""
+    with _runs_lock:
+        run_metrics = _runs.get(retailer)
+        owner = run_metrics is None
+        if owner:
+            run_metrics = _runs[retailer] = RunMetrics(retailer)
+    try:
+        with scope(retailer=retailer):
+            yield run_metrics
+    finally:
+        # Run imbriqué (scrape_category appelé par scrape_action) : seul le run englobant conclut
+        if owner:
+            with _runs_lock:
+                _runs.pop(retailer, None)
+            run_metrics.print_summary()
+            if PROM_DIR:
+                run_metrics.write_prometheus(PROM_DIR)
+            run_metrics.close()
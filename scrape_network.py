@@ -0,0 +1,70 @@
+# --- Capture des réponses JSON des API enseignes via le journal réseau DevTools ---
+# Les pages "Produits suivants" (Carrefour) et "Charger d'autres produits" (Lidl) sont remplies par des
+# XHR qui renvoient les produits en JSON. On relit ces réponses (Network.responseReceived puis
+# Network.getResponseBody) pour construire les produits directement, sans re-parser le DOM rendu.
+# Le parsing DOM reste le repli quand la capture ne couvre pas toutes les cartes.
+# SCRAPE_JSON_CAPTURE=0 désactive la capture.
+import os
+import json
+import base64
+
+from scrape_browser import performance_events
+
+JSON_CAPTURE_ENABLED = os.environ.get('SCRAPE_JSON_CAPTURE', '1') != '0'
+
+class JsonCapture:
+    def __init__(self, driver, url_patterns):
+        self.driver = driver
+        self.url_patterns = url_patterns
+        self.pending = {}
+
+    def matches(self, response):
+        return 'json' in (response.get('mimeType') or '') and any(p in response.get('url', '') for p in self.url_patterns)
+
+    def collect(self):
+        """Renvoie [(url, json)] des réponses terminées depuis le dernier appel."""
+        payloads = []
+        for event in performance_events(self.driver, ('Network.responseReceived', 'Network.loadingFinished')):
+            params = event.get('params', {})
+            request_id = params.get('requestId')
+            if event['method'] == 'Network.responseReceived':
+                if self.matches(params.get('response', {})):
+                    self.pending[request_id] = params['response']['url']
+                continue
+            # Le corps n'est lisible qu'une fois la réponse entièrement reçue (loadingFinished)
+            url = self.pending.pop(request_id, None)
+            if url is None:
+                continue
+            try:
+                body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                text = base64.b64decode(body['body']).decode('utf-8') if body.get('base64Encoded') else body['body']
+                payloads.append((url, json.loads(text)))
+            except Exception as e:
+                print(f"LOG: réponse JSON illisible ({url}) : {e}")
+        return payloads
+
+    def discard(self):
+        # Oublie les réponses déjà reçues (chargement initial) avant de déclencher un nouveau chargement
+        self.collect()
+        self.pending.clear()
+
+def find_records(payload, predicate):
+    """Parcourt un JSON et renvoie, dans l'ordre, les objets qui satisfont predicate (sans descendre dedans)."""
+    records = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if predicate(node):
+                records.append(node)
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return records
+
+def to_float(value):
+    try:
+        return float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
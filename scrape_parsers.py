@@ -0,0 +1,207 @@
+# --- Backends de parsing HTML pour les extracteurs de cartes produit ---
+# Les extract_product_info travaillent sur des nœuds BeautifulSoup ; ce module choisit le parseur
+# (html.parser, lxml, selectolax) et ne construit que les sous-arbres des cartes produit.
+import os
+import sys
+import atexit
+import threading
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+from scrape_metrics import phase
+
+PARSER_BACKENDS = ('lxml', 'html.parser', 'selectolax')
+DEFAULT_PARSER = os.environ.get('SCRAPE_PARSER', 'lxml')
+# Référence des comparaisons : page entière avec html.parser, comme avant l'introduction des backends
+REFERENCE_BACKEND = 'html.parser:full'
+
+def backend_available(backend):
+    if backend == 'html.parser':
+        return True
+    module = 'selectolax.lexbor' if backend == 'selectolax' else backend
+    try:
+        importlib.import_module(module)
+        return True
+    except ImportError:
+        return False
+
+def available_backends():
+    return [backend for backend in PARSER_BACKENDS if backend_available(backend)]
+
+def set_default_parser(backend):
+    global DEFAULT_PARSER
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Parseur inconnu '{backend}', choix possibles : {PARSER_BACKENDS}")
+    DEFAULT_PARSER = backend
+
+def resolve_backend(backend=None):
+    backend = backend or DEFAULT_PARSER
+    if not backend_available(backend):
+        print(f"LOG: parseur '{backend}' indisponible, repli sur html.parser")
+        return 'html.parser'
+    return backend
+
+class ParseScope:
+    # Portion de la page utile à un extracteur.
+    # strainer : filtre SoupStrainer (backends bs4) ; roots : sélecteur CSS des racines à garder (selectolax) ;
+    # root_ancestor : balise ancêtre à garder avec la racine (ex. le <a> qui enveloppe une carte Action)
+    def __init__(self, roots, strainer=None, root_ancestor=None):
+        self.roots = roots
+        self.strainer = strainer
+        self.root_ancestor = root_ancestor
+
+def class_strainer(css_class, tag_name=None):
+    # SoupStrainer(class_=...) compare la chaîne brute de l'attribut pendant le parsing :
+    # on teste le jeton de classe pour matcher aussi les éléments multi-classes
+    def matches(name, attrs):
+        if tag_name and name != tag_name:
+            return False
+        classes = attrs.get('class') or ''
+        if isinstance(classes, str):
+            classes = classes.split()
+        return css_class in classes
+    return SoupStrainer(matches)
+
+def selectolax_fragments(html, scope):
+    from selectolax.lexbor import LexborHTMLParser
+    fragments = []
+    seen = set()
+    for node in LexborHTMLParser(html).css(scope.roots):
+        root = node
+        if scope.root_ancestor:
+            parent = node.parent
+            while parent is not None and parent.tag != scope.root_ancestor:
+                parent = parent.parent
+            if parent is not None:
+                root = parent
+        if root.mem_id in seen:
+            continue
+        seen.add(root.mem_id)
+        fragments.append(root.html)
+    return ''.join(fragments)
+
+def parse_html(html, scope=None, backend=None):
+    """Construit un BeautifulSoup limité au scope (toute la page si scope est None)."""
+    with phase('parse'):
+        return build_soup(html, scope, backend)
+
+def build_soup(html, scope, backend):
+    if backend == REFERENCE_BACKEND:
+        return BeautifulSoup(html, 'html.parser')
+    backend = resolve_backend(backend)
+    if backend == 'selectolax':
+        # selectolax découpe les sous-arbres utiles, bs4 (lxml si possible) ne parse que ceux-là
+        if scope is not None:
+            html = selectolax_fragments(html, scope)
+        return BeautifulSoup(html, 'lxml' if backend_available('lxml') else 'html.parser')
+    strainer = scope.strainer if scope is not None else None
+    return BeautifulSoup(html, backend, parse_only=strainer)
+
+def browser_fragments(driver, selector):
+    # HTML de chaque carte lu dans le DOM en un seul aller-retour WebDriver (sans parsing Python)
+    return driver.execute_script(
+        "return Array.from(document.querySelectorAll(arguments[0]), function (e) { return e.outerHTML; });", selector)
+
+# --- Parsing hors GIL : pool de processus ---
+# Le parsing bs4 d'une grande grille (Lidl, Carrefour après plusieurs "Produits suivants") occupe le
+# thread de scraping et, GIL oblige, ne profite pas des autres cœurs quand plusieurs navigateurs ou
+# enseignes tournent en même temps. Avec SCRAPE_PARSE_PROCESSES=N (ou --parse-processes), l'extracteur
+# tourne dans un processus du pool et renvoie des enregistrements compacts (colonnes + tuples).
+# 0 = parsing dans le thread appelant (défaut).
+PARSE_PROCESSES = int(os.environ.get('SCRAPE_PARSE_PROCESSES', '0'))
+_pool = None
+_pool_lock = threading.Lock()
+
+def set_parse_processes(processes):
+    global PARSE_PROCESSES
+    PARSE_PROCESSES = max(0, processes)
+
+def parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Les processus reprennent le parseur choisi dans le processus principal (--parser)
+            _pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES, initializer=set_default_parser,
+                                        initargs=(DEFAULT_PARSER,))
+            atexit.register(shutdown_parse_pool)
+        return _pool
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def compact_records(records):
+    # Produits d'un même extracteur : mêmes clés dans le même ordre -> une ligne de colonnes + des tuples
+    if records and all(len(record) == len(records[0]) and list(record) == list(records[0]) for record in records):
+        columns = tuple(records[0])
+        return columns, [tuple(record.values()) for record in records]
+    return None, records
+
+def expand_records(columns, rows):
+    if columns is None:
+        return rows
+    return [dict(zip(columns, row)) for row in rows]
+
+def _extract_compact(extract, html, args, kwargs):
+    return compact_records(extract(html, *args, **kwargs))
+
+def extract_records(extract, html, *args, **kwargs):
+    """extract(html, *args, **kwargs) dans le pool de parsing s'il est activé, sinon dans le thread appelant.
+
+    extract doit être une fonction de niveau module (transmise par référence aux processus).
+    """
+    if PARSE_PROCESSES <= 0:
+        return extract(html, *args, **kwargs)
+    # Parsing + extraction dans le processus : une seule mesure, prise côté appelant
+    with phase('extract'):
+        return expand_records(*parse_pool().submit(_extract_compact, extract, html, args, kwargs).result())
+
+def compare_backends(extract, html, backends=None):
+    # extract(html, backend) -> liste de produits ; renvoie {backend: écart} pour ceux qui diffèrent de la référence
+    backends = backends or available_backends()
+    reference = extract(html, REFERENCE_BACKEND)
+    differences = {}
+    for backend in backends:
+        result = extract(html, backend)
+        if result != reference:
+            mismatches = [i for i, (a, b) in enumerate(zip(reference, result)) if a != b]
+            differences[backend] = {
+                'reference_count': len(reference),
+                'count': len(result),
+                'first_mismatch': mismatches[0] if mismatches else min(len(reference), len(result)),
+            }
+    return differences
+
+def check_extractors(retailer, html):
+    if retailer == 'action':
+        module = importlib.import_module('scrape_action')
+        extract = lambda page, backend: module.extract_products_from_html(page, 'Test', 'Test', backend)
+    elif retailer == 'carrefour':
+        module = importlib.import_module('scrape_carrefour')
+        extract = lambda page, backend: module.extract_products_from_html(page, 'Test', '', backend)
+    elif retailer == 'lidl':
+        module = importlib.import_module('scrape_lidl')
+        extract = lambda page, backend: module.extract_products_from_grid(page, ['Test', 'Test'], backend)
+    else:
+        raise ValueError(f"Enseigne inconnue '{retailer}'")
+    return compare_backends(extract, html)
+
+if __name__ == "__main__":
+    # Usage : python scrape_parsers.py <action|carrefour|lidl> page.html [page2.html ...]
+    if len(sys.argv) < 3:
+        print("Usage : python scrape_parsers.py <action|carrefour|lidl> page.html [...]")
+        sys.exit(2)
+    print(f"Backends disponibles : {available_backends()}")
+    failed = False
+    for path in sys.argv[2:]:
+        with open(path, encoding='utf-8') as f:
+            differences = check_extractors(sys.argv[1], f.read())
+        if differences:
+            failed = True
+            print(f"ÉCART {path} : {differences}")
+        else:
+            print(f"OK {path} : sortie identique pour tous les backends")
+    sys.exit(1 if failed else 0)
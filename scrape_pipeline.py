@@ -0,0 +1,217 @@
+# --- Pipeline producteur / consommateur : navigation, parsing et écriture SQLite en parallèle ---
+# fetch (N navigateurs) -> file bornée -> parse (M workers) -> file bornée -> write (1 écrivain SQLite)
+# Les files bornées donnent la contre-pression : un étage rapide bloque sur put() au lieu d'accumuler
+# des pages en mémoire. Chaque étage mesure son activité, le temps bloqué en amont et la profondeur
+# de sa file d'entrée.
+# Si la création d'un objet d'étage échoue (navigateur, connexion SQLite), le pipeline est interrompu :
+# plus aucun job n'est lancé, les étages vident leur file jusqu'au marqueur de fin (aucun producteur ne
+# reste bloqué sur une file pleine) et run() relève l'erreur d'origine.
+import time
+import queue
+import threading
+import traceback
+
+_DONE = object()
+
+class PipelineAborted(Exception):
+    pass
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0   # temps passé bloqué sur une file aval pleine (contre-pression)
+        self.errors = 0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def record(self, elapsed):
+        with self.lock:
+            self.items += 1
+            self.busy += elapsed
+
+    def record_depth(self, depth):
+        with self.lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def summary(self):
+        avg_depth = self.depth_total / self.depth_samples if self.depth_samples else 0.0
+        return (f"{self.name:<8} {self.items:>6} éléments  actif {self.busy:7.2f}s  "
+                f"bloqué {self.blocked:7.2f}s  file moy {avg_depth:5.1f} / max {self.depth_max:<4} erreurs {self.errors}")
+
+class StageQueue:
+    # File bornée instrumentée : profondeur relevée à chaque entrée, blocage compté pour le producteur
+    def __init__(self, maxsize, consumer_stats):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.consumer_stats = consumer_stats
+
+    def put(self, item, producer_stats):
+        start = time.perf_counter()
+        self.queue.put(item)
+        waited = time.perf_counter() - start
+        with producer_stats.lock:
+            producer_stats.blocked += waited
+        self.consumer_stats.record_depth(self.queue.qsize())
+
+    def get(self):
+        return self.queue.get()
+
+class Pipeline:
+    """Trois étages reliés par des files bornées.
+
+    fetcher_factory() -> objet .fetch(job, emit) / .close() ; un par worker de navigation.
+    parser_factory()  -> objet .parse(item) -> élément à écrire (ou None) / .close() ; un par worker de parsing.
+    writer_factory()  -> objet .write(item) / .close() ; un seul thread d'écriture.
+    Chaque objet est créé dans le thread qui l'utilise (connexions SQLite, navigateurs).
+    """
+    def __init__(self, fetcher_factory, parser_factory, writer_factory, fetch_workers=1, parse_workers=2, queue_size=8):
+        self.fetcher_factory = fetcher_factory
+        self.parser_factory = parser_factory
+        self.writer_factory = writer_factory
+        self.writer = None
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = max(1, parse_workers)
+        self.stats = {name: StageStats(name) for name in ('fetch', 'parse', 'write')}
+        self.parse_queue = StageQueue(queue_size, self.stats['parse'])
+        self.write_queue = StageQueue(queue_size, self.stats['write'])
+        self.aborted = threading.Event()
+        self.failure = None
+
+    def abort(self, stage, error):
+        stats = self.stats[stage]
+        with stats.lock:
+            stats.errors += 1
+        if self.failure is None:
+            self.failure = error
+        self.aborted.set()
+        print(f"[pipeline {stage}] Création impossible, pipeline interrompu : {error}")
+        traceback.print_exc()
+
+    def drain(self, stage_queue):
+        # Étage hors service : on consomme jusqu'au marqueur de fin pour ne pas bloquer l'amont
+        while stage_queue.get() is not _DONE:
+            pass
+
+    def fetch_loop(self, jobs):
+        stats = self.stats['fetch']
+
+        def emit(item):
+            if self.aborted.is_set():
+                raise PipelineAborted()
+            self.parse_queue.put(item, stats)
+
+        fetcher = None
+        try:
+            try:
+                fetcher = self.fetcher_factory()
+            except Exception as e:
+                self.abort('fetch', e)
+                return
+            while not self.aborted.is_set():
+                try:
+                    job = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                start = time.perf_counter()
+                try:
+                    fetcher.fetch(job, emit)
+                except PipelineAborted:
+                    break
+                except Exception as e:
+                    stats.errors += 1
+                    print(f"[pipeline fetch] Erreur sur {job}: {e}")
+                stats.record(time.perf_counter() - start)
+        finally:
+            if fetcher is not None:
+                fetcher.close()
+
+    def parse_loop(self):
+        stats = self.stats['parse']
+        parser = None
+        try:
+            try:
+                parser = self.parser_factory()
+            except Exception as e:
+                self.abort('parse', e)
+                self.drain(self.parse_queue)
+                return
+            while True:
+                item = self.parse_queue.get()
+                if item is _DONE:
+                    break
+                if self.aborted.is_set():
+                    continue
+                start = time.perf_counter()
+                try:
+                    result = parser.parse(item)
+                except Exception as e:
+                    stats.errors += 1
+                    print(f"[pipeline parse] Erreur : {e}")
+                    result = None
+                stats.record(time.perf_counter() - start)
+                if result is not None:
+                    self.write_queue.put(result, stats)
+        finally:
+            if parser is not None:
+                parser.close()
+
+    def write_loop(self):
+        stats = self.stats['write']
+        try:
+            try:
+                self.writer = self.writer_factory()
+            except Exception as e:
+                self.abort('write', e)
+                self.drain(self.write_queue)
+                return
+            while True:
+                item = self.write_queue.get()
+                if item is _DONE:
+                    break
+                start = time.perf_counter()
+                try:
+                    self.writer.write(item)
+                except Exception as e:
+                    stats.errors += 1
+                    print(f"[pipeline write] Erreur : {e}")
+                    traceback.print_exc()
+                stats.record(time.perf_counter() - start)
+        finally:
+            if self.writer is not None:
+                self.writer.close()
+
+    def run(self, jobs):
+        """Traite la liste de jobs ; renvoie les statistiques par étage (RuntimeError si le pipeline a été interrompu)."""
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+        start = time.perf_counter()
+        fetchers = [threading.Thread(target=self.fetch_loop, args=(job_queue,), daemon=True)
+                    for _ in range(min(self.fetch_workers, max(1, len(jobs))))]
+        parsers = [threading.Thread(target=self.parse_loop, daemon=True) for _ in range(self.parse_workers)]
+        writer = threading.Thread(target=self.write_loop, daemon=True)
+        for thread in fetchers + parsers + [writer]:
+            thread.start()
+        # Arrêt en cascade : fin des fetchers -> un _DONE par parser -> fin des parsers -> _DONE à l'écrivain
+        for thread in fetchers:
+            thread.join()
+        for _ in parsers:
+            self.parse_queue.queue.put(_DONE)
+        for thread in parsers:
+            thread.join()
+        self.write_queue.queue.put(_DONE)
+        writer.join()
+        self.elapsed = time.perf_counter() - start
+        if self.failure is not None:
+            raise RuntimeError(f"Pipeline interrompu : {self.failure}") from self.failure
+        return self.stats
+
+    def print_stats(self):
+        print(f"\n=== Pipeline : {self.elapsed:.2f}s ({self.fetch_workers} navigateurs, {self.parse_workers} parseurs) ===")
+        for stats in self.stats.values():
+            print(stats.summary())
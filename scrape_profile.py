@@ -0,0 +1,147 @@
+# --- Mode profilage (--profile) des scrapers ---
+# Chaque sous-catégorie (catégorie pour Carrefour) est profilée séparément avec cProfile : un fichier
+# .pstats par périmètre, lisible avec `python -m pstats` ou snakeviz. En parallèle, un thread
+# échantillonne les piles des threads profilés (sys._current_frames) et écrit des piles repliées
+# (.collapsed) pour flamegraph.pl / speedscope. En fin de run : fonctions les plus coûteuses, tous
+# périmètres confondus. Fichiers dans SCRAPE_PROFILE_DIR (profiles/ par défaut).
+import os
+import re
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_DIR = os.environ.get('SCRAPE_PROFILE_DIR', 'profiles')
+SAMPLE_INTERVAL = 0.005  # secondes entre deux échantillons de piles
+TOP_FUNCTIONS = 25
+
+_profiler = None
+
+def file_label(label):
+    return re.sub(r'[^\w.-]+', '_', label).strip('_') or 'scope'
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Profiler:
+    def __init__(self, retailer, directory=None):
+        self.directory = os.path.join(directory or PROFILE_DIR, f"{retailer}-{time.strftime('%Y%m%d-%H%M%S')}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.retailer = retailer
+        self.lock = threading.Lock()
+        self.active = {}
+        self.stacks = {}
+        self.stats = None
+        self.files = set()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample_loop, daemon=True)
+        self.sampler.start()
+
+    def unique_path(self, label, extension):
+        stem = file_label(label)
+        name, index = stem, 2
+        while name + extension in self.files:
+            name = f"{stem}-{index}"
+            index += 1
+        self.files.add(name + extension)
+        return os.path.join(self.directory, name + extension)
+
+    def sample_loop(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            with self.lock:
+                active = dict(self.active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, label in active.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame))
+                    frame = frame.f_back
+                if stack:
+                    with self.lock:
+                        self.stacks.setdefault(label, Counter())[';'.join(reversed(stack))] += 1
+
+    @contextmanager
+    def scope(self, label):
+        ident = threading.get_ident()
+        with self.lock:
+            nested = ident in self.active
+            if not nested:
+                self.active[ident] = label
+        if nested:
+            # Périmètre imbriqué : déjà couvert par le profil englobant
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ : un seul cProfile actif à la fois ; les autres threads n'ont que l'échantillonnage
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            with self.lock:
+                del self.active[ident]
+                if profile is not None:
+                    path = self.unique_path(label, '.pstats')
+                    profile.dump_stats(path)
+                    if self.stats is None:
+                        self.stats = pstats.Stats(path)
+                    else:
+                        self.stats.add(path)
+                stacks = self.stacks.get(label)
+                if stacks:
+                    self.write_collapsed(self.unique_path(label, '.collapsed'), stacks)
+                    self.stacks[label] = Counter()
+
+    def write_collapsed(self, path, stacks):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def finish(self):
+        self.stopped.set()
+        self.sampler.join()
+        print(f"\n=== Profil {self.retailer} : {self.directory} ===")
+        if self.stats is None:
+            print("Aucun périmètre profilé")
+            return None
+        self.stats.dump_stats(os.path.join(self.directory, 'total.pstats'))
+        self.stats.stream = sys.stdout
+        print(f"--- {TOP_FUNCTIONS} fonctions les plus coûteuses (temps propre) ---")
+        self.stats.sort_stats('tottime').print_stats(TOP_FUNCTIONS)
+        print(f"--- {TOP_FUNCTIONS} fonctions les plus coûteuses (temps cumulé) ---")
+        self.stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        return self.stats
+
+@contextmanager
+def profiling(retailer, enabled=True, directory=None):
+    """Active le profilage par périmètre pour la durée du bloc (sans effet si enabled est faux)."""
+    global _profiler
+    if not enabled:
+        yield None
+        return
+    _profiler = Profiler(retailer, directory)
+    try:
+        yield _profiler
+    finally:
+        profiler, _profiler = _profiler, None
+        profiler.finish()
+
+@contextmanager
+def profile_scope(label):
+    # Sans --profile : simple passe-plat
+    if _profiler is None:
+        yield
+        return
+    with _profiler.scope(label):
+        yield
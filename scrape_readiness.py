@@ -0,0 +1,111 @@
+# --- Attente de disponibilité des pages (remplace les time.sleep fixes) ---
+# On attend des signaux concrets (document chargé, nombre de cartes, ancien élément détaché,
+# réseau au repos) ; le rythme des navigations par site est fixé par scrape_scheduler.
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from scrape_metrics import phase
+from scrape_scheduler import scheduler
+
+POLL_FREQUENCY = 0.1
+NETWORK_IDLE_SECONDS = 0.5
+NAVIGATION_RETRIES = 2  # nouvelles tentatives après une page de blocage (captcha, accès refusé)
+
+# Pages de blocage / captcha des protections anti-bot courantes (DataDome, PerimeterX, Cloudflare, Akamai)
+BLOCK_CHECK_SCRIPT = """
+    var title = (document.title || '').toLowerCase();
+    var markers = ['captcha', 'access denied', 'accès refusé', 'too many requests', 'just a moment', 'attention required'];
+    for (var i = 0; i < markers.length; i++) {
+        if (title.indexOf(markers[i]) !== -1) { return 'page "' + document.title + '"'; }
+    }
+    if (document.querySelector('iframe[src*="captcha"], iframe[src*="datadome"], #px-captcha, .g-recaptcha, #challenge-form')) {
+        return 'captcha';
+    }
+    return null;
+"""
+
+def detect_block(driver):
+    try:
+        return driver.execute_script(BLOCK_CHECK_SCRIPT)
+    except Exception:
+        return None
+
+def navigate(driver, url, timeout=15, retries=NAVIGATION_RETRIES):
+    # Jeton de l'hôte avant chaque chargement ; une page de blocage ralentit l'hôte et on retente
+    for attempt in range(retries + 1):
+        scheduler.acquire(url)
+        with phase('navigate'):
+            driver.get(url)
+        wait_for_document_ready(driver, timeout)
+        blocked = detect_block(driver)
+        scheduler.report(url, blocked=blocked)
+        if not blocked:
+            return True
+    print(f"LOG: {url} toujours bloquée après {retries + 1} tentatives")
+    return False
+
+def wait_for_document_ready(driver, timeout=15):
+    try:
+        with phase('wait'):
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+        return True
+    except TimeoutException:
+        print(f"LOG: document pas prêt après {timeout}s, on continue")
+        return False
+
+def count_elements(driver, selector):
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", selector)
+
+def wait_for_cards(driver, selector, timeout=10, min_count=1):
+    # Lève TimeoutException si aucune carte n'apparaît, comme presence_of_element_located
+    with phase('wait'):
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: (count_elements(d, selector) >= min_count) and count_elements(d, selector)
+        )
+
+def wait_for_count_change(driver, selector, previous, timeout=10):
+    try:
+        with phase('wait'):
+            return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+                lambda d: (count_elements(d, selector) != previous) and count_elements(d, selector)
+            )
+    except TimeoutException:
+        return previous
+
+def wait_for_stale(driver, element, timeout=10):
+    # Après un clic de pagination, l'ancienne carte détachée du DOM signale le changement de page
+    try:
+        with phase('wait'):
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(EC.staleness_of(element))
+        return True
+    except TimeoutException:
+        return False
+
+def wait_for_network_idle(driver, idle=NETWORK_IDLE_SECONDS, timeout=10):
+    # Réseau au repos = aucune nouvelle ressource (Resource Timing) pendant `idle` secondes
+    with phase('wait'):
+        deadline = time.monotonic() + timeout
+        last_count = -1
+        stable_since = time.monotonic()
+        while time.monotonic() < deadline:
+            count = driver.execute_script("return performance.getEntriesByType('resource').length;")
+            now = time.monotonic()
+            if count != last_count:
+                last_count = count
+                stable_since = now
+            elif now - stable_since >= idle:
+                return True
+            time.sleep(POLL_FREQUENCY)
+        return False
+
+def scroll_to_bottom(driver, idle=NETWORK_IDLE_SECONDS, timeout=5):
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    wait_for_network_idle(driver, idle, timeout)
+
+def first_element(driver, selector):
+    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+    return elements[0] if elements else None
@@ -0,0 +1,138 @@
+# --- Ordonnanceur de politesse par hôte (seaux à jetons) ---
+# Toute navigation et toute requête HTTP des scrapers prend un jeton du seau de son hôte avant de
+# partir : le débit est garanti par site quel que soit le nombre de navigateurs / workers, et un
+# seul worker n'attend jamais plus que nécessaire (plus de time.sleep fixes entre sous-catégories).
+# Un 429 / 403 ou une page captcha ralentit l'hôte (intervalle doublé + pause de refroidissement,
+# Retry-After respecté) ; une série de succès le ramène progressivement au débit nominal.
+# SCRAPE_HOST_RATES="www.action.com=1,www.lidl.fr=0.5" surcharge les débits (requêtes / seconde).
+import os
+import time
+import random
+import threading
+from urllib.parse import urlparse
+
+from scrape_metrics import phase
+
+# requêtes / seconde, rafale autorisée
+HOST_LIMITS = {
+    'www.action.com': (1.0, 3),
+    'www.carrefour.fr': (0.5, 2),
+    'www.lidl.fr': (0.5, 2),
+}
+DEFAULT_LIMIT = (1.0, 2)
+JITTER = 0.3            # jusqu'à +30 % d'intervalle tiré au hasard, pour ne pas marcher au pas
+MAX_SLOWDOWN = 16       # intervalle multiplié au plus par 16
+COOLDOWN = 30.0         # pause après un blocage détecté, multipliée par le ralentissement courant
+RECOVERY_STREAK = 20    # succès consécutifs pour diviser le ralentissement par deux
+BLOCK_STATUSES = (403, 429)
+
+def parse_rates(spec):
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        host, _, rate = item.partition('=')
+        try:
+            value = float(rate)
+        except ValueError:
+            value = None
+        # Un débit nul ou négatif n'a pas de sens (et diviserait par zéro dans HostBucket)
+        if value is None or not value > 0:
+            print(f"LOG: débit invalide ignoré dans SCRAPE_HOST_RATES : '{item}'")
+            continue
+        rates[host.strip()] = value
+    return rates
+
+RATE_OVERRIDES = parse_rates(os.environ.get('SCRAPE_HOST_RATES', ''))
+
+def host_of(target):
+    if '://' in target:
+        return urlparse(target).hostname or target
+    return target
+
+class HostBucket:
+    def __init__(self, host, rate, burst):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.slowdown = 1
+        self.blocked_until = 0.0
+        self.streak = 0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # Réserve un jeton ; renvoie le temps à attendre avant de l'utiliser
+        with self.lock:
+            now = time.monotonic()
+            rate = self.rate / self.slowdown
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            self.tokens -= 1
+            # Après un blocage, les requêtes en attente repartent étalées au débit courant, pas toutes ensemble
+            wait = max(0.0, self.blocked_until - now) + max(0.0, -self.tokens / rate)
+            if wait > 0:
+                wait += random.uniform(0, JITTER / rate)
+            return wait
+
+    def success(self):
+        with self.lock:
+            self.streak += 1
+            if self.slowdown > 1 and self.streak >= RECOVERY_STREAK:
+                self.slowdown //= 2
+                self.streak = 0
+                print(f"LOG: {self.host} : ralentissement réduit à x{self.slowdown}")
+
+    def penalize(self, reason, retry_after=None):
+        with self.lock:
+            self.streak = 0
+            self.slowdown = min(MAX_SLOWDOWN, self.slowdown * 2)
+            cooldown = retry_after if retry_after is not None else COOLDOWN * self.slowdown / 2
+            self.blocked_until = max(self.blocked_until, time.monotonic() + cooldown)
+            self.tokens = min(self.tokens, 0.0)
+            print(f"LOG: {self.host} : {reason}, ralentissement x{self.slowdown}, pause de {cooldown:.0f}s")
+
+class PolitenessScheduler:
+    def __init__(self, limits=None, overrides=None):
+        self.limits = dict(limits or HOST_LIMITS)
+        self.overrides = dict(overrides if overrides is not None else RATE_OVERRIDES)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, target):
+        host = host_of(target)
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, burst = self.limits.get(host, DEFAULT_LIMIT)
+                bucket = self.buckets[host] = HostBucket(host, self.overrides.get(host, rate), burst)
+            return bucket
+
+    def acquire(self, target):
+        """Bloque jusqu'à ce que l'hôte de target (URL ou nom d'hôte) accepte une requête de plus."""
+        wait = self.bucket(target).reserve()
+        if wait > 0:
+            with phase('sleep'):
+                time.sleep(wait)
+
+    def interval(self, target):
+        # Intervalle courant entre deux requêtes vers l'hôte (ralentissement compris), en secondes
+        bucket = self.bucket(target)
+        return bucket.slowdown / bucket.rate
+
+    def report(self, target, status=None, blocked=None, retry_after=None):
+        # status : code HTTP ; blocked : motif de blocage détecté dans la page (captcha...)
+        bucket = self.bucket(target)
+        if blocked:
+            bucket.penalize(blocked, retry_after)
+        elif status in BLOCK_STATUSES:
+            bucket.penalize(f"HTTP {status}", retry_after)
+        else:
+            bucket.success()
+
+scheduler = PolitenessScheduler()
+
+def retry_after_seconds(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,95 @@
+# --- Index plein texte (FTS5) des produits, par base d'enseigne ---
+# products_fts indexe nom, marque et description avec le tokenizer unicode61 sans diacritiques
+# ("poele" trouve "Poêle", "creme" trouve "crème"). Des triggers SQLite le tiennent à jour : chaque
+# insertion / modification de texte / suppression (upsert d'une page, delete_unseen) met l'index à
+# jour dans la même transaction que la table products. search() renvoie les produits classés par bm25
+# avec un extrait surligné, sans parcourir toute la table.
+import re
+import sys
+import sqlite3
+
+from scrape_snapshot import RETAILERS
+
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+FTS_COLUMNS = ('name', 'brand', 'description')
+BM25_WEIGHTS = (10.0, 5.0, 1.0)  # un mot du nom pèse plus qu'un mot de la description
+SNIPPET_TOKENS = 12
+
+def fts_table(table='products'):
+    return f"{table}_fts"
+
+def indexed_values(columns, alias):
+    # Action et Carrefour n'ont pas de marque : colonne vide dans l'index
+    return ', '.join(f"{alias}.{column}" if column in columns else 'NULL' for column in FTS_COLUMNS)
+
+def ensure_search_index(conn, table='products'):
+    """Crée l'index FTS5 et ses triggers ; le remplit à la création à partir des produits existants."""
+    fts = fts_table(table)
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)).fetchone()
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    text_columns = [column for column in FTS_COLUMNS if column in columns]
+    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(FTS_COLUMNS)}, tokenize='{FTS_TOKENIZER}')")
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                         INSERT INTO {fts} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {indexed_values(columns, 'new')});
+                     END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                         DELETE FROM {fts} WHERE rowid = old.id;
+                     END''')
+    # Seules les modifications de texte touchent l'index (pas le rafraîchissement de scraped_at)
+    changed = ' OR '.join(f"old.{column} IS NOT new.{column}" for column in text_columns)
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {', '.join(text_columns)} ON {table}
+                     WHEN {changed} BEGIN
+                         DELETE FROM {fts} WHERE rowid = old.id;
+                         INSERT INTO {fts} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {indexed_values(columns, 'new')});
+                     END''')
+    if not exists:
+        c = conn.execute(f"INSERT INTO {fts} (rowid, {', '.join(FTS_COLUMNS)}) SELECT p.id, {indexed_values(columns, 'p')} FROM {table} p")
+        if c.rowcount:
+            print(f"Migration : {c.rowcount} produits indexés en plein texte")
+    conn.commit()
+
+def fts_query(text):
+    # Mots-clés libres (alertes, barre de recherche) -> requête FTS5 sûre : chaque mot entre guillemets,
+    # préfixe sur le dernier pour la saisie en cours, tous les mots requis
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' AND '.join(terms)
+
+def search(conn, text, limit=20, offset=0, table='products'):
+    """Produits correspondant aux mots-clés, du plus pertinent au moins pertinent, avec extrait."""
+    query = fts_query(text)
+    if query is None:
+        return []
+    fts = fts_table(table)
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    cursor = conn.execute(f'''SELECT p.*, bm25({fts}, {weights}) AS rank,
+                                     highlight({fts}, 0, '<b>', '</b>') AS name_highlight,
+                                     snippet({fts}, 2, '<b>', '</b>', '…', {SNIPPET_TOKENS}) AS snippet
+                              FROM {fts} JOIN {table} p ON p.id = {fts}.rowid
+                              WHERE {fts} MATCH ? ORDER BY rank LIMIT ? OFFSET ?''', (query, limit, offset))
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def rebuild_search_index(conn, table='products'):
+    # Réindexation complète (après une modification manuelle de la base hors triggers)
+    conn.execute(f'DROP TABLE IF EXISTS {fts_table(table)}')
+    for suffix in ('insert', 'delete', 'update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {fts_table(table)}_{suffix}')
+    ensure_search_index(conn, table)
+
+if __name__ == "__main__":
+    # Usage : python scrape_search.py <action|carrefour|lidl> <mots-clés...>
+    #         python scrape_search.py <enseigne> --rebuild
+    if len(sys.argv) < 3 or sys.argv[1] not in RETAILERS:
+        print(f"Usage : python scrape_search.py <{'|'.join(RETAILERS)}> <mots-clés...> | --rebuild")
+        sys.exit(2)
+    conn = sqlite3.connect(RETAILERS[sys.argv[1]]['db'])
+    if sys.argv[2] == '--rebuild':
+        rebuild_search_index(conn)
+    else:
+        for row in search(conn, ' '.join(sys.argv[2:])):
+            print(f"{row['rank']:8.2f}  {row['name_highlight']}  —  {row['snippet'] or ''}")
+    conn.close()
@@ -0,0 +1,133 @@
+# --- Snapshots JSON précalculés pour les endpoints de lecture de server.js ---
+# En fin de run, chaque scraper publie le catalogue déjà trié (et un fichier par catégorie), en JSON
+# brut + gzip (+ brotli si le module est installé). Les fichiers portent la version (hash du contenu)
+# dans leur nom ; manifest.json, écrit en dernier par os.replace, désigne la version courante :
+# un lecteur ne voit jamais de fichier partiel ni un mélange de deux versions.
+import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+import sqlite3
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SNAPSHOT_DIR = os.environ.get('SCRAPE_SNAPSHOT_DIR', 'snapshots')
+
+# Même ordre et même forme de réponse que les endpoints SQL de server.js
+RETAILERS = {
+    'action': {'db': 'action_products.sqlite', 'order': 'scraped_at DESC', 'wrapped': False},
+    'carrefour': {'db': 'carrefour_products.sqlite', 'order': 'id DESC', 'wrapped': False},
+    'lidl': {'db': 'lidl_products.sqlite', 'order': 'scraped_at DESC', 'wrapped': True},
+}
+
+def category_slug(category):
+    # Nom de fichier stable et sans accents problématiques : hash court du nom de catégorie
+    return hashlib.sha1((category or '').encode('utf-8')).hexdigest()[:12]
+
+def payload(rows, wrapped):
+    if wrapped:
+        return {'products': rows, 'total': len(rows), 'page': 1, 'pageSize': len(rows)}
+    return rows
+
+def encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def atomic_write(path, data):
+    # Nom temporaire propre au thread : plusieurs threads peuvent écrire le même fichier (cache d'images)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def write_variants(directory, stem, body):
+    # Écrit <stem>.json, .json.gz et .json.br ; renvoie {encodage: nom de fichier}
+    files = {'identity': f"{stem}.json", 'gzip': f"{stem}.json.gz"}
+    atomic_write(os.path.join(directory, files['identity']), body)
+    atomic_write(os.path.join(directory, files['gzip']), gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        files['br'] = f"{stem}.json.br"
+        atomic_write(os.path.join(directory, files['br']), brotli.compress(body, quality=11))
+    return files
+
+def load_rows(db_path, order):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(f"SELECT * FROM products ORDER BY {order}")]
+    finally:
+        conn.close()
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def prune_versions(directory, keep):
+    # On garde la version courante et la précédente (encore servable pour les requêtes en cours)
+    for name in os.listdir(directory):
+        if name == 'manifest.json' or '.tmp-' in name:
+            continue
+        version = name.split('.')[0].rsplit('-', 1)[-1]
+        if version not in keep:
+            os.remove(os.path.join(directory, name))
+
+def publish_snapshot(retailer, db_path=None, snapshot_dir=None):
+    """Publie le snapshot d'une enseigne ; renvoie le manifeste (inchangé si le contenu n'a pas bougé)."""
+    config = RETAILERS[retailer]
+    directory = os.path.join(snapshot_dir or SNAPSHOT_DIR, retailer)
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    rows = load_rows(db_path or config['db'], config['order'])
+    body = encode(payload(rows, config['wrapped']))
+    version = hashlib.sha1(body).hexdigest()[:16]
+    previous = read_manifest(directory)
+    if previous and previous.get('version') == version:
+        print(f"Snapshot {retailer} inchangé (version {version})")
+        return previous
+
+    manifest = {
+        'version': version,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'count': len(rows),
+        'files': write_variants(directory, f"products-{version}", body),
+        'categories': {},
+    }
+    # Shards par catégorie, dans le même ordre que le catalogue complet
+    by_category = {}
+    for row in rows:
+        by_category.setdefault(row.get('category') or '', []).append(row)
+    for category, category_rows in by_category.items():
+        stem = f"category_{category_slug(category)}-{version}"
+        manifest['categories'][category] = {
+            'count': len(category_rows),
+            'files': write_variants(directory, stem, encode(payload(category_rows, config['wrapped']))),
+        }
+    # Le manifeste est le point de bascule : écrit en dernier, atomiquement
+    atomic_write(os.path.join(directory, 'manifest.json'), encode(manifest))
+    prune_versions(directory, {version} | ({previous['version']} if previous else set()))
+    elapsed = time.perf_counter() - start
+    print(f"Snapshot {retailer} publié : version {version}, {len(rows)} produits, "
+          f"{len(by_category)} catégories ({elapsed:.2f}s)")
+    return manifest
+
+if __name__ == "__main__":
+    # Usage : python scrape_snapshot.py [action|carrefour|lidl ...]
+    retailers = sys.argv[1:] or list(RETAILERS)
+    for name in retailers:
+        if name not in RETAILERS:
+            print(f"Enseigne inconnue '{name}', choix possibles : {list(RETAILERS)}")
+            sys.exit(2)
+        if not os.path.exists(RETAILERS[name]['db']):
+            print(f"Base {RETAILERS[name]['db']} absente, snapshot {name} ignoré")
+            continue
+        publish_snapshot(name)
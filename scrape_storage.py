@@ -0,0 +1,192 @@
+# --- Stockage SQLite partagé par les scrapers Action / Carrefour / Lidl ---
+# Index UNIQUE sur l'identité produit + INSERT ... ON CONFLICT DO UPDATE en executemany,
+# avec un seul commit par lot (une page de produits).
+import os
+import re
+import html
+import hashlib
+import sqlite3
+from scrape_metrics import phase
+
+# Empreintes de pages : SCRAPE_FINGERPRINTS=0 force le re-parsing de toutes les pages
+FINGERPRINTS_ENABLED = os.environ.get('SCRAPE_FINGERPRINTS', '1') != '0'
+
+
+def identity_index_name(table='products'):
+    return f"ux_{table}_identity"
+
+def key_expressions(key_columns):
+    # IFNULL : SQLite considère deux NULL comme distincts dans un index UNIQUE,
+    # on normalise pour qu'un produit sans prix ou sans lien reste dédoublonné
+    return ', '.join(f"IFNULL({col}, '')" for col in key_columns)
+
+def deduplicate(conn, key_columns, table='products'):
+    """Supprime les doublons d'identité ; garde la ligne la plus ancienne avec le scraped_at le plus récent."""
+    keys = key_expressions(key_columns)
+    c = conn.cursor()
+    c.execute('DROP TABLE IF EXISTS temp._dedup')
+    c.execute(f'''CREATE TEMP TABLE _dedup AS
+                  SELECT MIN(id) AS keep_id, MAX(scraped_at) AS last_seen
+                  FROM {table} GROUP BY {keys} HAVING COUNT(*) > 1''')
+    c.execute(f'''UPDATE {table} SET scraped_at = (SELECT last_seen FROM temp._dedup WHERE keep_id = {table}.id)
+                  WHERE id IN (SELECT keep_id FROM temp._dedup)''')
+    c.execute(f'''DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {keys})''')
+    removed = c.rowcount
+    c.execute('DROP TABLE temp._dedup')
+    conn.commit()
+    return removed
+
+def ensure_identity_index(conn, key_columns, table='products'):
+    # Migration : au premier lancement on dédoublonne la base existante puis on pose l'index UNIQUE
+    name = identity_index_name(table)
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,)).fetchone()
+    if exists:
+        return 0
+    removed = deduplicate(conn, key_columns, table)
+    if removed:
+        print(f"Migration : {removed} doublons supprimés de {table}")
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({key_expressions(key_columns)})")
+    conn.commit()
+    return removed
+
+def upsert_sql(columns, key_columns, table='products'):
+    placeholders = ', '.join('?' for _ in columns)
+    updates = [f"{col}=excluded.{col}" for col in columns if col not in key_columns]
+    updates.append("scraped_at=excluded.scraped_at")
+    return f'''INSERT INTO {table} ({', '.join(columns)}, scraped_at, first_scraped_at)
+               VALUES ({placeholders}, datetime('now'), datetime('now'))
+               ON CONFLICT ({key_expressions(key_columns)}) DO UPDATE SET {', '.join(updates)}'''
+
+def upsert_products(conn, columns, key_columns, prods, table='products', generation=None):
+    """Écrit un lot de produits en une transaction ; renvoie le nombre de nouveaux produits."""
+    if not prods:
+        return 0
+    columns = tuple(columns)
+    if generation is not None:
+        # Chaque produit vu est tamponné avec la génération du passage (voir delete_unseen)
+        columns += ('seen_run',)
+        prods = [dict(prod, seen_run=generation) for prod in prods]
+    with phase('db_write', count=len(prods)):
+        c = conn.cursor()
+        # BEGIN IMMEDIATE : le comptage des insertions reste juste si d'autres workers écrivent en même temps
+        if not conn.in_transaction:
+            c.execute('BEGIN IMMEDIATE')
+        try:
+            before = c.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}").fetchone()[0]
+            c.executemany(upsert_sql(columns, key_columns, table), [tuple(prod.get(col) for col in columns) for prod in prods])
+            # Les lignes mises à jour gardent leur id : seules les nouvelles ont un id au-delà de l'ancien maximum
+            inserted = c.execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?", (before,)).fetchone()[0]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return inserted
+
+# --- Empreintes de pages listing ---
+# Une page dont les cartes n'ont pas changé depuis le dernier passage n'est ni parsée ni réécrite :
+# ses produits (retrouvés par page_key) voient seulement leur scraped_at rafraîchi en une requête.
+
+def ensure_fingerprint_schema(conn, table='products'):
+    conn.execute('''CREATE TABLE IF NOT EXISTS page_fingerprints (
+        page_key TEXT PRIMARY KEY,
+        fingerprint TEXT,
+        card_count INTEGER,
+        updated_at TEXT
+    )''')
+    try:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN page_key TEXT')
+    except sqlite3.OperationalError:
+        pass
+    conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_page_key ON {table} (page_key)')
+    conn.commit()
+
+def page_key(url, page):
+    return f"{url}#{page}"
+
+TAG_PATTERN = re.compile(r'<[^>]*>')
+URL_ATTR_PATTERN = re.compile(r"""\s(?:href|src)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+def normalize_fragment(fragment):
+    # Même forme pour le HTML serveur (str(card) de bs4) et le DOM du navigateur (outerHTML) : texte
+    # visible + liens et images, sans ordre ni guillemets d'attributs, entités, classes ou commentaires
+    # d'hydratation. Basculer de backend en mode auto ne change donc pas l'empreinte d'une page.
+    urls = [html.unescape(next(group for group in match.groups() if group is not None))
+            for match in URL_ATTR_PATTERN.finditer(fragment)]
+    text = html.unescape(TAG_PATTERN.sub(' ', fragment))
+    return ' '.join(text.split()) + '\0' + ' '.join(urls)
+
+def fingerprint(fragments):
+    # Hash des cartes normalisées, dans l'ordre de la page
+    digest = hashlib.sha1()
+    for fragment in fragments:
+        digest.update(normalize_fragment(fragment).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def identity_count(prods, key_columns):
+    # Lignes réellement stockées pour une page : des cartes en double n'en font qu'une (index UNIQUE)
+    return len({tuple('' if prod.get(col) is None else prod.get(col) for col in key_columns) for prod in prods})
+
+def page_unchanged(conn, key, page_fingerprint, table='products'):
+    if not FINGERPRINTS_ENABLED:
+        return False
+    row = conn.execute('SELECT fingerprint, card_count FROM page_fingerprints WHERE page_key=?', (key,)).fetchone()
+    if row is None or row[0] != page_fingerprint:
+        return False
+    # card_count = produits distincts de la page (identity_count) ; un produit réapparu sur une autre
+    # page a changé de page_key : on ne rejoue que si la page est complète
+    stored = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE page_key=?', (key,)).fetchone()[0]
+    return stored >= row[1]
+
+def replay_page(conn, key, generation=None, table='products'):
+    """Rafraîchit scraped_at (et la génération) des produits d'une page inchangée ; renvoie leur nombre."""
+    with phase('db_write'):
+        if generation is None:
+            c = conn.execute(f"UPDATE {table} SET scraped_at=datetime('now') WHERE page_key=?", (key,))
+        else:
+            c = conn.execute(f"UPDATE {table} SET scraped_at=datetime('now'), seen_run=? WHERE page_key=?", (generation, key))
+        conn.commit()
+    return c.rowcount
+
+def record_fingerprint(conn, key, page_fingerprint, card_count):
+    conn.execute('''INSERT INTO page_fingerprints (page_key, fingerprint, card_count, updated_at)
+                    VALUES (?, ?, ?, datetime('now'))
+                    ON CONFLICT (page_key) DO UPDATE SET fingerprint=excluded.fingerprint,
+                        card_count=excluded.card_count, updated_at=excluded.updated_at''',
+                 (key, page_fingerprint, card_count))
+    conn.commit()
+
+# --- Nettoyage ensembliste des produits disparus ---
+# Chaque passage sur une catégorie ouvre une génération (scrape_runs.id, croissant) ; les produits vus
+# sont tamponnés seen_run=génération à l'écriture, et le nettoyage est un seul DELETE indexé
+# des lignes du périmètre restées sur une génération antérieure.
+
+def ensure_generation_schema(conn, table='products'):
+    conn.execute('''CREATE TABLE IF NOT EXISTS scrape_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scope TEXT,
+        started_at TEXT
+    )''')
+    try:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN seen_run INTEGER')
+    except sqlite3.OperationalError:
+        pass
+    conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_scope_seen_run ON {table} (category, subcategory, seen_run)')
+    conn.commit()
+
+def start_generation(conn, scope):
+    c = conn.execute("INSERT INTO scrape_runs (scope, started_at) VALUES (?, datetime('now'))", (scope,))
+    conn.commit()
+    return c.lastrowid
+
+def delete_unseen(conn, generation, category, subcategory=None, table='products'):
+    """Supprime les produits du périmètre non vus pendant la génération ; renvoie le nombre supprimé."""
+    where = 'category=?'
+    params = [category]
+    if subcategory is not None:
+        where += ' AND subcategory=?'
+        params.append(subcategory)
+    with phase('cleanup'):
+        c = conn.execute(f'DELETE FROM {table} WHERE {where} AND IFNULL(seen_run, 0) < ?', params + [generation])
+        conn.commit()
+    return c.rowcount
@@ -2,9 +2,12 @@ import express from 'express';
 import cors from 'cors';
 import sqlite3pkg from 'sqlite3';
 import path from 'path';
+import fs from 'fs';
 import bodyParser from 'body-parser';
 import { fileURLToPath } from 'url';
 import { spawn } from 'child_process';
+import { EventEmitter } from 'events';
+import readline from 'readline';
 
 const sqlite3 = sqlite3pkg.verbose();
 const app = express();
@@ -83,6 +86,63 @@ function updateLastScrape(user_id, site, categorie, mot_cle) {
   );
 }
 
+// --- Lancement des scrapers Python ---
+// Par défaut un process par demande. Avec SCRAPER_DAEMON=1, les jobs sont envoyés au service résident
+// scrape_daemon.py (Chrome gardé chaud, file dédoublonnée) ; l'objet renvoyé imite un process
+// (stdout/stderr/'close') pour que les endpoints n'aient pas à changer.
+const USE_SCRAPER_DAEMON = process.env.SCRAPER_DAEMON === '1';
+let scraperDaemon = null;
+const daemonRequests = new Map();
+let nextDaemonRequest = 1;
+
+function getScraperDaemon() {
+  if (scraperDaemon) return scraperDaemon;
+  scraperDaemon = spawn('./venv/bin/python3', ['-u', 'scrape_daemon.py']);
+  readline.createInterface({ input: scraperDaemon.stdout }).on('line', line => {
+    let event;
+    try {
+      event = JSON.parse(line);
+    } catch {
+      return;
+    }
+    (event.ids || []).forEach(id => {
+      const proc = daemonRequests.get(id);
+      if (!proc) return;
+      if (event.event === 'log') {
+        proc.stdout.emit('data', Buffer.from(event.line + '\n'));
+      } else if (event.event === 'progress') {
+        proc.stdout.emit('data', Buffer.from(`PROGRESS: ${event.value}\n`));
+      } else if (event.event === 'error') {
+        proc.stderr.emit('data', Buffer.from(`${event.step ? event.step + ' : ' : ''}${event.message}\n`));
+      } else if (event.event === 'done') {
+        daemonRequests.delete(id);
+        proc.emit('close', event.ok ? 0 : 1);
+      }
+    });
+  });
+  scraperDaemon.stderr.on('data', data => process.stderr.write(data));
+  scraperDaemon.on('close', () => {
+    // Service arrêté : les demandes en cours échouent, le prochain job le relance
+    scraperDaemon = null;
+    daemonRequests.forEach(proc => proc.emit('close', 1));
+    daemonRequests.clear();
+  });
+  return scraperDaemon;
+}
+
+function runScraper(retailer, category) {
+  if (!USE_SCRAPER_DAEMON) {
+    return spawn('./venv/bin/python3', ['-u', `scrape_${retailer}.py`, ...(category ? [category] : [])]);
+  }
+  const proc = new EventEmitter();
+  proc.stdout = new EventEmitter();
+  proc.stderr = new EventEmitter();
+  const id = String(nextDaemonRequest++);
+  daemonRequests.set(id, proc);
+  getScraperDaemon().stdin.write(JSON.stringify({ id, retailer, category: category || null }) + '\n');
+  return proc;
+}
+
 // --- Fonction utilitaire pour scrapper une catégorie et retourner les produits à jour ---
 function scrapeCategory(category) {
   return new Promise((resolve, reject) => {
@@ -92,7 +152,7 @@ function scrapeCategory(category) {
       return reject(new Error('Catégorie non supportée'));
     }
     // Lancer le script Python
-    const py = spawn('./venv/bin/python3', ['-u', 'scrape_action.py', '--category', category]);
+    const py = runScraper('action', category);
     let error = '';
     py.stderr.on('data', data => { error += data.toString(); });
     py.on('close', code => {
@@ -124,30 +184,110 @@ app.post('/scrape', async (req, res) => {
   return res.status(400).json({ success: false, error: 'Aucun site de scraping n\'est supporté.' });
 });
 
+// Images produit mises en cache par scrape_images.py : noms = hash du contenu, donc immuables
+const IMAGE_DIR = process.env.SCRAPE_IMAGE_DIR || path.join(__dirname, 'images');
+app.use('/images', express.static(IMAGE_DIR, { immutable: true, maxAge: '365d', index: false }));
+
+// Snapshots JSON publiés en fin de run par les scrapers Python (scrape_snapshot.py) :
+// fichiers déjà triés et compressés, servis avec un ETag dérivé de la version.
+// Sans snapshot (ou catégorie inconnue), on retombe sur la requête SQL.
+const SNAPSHOT_DIR = process.env.SCRAPE_SNAPSHOT_DIR || path.join(__dirname, 'snapshots');
+const snapshotManifests = {};
+
+function readSnapshotManifest(retailer) {
+  const manifestPath = path.join(SNAPSHOT_DIR, retailer, 'manifest.json');
+  try {
+    const { mtimeMs } = fs.statSync(manifestPath);
+    const cached = snapshotManifests[retailer];
+    if (cached && cached.mtimeMs === mtimeMs) return cached.manifest;
+    const manifest = JSON.parse(fs.readFileSync(manifestPath, 'utf8'));
+    snapshotManifests[retailer] = { mtimeMs, manifest };
+    return manifest;
+  } catch {
+    return null;
+  }
+}
+
+function serveSnapshot(retailer, req, res, fallback) {
+  const manifest = readSnapshotManifest(retailer);
+  const category = req.query.category;
+  // ?category=a&category=b donne un tableau : refusé ici comme par la requête SQL de repli
+  if (category !== undefined && typeof category !== 'string') {
+    return res.status(400).json({ error: 'Paramètre category invalide.' });
+  }
+  let entry = null;
+  if (manifest && category === undefined) {
+    entry = manifest;
+  } else if (manifest && manifest.categories && Object.prototype.hasOwnProperty.call(manifest.categories, category)) {
+    // hasOwnProperty : "__proto__" ou "constructor" ne sont pas des catégories publiées
+    entry = manifest.categories[category];
+  }
+  if (!entry || !entry.files || !entry.files.identity) return fallback();
+
+  const etag = `"${path.basename(entry.files.identity, '.json')}"`;
+  res.set('ETag', etag);
+  res.set('Vary', 'Accept-Encoding');
+  res.set('Cache-Control', 'no-cache');
+  if (req.headers['if-none-match'] === etag) {
+    res.status(304).end();
+    return;
+  }
+  const accepted = req.headers['accept-encoding'] || '';
+  let file = entry.files.identity;
+  if (entry.files.br && /\bbr\b/.test(accepted)) {
+    file = entry.files.br;
+    res.set('Content-Encoding', 'br');
+  } else if (entry.files.gzip && /\bgzip\b/.test(accepted)) {
+    file = entry.files.gzip;
+    res.set('Content-Encoding', 'gzip');
+  }
+  res.type('application/json');
+  res.sendFile(path.join(SNAPSHOT_DIR, retailer, file), { etag: false, lastModified: false, acceptRanges: false }, (err) => {
+    // Fichier supprimé entre-temps (nouvelle version publiée) : repli sur la base
+    if (err && !res.headersSent) {
+      res.removeHeader('Content-Encoding');
+      res.removeHeader('ETag');
+      fallback();
+    }
+  });
+}
+
 // API pour récupérer les produits Action scrappés
 app.get('/api/action-products', (req, res) => {
-  const db = new sqlite3.Database(path.join(__dirname, 'action_products.sqlite'));
-  db.all('SELECT * FROM products ORDER BY scraped_at DESC', [], (err, rows) => {
-    if (err) {
-      res.status(500).json({ error: err.message });
-      return;
-    }
-    res.json(rows);
+  serveSnapshot('action', req, res, () => {
+    const db = new sqlite3.Database(path.join(__dirname, 'action_products.sqlite'));
+    const { category } = req.query;
+    const sql = category === undefined
+      ? 'SELECT * FROM products ORDER BY scraped_at DESC'
+      : 'SELECT * FROM products WHERE category = ? ORDER BY scraped_at DESC';
+    db.all(sql, category === undefined ? [] : [category], (err, rows) => {
+      if (err) {
+        res.status(500).json({ error: err.message });
+        return;
+      }
+      res.json(rows);
+    });
+    db.close();
   });
-  db.close();
 });
 
 // API pour récupérer les produits Carrefour scrappés
 app.get('/api/carrefour-products', (req, res) => {
-  const db = new sqlite3.Database(path.join(__dirname, 'carrefour_products.sqlite'));
-  db.all('SELECT * FROM products ORDER BY id DESC', [], (err, rows) => {
-    if (err) {
-      res.status(500).json({ error: err.message });
-      return;
-    }
-    res.json(rows);
+  serveSnapshot('carrefour', req, res, () => {
+    const db = new sqlite3.Database(path.join(__dirname, 'carrefour_products.sqlite'));
+    const { category } = req.query;
+    const sql = category === undefined
+      ? 'SELECT * FROM products ORDER BY id DESC'
+      : 'SELECT * FROM products WHERE category = ? ORDER BY id DESC';
+    db.all(sql, category === undefined ? [] : [category], (err, rows) => {
+      if (err) {
+        res.status(500).json({ error: err.message });
+        return;
+      }
+      res.json(rows);
+    });
+    db.close();
   });
-  db.close();
 });
 
 // Endpoint pour rafraîchir une catégorie Action
@@ -156,14 +296,14 @@ app.post('/api/refresh-action', async (req, res) => {
   let py;
   if (!category) {
     // Scraper toutes les catégories si aucune n'est précisée
-    py = spawn('./venv/bin/python3', ['-u', 'scrape_action.py']);
+    py = runScraper('action');
   } else {
     // Catégories autorisées (pour sécurité)
     const allowed = ['food', 'decorations', 'cuisine', 'menagers', 'papeterie', 'hobby'];
     if (!allowed.includes(category)) {
       return res.status(400).json({ success: false, error: 'Catégorie non supportée.' });
     }
-    py = spawn('./venv/bin/python3', ['-u', 'scrape_action.py', category]);
+    py = runScraper('action', category);
   }
   let output = '';
   let error = '';
@@ -190,7 +330,7 @@ app.post('/api/refresh-carrefour', async (req, res) => {
     return res.status(400).json({ success: false, error: 'Catégorie non supportée.' });
   }
   // Lancer le script Python
-  const py = spawn('./venv/bin/python3', ['-u', 'scrape_carrefour.py', category]);
+  const py = runScraper('carrefour', category);
   let output = '';
   let error = '';
   py.stdout.on('data', data => { output += data.toString(); });
@@ -213,14 +353,14 @@ app.get('/api/refresh-action-progress', (req, res) => {
     return;
   }
   if (category === 'all') {
-    py = spawn('./venv/bin/python3', ['-u', 'scrape_action.py']);
+    py = runScraper('action');
   } else {
     const allowed = ['food', 'decorations', 'cuisine', 'menagers', 'papeterie', 'hobby'];
     if (!allowed.includes(category)) {
       res.status(400).end('Catégorie non supportée');
       return;
     }
-    py = spawn('./venv/bin/python3', ['-u', 'scrape_action.py', category]);
+    py = runScraper('action', category);
   }
   res.writeHead(200, {
     'Content-Type': 'text/event-stream',
@@ -256,14 +396,14 @@ app.get('/api/refresh-carrefour-progress', (req, res) => {
     return;
   }
   if (category === 'all') {
-    py = spawn('./venv/bin/python3', ['-u', 'scrape_carrefour.py']);
+    py = runScraper('carrefour');
   } else {
     const allowed = ['toys', 'food', 'cuisine', 'entretien', 'maison', 'papeterie', 'loisirs', 'informatique', 'image_son', 'smartphones', 'bagagerie', 'bebe'];
     if (!allowed.includes(category)) {
       res.status(400).end('Catégorie non supportée');
       return;
     }
-    py = spawn('./venv/bin/python3', ['-u', 'scrape_carrefour.py', category]);
+    py = runScraper('carrefour', category);
   }
   res.writeHead(200, {
     'Content-Type': 'text/event-stream',
@@ -376,7 +516,7 @@ app.post('/api/scrape-carrefour-with-alerts', async (req, res) => {
   // 1. Scrapper la catégorie Carrefour
   let newProducts = [];
   try {
-    const py = spawn('./venv/bin/python3', ['-u', 'scrape_carrefour.py', category]);
+    const py = runScraper('carrefour', category);
     await new Promise((resolve, reject) => {
       py.on('close', code => {
         if (code === 0) resolve();
@@ -440,15 +580,19 @@ app.post('/api/scrape-carrefour-with-alerts', async (req, res) => {
 
 // Endpoint pour les produits Lidl (TOUS les produits, sans pagination)
 app.get('/api/lidl-products', (req, res) => {
+  serveSnapshot('lidl', req, res, () => {
     const db = new sqlite3.Database('lidl_products.sqlite');
+    const { category } = req.query;
+    const where = category === undefined ? '' : 'WHERE category = ?';
+    const params = category === undefined ? [] : [category];
     db.all(
-        `SELECT * FROM products ORDER BY scraped_at DESC`,
-        [],
+        `SELECT * FROM products ${where} ORDER BY scraped_at DESC`,
+        params,
         (err, rows) => {
             if (err) {
                 res.status(500).json({ error: err.message });
             } else {
-                db.get('SELECT COUNT(*) as count FROM products', (err2, countRow) => {
+                db.get(`SELECT COUNT(*) as count FROM products ${where}`, params, (err2, countRow) => {
                     db.close();
                     if (err2) {
                         res.status(500).json({ error: err2.message });
@@ -464,13 +608,48 @@ app.get('/api/lidl-products', (req, res) => {
             }
         }
     );
+  });
 });
 
 // Endpoint SSE pour la progression du scraping Lidl
 app.get('/api/refresh-lidl-progress', (req, res) => {
   const category = req.query.category; // Pour compatibilité future
   // Pour l'instant, on ignore category car il n'y a qu'une catégorie
-  const py = spawn('./venv/bin/python3', ['-u', 'scrape_lidl.py']);
+  const py = runScraper('lidl');
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive',
+  });
+  py.stdout.on('data', data => {
+    const lines = data.toString().split('\n');
+    lines.forEach(line => {
+      if (line.startsWith('PROGRESS:')) {
+        const progress = line.replace('PROGRESS:', '').trim();
+        res.write(`event: progress\ndata: ${progress}\n\n`);
+      } else if (line.trim()) {
+        res.write(`event: log\ndata: ${line}\n\n`);
+      }
+    });
+  });
+  py.stderr.on('data', data => {
+    res.write(`event: error\ndata: ${data.toString()}\n\n`);
+  });
+  py.on('close', code => {
+    res.write(`event: done\ndata: ${code}\n\n`);
+    res.end();
+  });
+});
+
+// Endpoint SSE pour rafraîchir toutes les enseignes en parallèle (scrape_all.py) :
+// durée ≈ celle de l'enseigne la plus lente, progression globale sur l'ensemble des étapes
+app.get('/api/refresh-all-progress', (req, res) => {
+  const allowed = ['action', 'carrefour', 'lidl'];
+  const retailers = req.query.retailers ? String(req.query.retailers).split(',') : [];
+  if (retailers.some(retailer => !allowed.includes(retailer))) {
+    return res.status(400).json({ success: false, error: 'Enseigne non supportée.' });
+  }
+  const py = spawn('./venv/bin/python3', ['-u', 'scrape_all.py', ...retailers]);
   res.writeHead(200, {
     'Content-Type': 'text/event-stream',
     'Cache-Control': 'no-cache',
@@ -0,0 +1,30 @@
+import os
+import sys
+
+# Les modules scrape_*.py sont à la racine du dépôt (scripts lancés depuis la racine)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Pas de fichiers de métriques / snapshots écrits par les tests
+os.environ.setdefault('SCRAPE_METRICS_DIR', '')
+
+import pytest
+
+import scrape_action
+
+def product(name, **fields):
+    # Produit tel que le renvoient les extracteurs Action (colonnes de scrape_action.PRODUCT_COLUMNS)
+    return dict(dict(name=name, description='', price=1.0, image_url='', product_url=None,
+                     category='Cuisine', subcategory='Poêles', page_key=None), **fields)
+
+@pytest.fixture
+def make_product():
+    return product
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Base Action temporaire (setup_database complet), sans attente de politesse ; renvoie (conn, c)."""
+    monkeypatch.setattr(scrape_action, 'DB_PATH', str(tmp_path / 'action.sqlite'))
+    monkeypatch.setattr(scrape_action.scheduler, 'acquire', lambda target: None)
+    monkeypatch.setattr(scrape_action.scheduler, 'report', lambda *args, **kwargs: None)
+    conn, c = scrape_action.setup_database()
+    yield conn, c
+    conn.close()
@@ -0,0 +1,62 @@
+import pytest
+import requests
+
+import scrape_action
+
+class BlockedSession:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        raise self.error
+
+class StatusSession:
+    # Réponse 403 réelle : l'erreur vient de raise_for_status() dans fetch_html
+    def __init__(self, status):
+        self.status = status
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        response = blocked_response(self.status)
+        response._content = b'<html><title>Access denied</title></html>'
+        return response
+
+class FakeLazyDriver:
+    def __init__(self):
+        self.requested = 0
+
+    def get(self):
+        self.requested += 1
+        return 'driver'
+
+def blocked_response(status):
+    response = requests.Response()
+    response.status_code = status
+    response.url = 'https://www.action.com/fr-fr/c/cuisine/poeles/'
+    return response
+
+@pytest.mark.parametrize('session', [
+    StatusSession(403),
+    StatusSession(429),
+    BlockedSession(requests.ConnectionError('connexion refusée')),
+])
+def test_auto_backend_falls_back_to_browser_on_http_error(database, monkeypatch, session):
+    conn, c = database
+    browser_calls = []
+    monkeypatch.setattr(scrape_action, 'scrape_subcategory',
+                        lambda driver, url, category, subcategory, conn, c, journal=None: browser_calls.append(driver) or 7)
+    lazy_driver = FakeLazyDriver()
+    inserted = scrape_action.scrape_subcategory_with_backend('auto', session, lazy_driver, 'https://www.action.com/fr-fr/c/cuisine/poeles/',
+                                                            'Cuisine', 'Poêles', conn, c)
+    assert inserted == 7
+    assert session.calls == 1 and browser_calls == ['driver']
+
+def test_http_backend_propagates_http_error(database):
+    conn, c = database
+    session = BlockedSession(requests.HTTPError('429 Too Many Requests', response=blocked_response(429)))
+    with pytest.raises(requests.HTTPError):
+        scrape_action.scrape_subcategory_with_backend('http', session, FakeLazyDriver(), 'https://www.action.com/fr-fr/c/cuisine/poeles/',
+                                                      'Cuisine', 'Poêles', conn, c)
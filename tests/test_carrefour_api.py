@@ -0,0 +1,30 @@
+import os
+import json
+
+import scrape_carrefour
+from scrape_network import JsonCapture
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def load(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+def test_api_mapping_matches_dom_extraction():
+    payload = json.loads(load('carrefour_listing_api.json'))
+    dom = scrape_carrefour.extract_products_from_html(load('carrefour_cards.html'), 'Boissons & Alimentation', '', 'html.parser')
+    api = scrape_carrefour.products_from_payloads([('https://www.carrefour.fr/r/boissons?page=2', payload)],
+                                                  'Boissons & Alimentation', '', len(dom))
+    assert api == dom
+
+def test_api_price_ignores_unit_and_loyalty_prices():
+    payload = json.loads(load('carrefour_listing_api.json'))
+    prod = scrape_carrefour.product_from_api(payload['data'][0], 'Boissons & Alimentation', '')
+    assert prod['promo_price'] == 4.99 and prod['old_price'] == 6.99 and prod['reduction_percent'] == 29
+
+def test_capture_only_matches_listing_responses():
+    capture = JsonCapture(None, scrape_carrefour.JSON_API_PATTERNS)
+    assert capture.matches({'url': 'https://www.carrefour.fr/r/boissons?page=2', 'mimeType': 'application/vnd.api+json'})
+    assert not capture.matches({'url': 'https://www.carrefour.fr/api/config', 'mimeType': 'application/json'})
+    assert not capture.matches({'url': 'https://www.carrefour.fr/tracking/collect', 'mimeType': 'application/json'})
+    assert not capture.matches({'url': 'https://www.carrefour.fr/r/boissons', 'mimeType': 'text/html'})
@@ -0,0 +1,97 @@
+import pytest
+
+import scrape_action
+import scrape_catalog
+from scrape_catalog import open_catalog, list_products
+
+@pytest.fixture
+def catalog(tmp_path):
+    conn = open_catalog(str(tmp_path / 'catalog.sqlite'))
+    for retailer in ('action', 'carrefour', 'lidl'):
+        conn.execute('INSERT INTO retailers (code) VALUES (?)', (retailer,))
+    conn.executemany('INSERT INTO categories (retailer_id, name, subcategory) VALUES (?, ?, ?)',
+                     [(retailer_id, f"Rayon {k}", f"Sous-rayon {s}") for retailer_id in (1, 2, 3) for k in range(6) for s in range(4)])
+    categories = conn.execute('SELECT id, retailer_id FROM categories').fetchall()
+    rows = []
+    for index in range(6000):
+        category_id, retailer_id = categories[index * 7 % len(categories)]
+        rows.append((retailer_id, category_id, index, f"Produit {index}", 1.0 + index % 50, (index * 3) % 40 or None,
+                     f"2024-01-{1 + index % 28:02d}"))
+    conn.executemany('''INSERT INTO products (retailer_id, category_id, source_id, name, price, reduction_percent, first_scraped_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''', rows)
+    conn.execute('ANALYZE')
+    conn.commit()
+    yield conn
+    conn.close()
+
+def query_plan(conn, **filters):
+    # Plan de la requête réellement émise par list_products
+    statements = []
+    real_execute = conn.execute
+
+    class Recorder:
+        def execute(self, sql, params=()):
+            statements.append((sql, params))
+            return real_execute(sql, params)
+
+    list_products(Recorder(), **filters)
+    sql, params = statements[-1]
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+@pytest.mark.parametrize('filters, index', [
+    ({}, 'ix_catalog_newest'),
+    ({'retailer': 'action'}, 'ix_catalog_retailer_newest'),
+    ({'retailer': 'action', 'category': 'Rayon 1'}, 'ix_catalog_retailer_newest'),
+    ({'retailer': 'action', 'category': 'Rayon 1', 'subcategory': 'Sous-rayon 2'}, 'ix_catalog_category_newest'),
+    ({'retailer': 'lidl', 'order': 'reduction'}, 'ix_catalog_retailer_reduction'),
+])
+def test_listing_reads_covering_index_in_order(catalog, filters, index):
+    plan = query_plan(catalog, **filters)
+    products_steps = [step for step in plan if step.split()[1] == 'p']
+    assert products_steps == [step for step in products_steps if f'USING COVERING INDEX {index}' in step], plan
+    assert len(products_steps) == 1, plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+def test_listing_order_and_filters(catalog):
+    listed = list_products(catalog, 'action', 'Rayon 1', 'Sous-rayon 2', limit=20)
+    assert listed and all((row['retailer'], row['category'], row['subcategory']) == ('action', 'Rayon 1', 'Sous-rayon 2')
+                          for row in listed)
+    keys = [(row['first_scraped_at'], row['id']) for row in listed]
+    assert keys == sorted(keys, reverse=True)
+    reductions = list_products(catalog, 'lidl', order='reduction', limit=50)
+    keys = [(row['reduction_percent'], row['id']) for row in reductions]
+    assert keys == sorted(keys, reverse=True) and all(row['reduction_percent'] > 0 for row in reductions)
+
+def test_outdated_index_definition_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'catalog.sqlite')
+    conn = open_catalog(path)
+    conn.execute('DROP INDEX ix_catalog_category_newest')
+    conn.execute('CREATE INDEX ix_catalog_category_newest ON products (category_id, first_scraped_at DESC)')
+    conn.commit()
+    conn.close()
+    conn = open_catalog(path)
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name='ix_catalog_category_newest'").fetchone()[0]
+    conn.close()
+    assert sql == f"CREATE INDEX ix_catalog_category_newest ON {scrape_catalog.CATALOG_INDEXES['ix_catalog_category_newest']}"
+
+def test_sync_projects_retailer_database(database, make_product, tmp_path):
+    conn, _ = database
+    scrape_action.insert_products(conn, [make_product('Poêle', price=9.99), make_product('Bougie', subcategory='Bougies')])
+    db_path, catalog_path = scrape_action.DB_PATH, str(tmp_path / 'catalog.sqlite')
+    assert scrape_catalog.sync_catalog('action', db_path, catalog_path) == (2, 0)
+    # Resynchronisation sans changement : aucune ligne réécrite
+    assert scrape_catalog.sync_catalog('action', db_path, catalog_path) == (0, 0)
+    conn.execute("DELETE FROM products WHERE name='Bougie'")
+    conn.commit()
+    assert scrape_catalog.sync_catalog('action', db_path, catalog_path) == (0, 1)
+    catalog = open_catalog(catalog_path)
+    try:
+        listed = list_products(catalog, 'action')
+        assert [(row['name'], row['price'], row['subcategory']) for row in listed] == [('Poêle', 9.99, 'Poêles')]
+        assert catalog.execute('SELECT COUNT(*) FROM categories').fetchone()[0] == 1
+    finally:
+        catalog.close()
+
+def test_sync_is_opt_in(monkeypatch):
+    monkeypatch.setattr(scrape_catalog, 'sync_catalog', lambda *args: pytest.fail("synchronisation non demandée"))
+    assert scrape_catalog.sync_catalog_if_enabled('action') is None
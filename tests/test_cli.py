@@ -0,0 +1,20 @@
+import pytest
+
+import scrape_action
+import scrape_carrefour
+import scrape_lidl
+
+@pytest.mark.parametrize('module', [scrape_action, scrape_carrefour, scrape_lidl])
+def test_profile_flag_parsed_the_same_way(module):
+    assert module.parse_args(['--profile']).profile
+    assert not module.parse_args([]).profile
+
+@pytest.mark.parametrize('module', [scrape_action, scrape_carrefour, scrape_lidl])
+def test_unknown_flag_is_rejected(module):
+    with pytest.raises(SystemExit):
+        module.parse_args(['--profle'])
+
+def test_carrefour_category_argument():
+    assert scrape_carrefour.parse_args(['food']).category == 'food'
+    assert scrape_carrefour.parse_args(['--category', 'food']).category == 'food'
+    assert scrape_carrefour.parse_args([]).category is None
@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+import scrape_daemon
+from scrape_daemon import EventWriter, JobOutput, ScraperDaemon
+
+class FakeDriver:
+    driver = None
+
+class FakeRunner:
+    def __init__(self):
+        self.lazy_driver = FakeDriver()
+        self.ran = []
+
+    def steps(self, job):
+        return [(job.subcategory or 'tout', lambda: self.ran.append(job.key))]
+
+@pytest.fixture
+def daemon(monkeypatch):
+    # Threads non démarrés : submit() ne fait que mettre en file, run() est appelé par le test
+    for name in ('cache_images_if_enabled', 'sync_catalog_if_enabled', 'publish_snapshot'):
+        monkeypatch.setattr(scrape_daemon, name, lambda *args, **kwargs: None)
+    stream = io.StringIO()
+    writer = EventWriter(stream)
+    daemon = ScraperDaemon(writer, JobOutput(writer))
+    daemon.events = lambda: [json.loads(line) for line in stream.getvalue().splitlines()]
+    return daemon
+
+def test_identical_request_subscribes_to_pending_job(daemon):
+    daemon.submit({'id': 'a', 'retailer': 'action', 'category': 'food'})
+    daemon.submit({'id': 'b', 'retailer': 'action', 'category': 'food', 'subcategory': ''})
+    daemon.submit({'id': 'c', 'retailer': 'action', 'category': 'food', 'subcategory': 'Snacks'})
+    assert daemon.queues['action'].qsize() == 2
+    job = daemon.queues['action'].get()
+    assert job.ids == ['a', 'b']
+    queued = [event for event in daemon.events() if event['event'] == 'queued']
+    assert queued[1] == {'event': 'queued', 'job': 'a', 'ids': ['a', 'b'], 'deduplicated': True}
+
+def test_same_request_runs_again_once_finished(daemon):
+    runner = FakeRunner()
+    daemon.submit({'id': 'a', 'retailer': 'lidl'})
+    daemon.run(runner, daemon.queues['lidl'].get())
+    daemon.submit({'id': 'b', 'retailer': 'lidl'})
+    assert daemon.queues['lidl'].qsize() == 1
+    assert daemon.queues['lidl'].get().ids == ['b']
+    done = [event for event in daemon.events() if event['event'] == 'done']
+    assert done == [{'event': 'done', 'job': 'a', 'ids': ['a'], 'ok': True}]
+    assert runner.ran == [('lidl', None, None)]
+
+def test_unknown_retailer_is_rejected(daemon):
+    daemon.submit({'id': 'x', 'retailer': 'auchan'})
+    assert all(q.empty() for q in daemon.queues.values())
+    assert [event['event'] for event in daemon.events()] == ['error', 'done']
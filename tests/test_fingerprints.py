@@ -0,0 +1,42 @@
+from bs4 import BeautifulSoup
+
+import scrape_action
+from scrape_storage import fingerprint, start_generation
+
+SERVER_CARD = ('<div class="card" data-testid="product-card"><a href="/fr-fr/p/1?a=1&amp;b=2">'
+               '<img src="/i/1.jpg" alt="Poêle"/></a><span class="title">Poêle&nbsp;24 cm</span>'
+               '<span class="price">9,99 €</span></div>')
+# Même carte lue dans le DOM : attributs réordonnés, classe ajoutée à l'hydratation, commentaire React
+BROWSER_CARD = ('<div data-testid="product-card" class="card is-hydrated"><a href="/fr-fr/p/1?a=1&amp;b=2">'
+                '<img alt="Poêle" src="/i/1.jpg"></a><span class="title">Poêle 24 cm</span><!-- -->'
+                '<span class="price">9,99 €</span></div>')
+
+def test_same_card_has_same_fingerprint_on_both_backends():
+    server = str(BeautifulSoup(SERVER_CARD, 'html.parser').div)
+    assert fingerprint([server]) == fingerprint([BROWSER_CARD])
+
+def test_content_changes_change_fingerprint():
+    reference = fingerprint([SERVER_CARD])
+    assert fingerprint([SERVER_CARD.replace('9,99', '8,99')]) != reference
+    assert fingerprint([SERVER_CARD.replace('/i/1.jpg', '/i/2.jpg')]) != reference
+    assert fingerprint([SERVER_CARD.replace('/p/1', '/p/2')]) != reference
+
+def test_page_with_duplicate_cards_is_replayed(database, make_product):
+    conn, _ = database
+    product = make_product('Poêle', description='24 cm', price=9.99, image_url='/i/1.jpg',
+                           product_url='https://www.action.com/fr-fr/p/1')
+    other = dict(product, name='Casserole', product_url='https://www.action.com/fr-fr/p/2')
+    fragments = [SERVER_CARD, SERVER_CARD, SERVER_CARD.replace('Poêle', 'Casserole')]
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return [dict(product), dict(product), dict(other)]
+
+    key = 'https://www.action.com/fr-fr/c/cuisine/poeles/#1'
+    scrape_action.store_or_replay_page(conn, key, fragments, extract, start_generation(conn, 'premier'))
+    generation = start_generation(conn, 'second')
+    scrape_action.store_or_replay_page(conn, key, fragments, extract, generation)
+    # Deuxième passage : page rejouée sans extraction, les deux produits distincts tamponnés
+    assert len(calls) == 1
+    assert conn.execute('SELECT COUNT(*) FROM products WHERE seen_run=?', (generation,)).fetchone()[0] == 2
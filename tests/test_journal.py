@@ -0,0 +1,97 @@
+import pytest
+
+import scrape_action
+from scrape_journal import RunJournal
+
+SCOPE = 'action:test'
+UNITS = [('Cuisine', 'Poêles'), ('Cuisine', 'Casseroles')]
+
+class FakeSite:
+    """Listing par sous-catégorie ; une sous-catégorie dans `failing` lève après avoir écrit sa première page."""
+    def __init__(self, listings, make_product):
+        self.listings = listings
+        self.make_product = make_product
+        self.failing = set()
+        self.scraped = []
+
+    def scrape(self, backend, session, lazy_driver, url, category_name, subcategory, conn, c, journal=None):
+        self.scraped.append(subcategory)
+        generation = scrape_action.begin_subcategory(conn, category_name, subcategory, journal)
+        prods = [self.make_product(name, subcategory=subcategory) for name in self.listings[subcategory]]
+        inserted = scrape_action.insert_products(conn, prods[:1], generation=generation)
+        if subcategory in self.failing:
+            raise RuntimeError('page 2 injoignable')
+        inserted += scrape_action.insert_products(conn, prods[1:], generation=generation)
+        scrape_action.end_subcategory(conn, category_name, subcategory, generation, inserted, journal)
+        return inserted
+
+def launch(conn, c, site, **options):
+    journal = RunJournal(conn, SCOPE, 'action', **options)
+    for category, subcategory in UNITS:
+        try:
+            scrape_action.scrape_subcategory_with_backend('http', None, None, '', category, subcategory, conn, c, journal)
+        except RuntimeError:
+            pass
+    return journal, journal.finish(conn, UNITS)
+
+def names(conn, subcategory):
+    return sorted(row[0] for row in conn.execute('SELECT name FROM products WHERE subcategory=?', (subcategory,)))
+
+@pytest.fixture
+def site(monkeypatch, make_product):
+    site = FakeSite({'Poêles': ['Poêle 20', 'Poêle 24'], 'Casseroles': ['Casserole 16', 'Casserole 18']}, make_product)
+    monkeypatch.setattr(scrape_action, 'scrape_subcategory_backends', site.scrape)
+    return site
+
+def seed_previous_run(conn, c, site):
+    # Un run complet précédent, avec un produit qui a depuis disparu du site
+    site.listings['Casseroles'].append('Casserole 28')
+    _, finished = launch(conn, c, site)
+    assert finished
+    site.listings['Casseroles'].remove('Casserole 28')
+    site.scraped.clear()
+
+def test_failed_subcategory_is_retried_and_run_finishes(database, site):
+    conn, c = database
+    seed_previous_run(conn, c, site)
+
+    site.failing.add('Casseroles')
+    journal, finished = launch(conn, c, site)
+    assert not finished
+    assert journal.unit(conn, 'Cuisine', 'Casseroles')[1] == 'failed'
+    # Nettoyage différé : le produit disparu reste tant que le run n'est pas terminé
+    assert 'Casserole 28' in names(conn, 'Casseroles')
+
+    site.failing.clear()
+    site.scraped.clear()
+    resumed, finished = launch(conn, c, site)
+    assert resumed.resumed and resumed.run_id == journal.run_id
+    # Seule la sous-catégorie en échec est refaite, avec sa génération d'origine
+    assert site.scraped == ['Casseroles']
+    assert finished
+    assert names(conn, 'Casseroles') == ['Casserole 16', 'Casserole 18']
+    assert names(conn, 'Poêles') == ['Poêle 20', 'Poêle 24']
+
+def test_run_expires_after_max_attempts(database, site):
+    conn, c = database
+    seed_previous_run(conn, c, site)
+    site.failing.add('Casseroles')
+    site.listings['Poêles'].remove('Poêle 24')
+    first, _ = launch(conn, c, site, max_attempts=2)
+    second, _ = launch(conn, c, site, max_attempts=2)
+    assert second.run_id == first.run_id
+    # Troisième lancement : run expiré, les sous-catégories terminées sont nettoyées, pas celles en échec
+    third, _ = launch(conn, c, site, max_attempts=2)
+    assert not third.resumed and third.run_id != first.run_id
+    assert conn.execute('SELECT status FROM journal_runs WHERE id=?', (first.run_id,)).fetchone()[0] == 'expired'
+    assert names(conn, 'Poêles') == ['Poêle 20']
+    assert 'Casserole 28' in names(conn, 'Casseroles')
+
+def test_run_expires_after_max_age(database, site):
+    conn, c = database
+    site.failing.add('Casseroles')
+    first, _ = launch(conn, c, site)
+    conn.execute("UPDATE journal_runs SET started_at=datetime('now', '-2 days') WHERE id=?", (first.run_id,))
+    conn.commit()
+    second, _ = launch(conn, c, site, max_age_hours=24)
+    assert not second.resumed and second.run_id != first.run_id
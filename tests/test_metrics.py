@@ -0,0 +1,16 @@
+import pytest
+
+from scrape_metrics import percentile
+
+@pytest.mark.parametrize('values, fraction, expected', [
+    ([1, 2], 0.5, 1),
+    (list(range(1, 21)), 0.5, 10),
+    (list(range(1, 21)), 0.95, 19),
+    (list(range(1, 21)), 1.0, 20),
+    (list(range(1, 11)), 0.95, 10),
+    ([7], 0.5, 7),
+    ([3, 4], 0.0, 3),
+    ([], 0.95, 0.0),
+])
+def test_percentile_nearest_rank(values, fraction, expected):
+    assert percentile(values, fraction) == expected
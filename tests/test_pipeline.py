@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+import scrape_action
+from scrape_pipeline import Pipeline
+
+class PageFetcher:
+    # Émet plus de pages que les files ne peuvent en contenir : un étage aval bloqué se verrait
+    def __init__(self, pages=20):
+        self.pages = pages
+        self.closed = False
+
+    def fetch(self, job, emit):
+        for page in range(self.pages):
+            emit((job, page))
+
+    def close(self):
+        self.closed = True
+
+class EchoParser:
+    def parse(self, item):
+        return item
+
+    def close(self):
+        pass
+
+class ListWriter:
+    def __init__(self):
+        self.items = []
+
+    def write(self, item):
+        self.items.append(item)
+
+    def close(self):
+        pass
+
+def failing_factory():
+    raise RuntimeError('création impossible')
+
+def run_with_timeout(pipeline, jobs, timeout=10):
+    outcome = {}
+
+    def target():
+        try:
+            outcome['stats'] = pipeline.run(jobs)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline bloqué"
+    return outcome
+
+def test_pipeline_processes_every_item():
+    pipeline = Pipeline(PageFetcher, EchoParser, ListWriter, fetch_workers=2, parse_workers=2, queue_size=2)
+    outcome = run_with_timeout(pipeline, ['a', 'b', 'c'])
+    assert 'error' not in outcome
+    assert len(pipeline.writer.items) == 60
+
+@pytest.mark.parametrize('stage', ['fetch', 'parse', 'write'])
+def test_factory_failure_aborts_without_deadlock(stage):
+    factories = {'fetch': PageFetcher, 'parse': EchoParser, 'write': ListWriter}
+    factories[stage] = failing_factory
+    pipeline = Pipeline(factories['fetch'], factories['parse'], factories['write'],
+                        fetch_workers=2, parse_workers=2, queue_size=2)
+    outcome = run_with_timeout(pipeline, ['a', 'b', 'c'])
+    assert isinstance(outcome.get('error'), RuntimeError)
+    assert 'création impossible' in str(outcome['error'])
+    assert pipeline.stats[stage].errors >= 1
+
+def test_pipeline_rejects_non_browser_backend(capsys):
+    with pytest.raises(SystemExit):
+        scrape_action.parse_args(['--pipeline', '--backend', 'http'])
+    assert '--pipeline' in capsys.readouterr().err
+    assert scrape_action.parse_args(['--pipeline', '--backend', 'browser']).backend == 'browser'
+    assert scrape_action.parse_args([]).backend == 'auto'
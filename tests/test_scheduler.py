@@ -0,0 +1,41 @@
+import pytest
+
+import scrape_images
+from scrape_scheduler import parse_rates, PolitenessScheduler
+
+def test_parse_rates_rejects_non_positive_and_invalid():
+    assert parse_rates('www.action.com=0, www.lidl.fr=-1, www.carrefour.fr=x, example.com=0.5') == {'example.com': 0.5}
+
+def test_override_rate_never_divides_by_zero():
+    scheduler = PolitenessScheduler(overrides=parse_rates('www.action.com=0'))
+    assert scheduler.interval('https://www.action.com/fr-fr/') == 1.0
+    assert scheduler.bucket('www.action.com').reserve() >= 0
+
+class ImageResponse:
+    status_code = 200
+    headers = {'Content-Type': 'image/jpeg'}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, size):
+        return iter([b'ab', b'cd', b'ef'])
+
+class ImageSession:
+    def get(self, url, timeout=None, stream=False):
+        return ImageResponse()
+
+def test_image_download_is_paced_by_scheduler(monkeypatch):
+    calls = []
+    monkeypatch.setattr(scrape_images.scheduler, 'acquire', lambda target: calls.append(('acquire', target)))
+    monkeypatch.setattr(scrape_images.scheduler, 'report', lambda target, status=None, **kwargs: calls.append(('report', status)))
+    data, content_type = scrape_images.download(ImageSession(), 'https://cdn.example.com/p.jpg')
+    assert (data, content_type) == (b'abcdef', 'image/jpeg')
+    assert calls == [('acquire', 'https://cdn.example.com/p.jpg'), ('report', 200)]
+
+def test_image_download_size_limit(monkeypatch):
+    monkeypatch.setattr(scrape_images.scheduler, 'acquire', lambda target: None)
+    monkeypatch.setattr(scrape_images.scheduler, 'report', lambda *args, **kwargs: None)
+    monkeypatch.setattr(scrape_images, 'MAX_IMAGE_BYTES', 4)
+    with pytest.raises(ValueError):
+        scrape_images.download(ImageSession(), 'https://cdn.example.com/p.jpg')
@@ -0,0 +1,81 @@
+import pytest
+
+import scrape_action
+from scrape_search import fts_query, search, rebuild_search_index
+from scrape_storage import start_generation, delete_unseen
+
+@pytest.fixture
+def indexed(database, make_product):
+    conn, _ = database
+    generation = start_generation(conn, 'premier passage')
+    scrape_action.insert_products(conn, [
+        make_product('Poêle en fonte 24 cm', description='Compatible induction'),
+        make_product('Casserole inox', description='Avec couvercle en verre'),
+        make_product('Crème hydratante', description='Pot de 50 ml', category='Beauté', subcategory='Soins'),
+    ], generation=generation)
+    return conn, generation
+
+def indexed_rows(conn):
+    return conn.execute('SELECT COUNT(*) FROM products_fts').fetchone()[0]
+
+def test_search_ignores_accents_and_case(indexed):
+    conn, _ = indexed
+    assert [row['name'] for row in search(conn, 'poele')] == ['Poêle en fonte 24 cm']
+    assert [row['name'] for row in search(conn, 'CREME')] == ['Crème hydratante']
+    # Préfixe sur le dernier mot : saisie en cours
+    assert [row['name'] for row in search(conn, 'casse')] == ['Casserole inox']
+
+def test_name_match_ranks_before_description_match(indexed, make_product):
+    conn, generation = indexed
+    scrape_action.insert_products(conn, [make_product('Verre à eau', subcategory='Verres')], generation=generation)
+    names = [row['name'] for row in search(conn, 'verre')]
+    assert names[0] == 'Verre à eau' and 'Casserole inox' in names
+    assert '<b>' in search(conn, 'verre')[0]['name_highlight']
+
+def test_update_trigger_fires_only_on_text_changes(indexed):
+    conn, _ = indexed
+    before = conn.total_changes
+    conn.execute("UPDATE products SET scraped_at = datetime('now', '+1 day')")
+    # Une ligne par produit, aucune écriture dans l'index plein texte
+    assert conn.total_changes - before == 3
+    before = conn.total_changes
+    conn.execute("UPDATE products SET description = 'Fonte émaillée' WHERE name LIKE 'Poêle%'")
+    assert conn.total_changes - before > 1
+    conn.commit()
+    assert [row['name'] for row in search(conn, 'emaillee')] == ['Poêle en fonte 24 cm']
+    assert search(conn, 'induction') == []
+
+def test_delete_unseen_removes_index_rows(indexed, make_product):
+    conn, _ = indexed
+    generation = start_generation(conn, 'second passage')
+    scrape_action.insert_products(conn, [make_product('Poêle en fonte 24 cm', description='Compatible induction')],
+                                  generation=generation)
+    assert delete_unseen(conn, generation, 'Cuisine', 'Poêles') == 1
+    assert indexed_rows(conn) == 2
+    assert search(conn, 'casserole') == []
+    assert len(search(conn, 'poele')) == 1
+
+def test_rebuild_matches_trigger_maintained_index(indexed):
+    conn, _ = indexed
+    rebuild_search_index(conn)
+    assert indexed_rows(conn) == 3
+    assert len(search(conn, 'poele')) == 1
+
+@pytest.mark.parametrize('text, expected', [
+    ('poêle', '"poêle"*'),
+    ('poêle 24cm', '"poêle" AND "24cm"*'),
+    # Syntaxe FTS5 de l'utilisateur neutralisée : opérateurs, guillemets, colonnes, NEAR
+    ('"poêle" OR name:crème', '"poêle" AND "OR" AND "name" AND "crème"*'),
+    ('NEAR(a b)', '"NEAR" AND "a" AND "b"*'),
+    ('', None),
+    ('  *-" ', None),
+    (None, None),
+])
+def test_fts_query_quotes_user_input(text, expected):
+    assert fts_query(text) == expected
+
+def test_search_accepts_fts_syntax_as_plain_words(indexed):
+    conn, _ = indexed
+    assert search(conn, 'poêle" OR *') == []
+    assert [row['name'] for row in search(conn, 'fonte AND')] == []
+    assert [row['name'] for row in search(conn, '(fonte)')] == ['Poêle en fonte 24 cm']
@@ -0,0 +1,71 @@
+import os
+import json
+import gzip
+import sqlite3
+
+import pytest
+
+import scrape_snapshot
+from scrape_snapshot import publish_snapshot, read_manifest
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / 'action_products.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, category TEXT, scraped_at TEXT)')
+    conn.executemany('INSERT INTO products (name, category, scraped_at) VALUES (?, ?, ?)', [
+        ('Poêle', 'Cuisine', '2024-01-02'),
+        ('Casserole', 'Cuisine', '2024-01-03'),
+        ('Bougie', 'Décoration', '2024-01-01'),
+    ])
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+def load(directory, name):
+    with open(os.path.join(directory, name), 'rb') as f:
+        data = f.read()
+    return json.loads(gzip.decompress(data) if name.endswith('.gz') else data)
+
+def test_publish_writes_sorted_catalog_and_category_shards(source, tmp_path):
+    path, _ = source
+    manifest = publish_snapshot('action', path, str(tmp_path / 'snapshots'))
+    directory = str(tmp_path / 'snapshots' / 'action')
+    assert read_manifest(directory) == manifest
+    assert [row['name'] for row in load(directory, manifest['files']['identity'])] == ['Casserole', 'Poêle', 'Bougie']
+    assert load(directory, manifest['files']['gzip']) == load(directory, manifest['files']['identity'])
+    kitchen = manifest['categories']['Cuisine']
+    assert kitchen['count'] == 2
+    assert [row['name'] for row in load(directory, kitchen['files']['identity'])] == ['Casserole', 'Poêle']
+    assert not any('.tmp-' in name for name in os.listdir(directory))
+
+def test_manifest_is_written_last(source, tmp_path, monkeypatch):
+    path, _ = source
+    written = []
+    real_write = scrape_snapshot.atomic_write
+    monkeypatch.setattr(scrape_snapshot, 'atomic_write', lambda target, data: written.append(os.path.basename(target))
+                        or real_write(target, data))
+    manifest = publish_snapshot('action', path, str(tmp_path / 'snapshots'))
+    # Tous les fichiers désignés par le manifeste existent avant qu'il ne bascule
+    assert written[-1] == 'manifest.json'
+    referenced = set(manifest['files'].values()) | {name for entry in manifest['categories'].values()
+                                                    for name in entry['files'].values()}
+    assert referenced == set(written[:-1])
+
+def test_unchanged_content_keeps_version(source, tmp_path):
+    path, _ = source
+    first = publish_snapshot('action', path, str(tmp_path / 'snapshots'))
+    assert publish_snapshot('action', path, str(tmp_path / 'snapshots')) == first
+
+def test_prune_keeps_current_and_previous_versions(source, tmp_path):
+    path, conn = source
+    snapshot_dir = str(tmp_path / 'snapshots')
+    directory = os.path.join(snapshot_dir, 'action')
+    versions = []
+    for index in range(3):
+        conn.execute("INSERT INTO products (name, category, scraped_at) VALUES (?, 'Cuisine', '2024-02-01')",
+                     (f"Nouveau {index}",))
+        conn.commit()
+        versions.append(publish_snapshot('action', path, snapshot_dir)['version'])
+    on_disk = {name.split('.')[0].rsplit('-', 1)[-1] for name in os.listdir(directory) if name != 'manifest.json'}
+    assert on_disk == set(versions[1:])
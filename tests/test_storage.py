@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from scrape_storage import ensure_identity_index, upsert_products, ensure_generation_schema, start_generation, delete_unseen
+
+COLUMNS = ('name', 'description', 'price', 'product_url', 'category', 'subcategory')
+IDENTITY_KEY = ('name', 'price', 'product_url')
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'products.sqlite'))
+    conn.execute('''CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT, description TEXT, price REAL, product_url TEXT,
+        category TEXT, subcategory TEXT, scraped_at TEXT, first_scraped_at TEXT
+    )''')
+    conn.commit()
+    yield conn
+    conn.close()
+
+def rows(conn):
+    return conn.execute('SELECT id, name, price, product_url, scraped_at FROM products ORDER BY id').fetchall()
+
+def test_migration_deduplicates_including_null_url(conn):
+    conn.executemany('INSERT INTO products (name, price, product_url, scraped_at) VALUES (?, ?, ?, ?)', [
+        ('Poêle', 9.99, 'u1', '2024-01-01'),
+        ('Poêle', 9.99, 'u1', '2024-03-01'),
+        ('Bougie', 1.0, None, '2024-01-02'),
+        ('Bougie', 1.0, None, '2024-02-02'),
+        ('Bougie', 2.0, None, '2024-01-05'),
+    ])
+    conn.commit()
+    assert ensure_identity_index(conn, IDENTITY_KEY) == 2
+    # On garde la ligne la plus ancienne, avec le scraped_at le plus récent du groupe
+    assert rows(conn) == [(1, 'Poêle', 9.99, 'u1', '2024-03-01'),
+                          (3, 'Bougie', 1.0, None, '2024-02-02'),
+                          (5, 'Bougie', 2.0, None, '2024-01-05')]
+    # L'index posé, la migration n'est plus rejouée et un doublon NULL est refusé
+    assert ensure_identity_index(conn, IDENTITY_KEY) == 0
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO products (name, price, product_url) VALUES ('Bougie', 1.0, NULL)")
+
+def test_reupsert_updates_existing_product(conn, make_product):
+    product = make_product
+    ensure_identity_index(conn, IDENTITY_KEY)
+    assert upsert_products(conn, COLUMNS, IDENTITY_KEY, [product('Poêle'), product('Bougie', product_url=None)]) == 2
+    conn.execute("UPDATE products SET scraped_at='2000-01-01', first_scraped_at='2000-01-01'")
+    conn.commit()
+    inserted = upsert_products(conn, COLUMNS, IDENTITY_KEY, [product('Poêle', description='nouvelle'),
+                                                             product('Bougie', product_url=None),
+                                                             product('Verre')])
+    assert inserted == 1
+    poele = conn.execute("SELECT id, description, scraped_at, first_scraped_at FROM products WHERE name='Poêle'").fetchone()
+    assert poele[0] == 1 and poele[1] == 'nouvelle'
+    assert poele[2] > '2000-01-01' and poele[3] == '2000-01-01'
+    assert conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 3
+
+def test_delete_unseen_only_removes_scope_from_older_generations(conn, make_product):
+    product = make_product
+    ensure_identity_index(conn, IDENTITY_KEY)
+    ensure_generation_schema(conn)
+    first = start_generation(conn, 'premier passage')
+    upsert_products(conn, COLUMNS, IDENTITY_KEY, [product('Poêle'), product('Casserole'),
+                                                  product('Verre', subcategory='Verres'),
+                                                  product('Bougie', category='Décorations', subcategory='Poêles')],
+                    generation=first)
+    second = start_generation(conn, 'second passage')
+    upsert_products(conn, COLUMNS, IDENTITY_KEY, [product('Poêle')], generation=second)
+    assert delete_unseen(conn, second, 'Cuisine', 'Poêles') == 1
+    remaining = {row[0] for row in conn.execute('SELECT name FROM products')}
+    # Casserole (même sous-catégorie, génération antérieure) supprimée ; les autres périmètres intacts
+    assert remaining == {'Poêle', 'Verre', 'Bougie'}